@@ -5,33 +5,122 @@
 # 
 # Python client interface for HCC2 SDK 2.0
 #
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 import os
-from pydantic import BaseModel
+from threading import Lock
+from typing import Optional
+from pydantic import BaseModel, Field, PrivateAttr
 import requests
+from requests.adapters import HTTPAdapter
 
-from classes.api_classes import APIAdvancedMessagesSubscribe, APICheckProvision, APIDeleteAllSubscriptions, APIExtractConfiguration, APIHeartbeatApplication, APIInitializeApplication, APIMessageRead, APIMessageReadAdvanced, APIMessageWrite, APIMessageWriteAdvanced, APIRegisterApplication, APISetOfMessagesSubscribe, APISimpleMessageSubscribe, APIValidateProvision, MessageWriteAdvancedReq, SetDatapoint, TvqtDataPoint
+from classes.api_classes import APIAdvancedMessagesSubscribe, APICheckProvision, APIDeleteAllSubscriptions, APIExtractConfiguration, APIHeartbeatApplication, APIInitializeApplication, APIMessageRead, APIMessageReadAdvanced, APIMessageWrite, APIMessageWriteAdvanced, APIPreparedRead, APIPreparedReadAdvanced, APIRegisterApplication, APISetOfMessagesSubscribe, APISimpleMessageSubscribe, APIValidateProvision, MessageWriteAdvancedReq, SetDatapoint, TvqtDataPoint
+from classes.chunked_read import ChunkedReader
+from classes.circuit_breaker import CircuitBreakers
 from classes.enums import quality_enum
+from classes.request_hooks import RequestHooks
+from classes.topic_quarantine import TopicError, TopicQuarantine, is_topic_error
+from classes.unix_transport import UnixAdapter
 from config.apiconfig import ApiConfig, EnvVariables
 from config.varsdict import VarsDict
 from lib.miscfuncs import validateUrl
+from lib.timestamps import now_us
 
 
+def new_session():
+    #
+    # One connection pool shared by every call of a client, sized for the
+    # batch workers plus the main loop and heartbeat threads
+    #
+    cfg = ApiConfig()
+    pool_size = max(cfg.api_pool_size, cfg.api_batch_workers + 2)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # a co-located REST server may be reached through a unix domain socket
+    session.mount("unix://", UnixAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return session
+
+class APIBatch(object):
+    #
+    # Calls submitted in a client.batch() block run concurrently on the client's
+    # bounded thread pool. Each future carries its own result or exception;
+    # a failing call does not cancel its siblings. Leaving the block waits for all.
+    #
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = []
+
+    def submit(self, func, *args, **kwargs):
+        future = self.executor.submit(func, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wait(self.futures)
+        return False
+
 class APIClient(BaseModel):
     app_name: str
     connected: bool = False
     valid: bool = False
     cfg: ApiConfig = {}
     vars_dict: VarsDict = VarsDict()
+    hooks: RequestHooks = Field(default_factory=RequestHooks)
+    session: requests.Session = Field(default_factory=new_session)
+    executor: Optional[ThreadPoolExecutor] = None
+    chunked_reader: ChunkedReader = Field(default_factory=ChunkedReader)
+    breakers: CircuitBreakers = Field(default_factory=CircuitBreakers)
+    quarantine: TopicQuarantine = Field(default_factory=TopicQuarantine)
+    write_filter: Optional[object] = None
+    _executor_lock: Lock = PrivateAttr(default_factory=Lock)
 
-    def connect(self):
+    class Config:
+        arbitrary_types_allowed = True
+
+    def api(self, api_class, **fields):
+        #
+        # Every API object shares the client's hooks, connection pool and circuit breakers
+        #
+        return api_class(hooks=self.hooks, session=self.session, breakers=self.breakers, **fields)
+
+    def batch(self):
+        with self._executor_lock:
+            if self.executor is None:
+                workers = self.cfg.api_batch_workers if isinstance(self.cfg, ApiConfig) else ApiConfig().api_batch_workers
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-batch")
+        return APIBatch(self.executor)
+
+    def add_hook(self, hook):
+        #
+        # Register a request lifecycle hook (see classes/request_hooks.py)
+        #
+        return self.hooks.add(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    @staticmethod
+    def env_config():
         #
         # Read Environment variables
         #
-        self.cfg = ApiConfig()
+        cfg = ApiConfig()
         env = EnvVariables()
-        self.cfg.api_url = os.environ.get(env.api_url, self.cfg.api_url)
-        self.cfg.api_callback_url = os.environ.get(env.api_callback_url, self.cfg.api_callback_url)
+        cfg.api_url = os.environ.get(env.api_url, cfg.api_url)
+        cfg.api_callback_url = os.environ.get(env.api_callback_url, cfg.api_callback_url)
+        return cfg
+
+    def connect(self):
+        self.cfg = APIClient.env_config()
+        self.breakers.configure(self.cfg)
+        self.quarantine.configure(self.cfg)
+        # a new connection may reach a server that lost or never had our values
+        if self.write_filter is not None:
+            self.write_filter.reset()
         if (self.cfg.api_url != ""):
             # check if its a vaild URL
             self.valid = validateUrl(self.cfg.api_url)    
@@ -42,9 +131,50 @@ class APIClient(BaseModel):
             self.valid = self.wait_for_rest_server(self.cfg.api_test_topic)
         return self.valid
     
+    def transport_status(self):
+        #
+        # Circuit state per endpoint: {"messageRead": {"state": "closed", "consecutive_failures": 0, "retry_in": 0.0}, ...}
+        #
+        return self.breakers.status()
+
+    def server_available(self):
+        return self.breakers.available()
+
+    def quarantined_topics(self):
+        #
+        # Topics isolated from batched calls: {"topic": {"retry_in": 12.3, "failures": 2}, ...}
+        #
+        return self.quarantine.status()
+
+    def isolated(self, request, items, key=lambda topic: topic, rejected=None):
+        #
+        # Run a batched call on the items whose topic is not quarantined; a batch
+        # rejected because of its content is bisected to find the offending topics.
+        # The items left out (quarantined before or now) are added to `rejected`.
+        #
+        if not self.cfg.topic_isolation:
+            return request(items)
+        healthy = self.quarantine.healthy(items, key)
+        if rejected is not None and len(healthy) < len(items):
+            kept = {id(item) for item in healthy}
+            rejected.extend(item for item in items if id(item) not in kept)
+        if not healthy:
+            return []
+        results, failed = self.quarantine.isolate(request, healthy, key)
+        if rejected is not None:
+            rejected.extend(failed)
+        return results
+
+    def by_position(self, responses, topic_list):
+        #
+        # One result per topic requested, None for a topic left out
+        #
+        by_topic = {response.topic: response for response in responses if response is not None}
+        return [by_topic.get(topic) for topic in topic_list]
+
     def wait_for_rest_server(self, topic):
         try:
-            response = self.messageRead([topic])
+            response = self.readTopics([topic])
             if response:
                 return True
         except requests.exceptions.RequestException:
@@ -53,115 +183,271 @@ class APIClient(BaseModel):
 
 
     def initializeApp(self):
-        message_init_app = APIInitializeApplication()
+        message_init_app = self.api(APIInitializeApplication)
         response = message_init_app.Request(self.app_name, self.cfg)
         return response
 
     def registerApp(self, tarfile_path:str, is_complex_provisioned: bool):
-        message_register_app = APIRegisterApplication()
+        message_register_app = self.api(APIRegisterApplication)
         response = message_register_app.Request(self.app_name, tarfile_path, is_complex_provisioned, self.cfg)
         return response
 
     def heartbeatApp(self, up: bool):
-        message_heartbeat_app = APIHeartbeatApplication()
+        message_heartbeat_app = self.api(APIHeartbeatApplication)
         response = message_heartbeat_app.Request(self.app_name, up, self.cfg)
         return response
 
     def checkProvisioningStatus(self):
-        message_check_provision = APICheckProvision()
+        message_check_provision = self.api(APICheckProvision)
         response = message_check_provision.Request(self.app_name, self.cfg)
         return response
 
     def validateProvision(self, valid):
-        message_validate_provision = APIValidateProvision()
+        message_validate_provision = self.api(APIValidateProvision)
         response = message_validate_provision.Request(self.app_name, valid, self.cfg)
+        # a new provision starts with empty values: send every topic again
+        if self.write_filter is not None:
+            self.write_filter.reset()
         return response
 
     def extractConfigFile(self, tar_file_path):
-        message_extract_config = APIExtractConfiguration()
+        message_extract_config = self.api(APIExtractConfiguration)
         response = message_extract_config.Request(self.app_name, tar_file_path, self.cfg)
         return response
 
     def messageRead(self, topic_list):
-        message_read = APIMessageRead()
+        #
+        # With topic isolation, results follow topic_list: a quarantined topic leaves None in its place
+        #
+        if not self.cfg.topic_isolation:
+            return self.readTopics(topic_list)
+        return self.by_position(self.isolated(self.readTopics, topic_list), topic_list)
+
+    def readTopics(self, topic_list):
+        if self.chunked_reader.needs_chunking("messageRead", topic_list, self.cfg):
+            chunks = self.chunked_reader.read("messageRead", lambda chunk: self.api(APIMessageRead, retry_timeouts=False).Request(chunk, self.cfg), topic_list, self.cfg)
+            return [response for chunk in chunks for response in chunk]
+        message_read = self.api(APIMessageRead)
         response_array = message_read.Request(topic_list, self.cfg)
         return response_array
     
-    def messageReadVar(self, var_list):
-        topic_list = []
-        for var in var_list:
-            topic_list.append(self.vars_dict.get_by_var(var).topic)
+    def prepare_read(self, topic_list):
+        return self.api(APIPreparedRead).Prepare(topic_list, self.cfg)
 
-        return self.messageRead(topic_list)
+    def prepare_read_advanced(self, topic_list):
+        return self.api(APIPreparedReadAdvanced).Prepare(topic_list, self.cfg)
+
+    def messageReadPrepared(self, plan):
+        #
+        # Run a plan built by prepare_read/prepare_read_advanced. Results are
+        # positional; a topic missing from the response leaves its slot as None
+        #
+        if not self.cfg.topic_isolation:
+            return plan.Request(self.cfg)
+        advanced = isinstance(plan, APIPreparedReadAdvanced)
+        if not self.quarantine.any_blocked(plan.topics):
+            try:
+                results = plan.Request(self.cfg)
+                # an empty read advanced answer rejects the batch; any other missing topic just leaves its slot None
+                if not (advanced and plan.topics and results.count(None) == len(results)):
+                    self.quarantine.release(plan.topics)
+                    return results
+            except requests.exceptions.HTTPError as e:
+                if not is_topic_error(e, plan.topics):
+                    raise
+        #
+        # Some topics are bad: serve the healthy ones with an isolated read, bad slots stay None
+        #
+        read = self.messageReadAdvanced if advanced else self.messageRead
+        return read(plan.topics)
+
+    def messageReadVar(self, var_list):
+        #
+        # One result per var requested, in order; a topic named by several vars is read once
+        #
+        topic_list = self.varTopics(var_list)
+        by_topic = {}
+        for response in self.messageRead(list(dict.fromkeys(topic_list))):
+            if response is None:
+                continue
+            var_def = self.vars_dict.get_by_topic(response.topic)
+            if var_def is not None:
+                response.value = var_def.decode(response.value)
+            by_topic[response.topic] = response
+        return [by_topic.get(topic) for topic in topic_list]
         
     def messageReadAdvanced(self, topic_list):
-        message_read = APIMessageReadAdvanced()
+        #
+        # With topic isolation, results follow topic_list: a quarantined topic leaves None in its place
+        #
+        if not self.cfg.topic_isolation:
+            return self.readAdvancedTopics(topic_list)
+        return self.by_position(self.isolated(self.readAdvancedTopics, topic_list), topic_list)
+
+    def messageReadAdvancedStream(self, topic_list, datapoints=False):
+        #
+        # Generator over a read advanced answer, decoded as it arrives: one
+        # MessageReadAdvancedResp at a time, or (topic, msgSource, GetDatapoint)
+        # with datapoints=True. For large history reads; quarantined topics are
+        # skipped. A rejected batch is handled as in messageReadAdvanced, except
+        # that the bisection only probes each part and the healthy topics are then
+        # streamed again, so no answer is ever held in memory.
+        #
+        isolation = self.cfg.topic_isolation
+        if isolation:
+            topic_list = self.quarantine.healthy(topic_list, lambda topic: topic)
+        if not topic_list:
+            return
+        count = 0
+        try:
+            for item in self.api(APIMessageReadAdvanced).Stream(topic_list, self.cfg, datapoints):
+                count += 1
+                yield item
+        except requests.exceptions.HTTPError as e:
+            # raised on the status, before anything was yielded
+            if not isolation or not is_topic_error(e, topic_list):
+                raise
+        if count > 0:
+            if isolation:
+                self.quarantine.release(topic_list)
+            return
+        #
+        # the server answers an empty list when any topic is unknown
+        #
+        if not isolation:
+            raise TopicError(f"read advanced rejected {len(topic_list)} topics")
+        rejected = []
+        self.isolated(self.probeAdvancedTopics, topic_list, rejected=rejected)
+        left_out = set(rejected)
+        healthy = [topic for topic in topic_list if topic not in left_out]
+        if healthy:
+            yield from self.api(APIMessageReadAdvanced).Stream(healthy, self.cfg, datapoints)
+
+    def probeAdvancedTopics(self, topic_list):
+        #
+        # Read advanced that stops at the first element: raises TopicError when the batch is rejected
+        #
+        stream = self.api(APIMessageReadAdvanced).Stream(topic_list, self.cfg)
+        try:
+            if next(stream, None) is None:
+                raise TopicError(f"read advanced rejected {len(topic_list)} topics")
+        finally:
+            stream.close()
+        return []
+
+    def readAdvancedTopics(self, topic_list):
+        if self.chunked_reader.needs_chunking("messageReadAdvanced", topic_list, self.cfg):
+            chunks = self.chunked_reader.read("messageReadAdvanced", lambda chunk: self.api(APIMessageReadAdvanced, retry_timeouts=False).Request(chunk, self.cfg), topic_list, self.cfg)
+            #
+            # the server answers an empty list when any topic is unknown
+            #
+            if any(len(chunk) == 0 for chunk in chunks):
+                raise TopicError(f"read advanced rejected {len(topic_list)} topics")
+            return [response for chunk in chunks for response in chunk]
+        message_read = self.api(APIMessageReadAdvanced)
         response_array = message_read.Request(topic_list, self.cfg)
+        if len(response_array) == 0 and len(topic_list) > 0:
+            raise TopicError(f"read advanced rejected {len(topic_list)} topics")
         return response_array
     
     def messageReadAdvancedVar(self, var_list):
         if self.vars_dict.by_var == {}:
             raise Exception (f"vars support is not available")
-        topic_list = []
-        for var in var_list:
-            topic_list.append(self.vars_dict.get_by_var(var).topic)
-        return self.messageReadAdvanced(topic_list)
+        topic_list = self.varTopics(var_list)
+        by_topic = {}
+        for response in self.messageReadAdvanced(list(dict.fromkeys(topic_list))):
+            if response is None:
+                continue
+            var_def = self.vars_dict.get_by_topic(response.topic)
+            if var_def is not None:
+                for dp in response.datapoints:
+                    dp.values = var_def.decode_values(dp.values)
+            by_topic[response.topic] = response
+        return [by_topic.get(topic) for topic in topic_list]
 
     def messageWrite(self, tvqt_datapoint_list):
-        message_write = APIMessageWrite()
-        response_array = message_write.Request(tvqt_datapoint_list, self.cfg)
-        return response_array
+        #
+        # With a write filter (classes/deadband.py) only the changed values are sent.
+        # Returns False when some datapoints were not written because their topic
+        # is quarantined (see quarantined_topics())
+        #
+        if self.write_filter is not None:
+            tvqt_datapoint_list = self.write_filter.filter(tvqt_datapoint_list)
+            if not tvqt_datapoint_list:
+                return True
+        rejected = []
+        self.isolated(self.writeDatapoints, tvqt_datapoint_list, key=lambda tvqt_datapoint: tvqt_datapoint.topic, rejected=rejected)
+        if self.write_filter is not None:
+            dropped = {id(tvqt_datapoint) for tvqt_datapoint in rejected}
+            self.write_filter.commit([tvqt_datapoint for tvqt_datapoint in tvqt_datapoint_list if id(tvqt_datapoint) not in dropped])
+        return not rejected
+
+    def writeDatapoints(self, tvqt_datapoint_list):
+        message_write = self.api(APIMessageWrite)
+        message_write.Request(tvqt_datapoint_list, self.cfg)
+        return []
 
     def messageWriteVar(self, var_list):
+        var_defs = [self.vars_dict.get_writable(var.name) for var in var_list]
         tvqt_datapoint_list = []
-        for var in var_list:
-            topic = self.vars_dict.get_by_var(var.name).topic
-            tvqt_datapoint = TvqtDataPoint(topic=topic, value = var.value, quality = quality_enum.OK, timeStamp = datetime.now())
+        ts = now_us()
+        for var, var_def in zip(var_list, var_defs):
+            tvqt_datapoint = TvqtDataPoint(topic=var_def.topic, value = var_def.encode(var.value), quality = quality_enum.OK, timeStamp = ts)
             tvqt_datapoint_list.append(tvqt_datapoint)
         return self.messageWrite(tvqt_datapoint_list)
 
     def messageWriteAdvanced(self, complex_datapoint_list):
-        message_write = APIMessageWriteAdvanced()
+        message_write = self.api(APIMessageWriteAdvanced)
         response_array = message_write.Request(complex_datapoint_list, self.cfg)
         return response_array
     
     def messageWriteAdvancedVar(self, var_list):
         if self.vars_dict.by_var == {}:
             raise Exception (f"vars support is not available")
+        var_defs = [self.vars_dict.get_writable(var.name) for var in var_list]
         complex_datapoint_list = []
-        for var in var_list:
-            topic = self.vars_dict.get_by_var(var.name).topic
-            if topic is not None: 
-                complex_datapoint = MessageWriteAdvancedReq(topic=topic, msgSource=self.cfg.api_msg_source,
-                    datapoints=[
-                        SetDatapoint(
-                            dataPointName="", 
-                            quality = quality_enum.OK, 
-                            timeStamps=[datetime.now()],
-                            values=[var.value])])
-
-                complex_datapoint_list.append(complex_datapoint)
-            else:
-                raise Exception (f"var: {var.name} is invalid")            
+        ts = now_us()
+        for var, var_def in zip(var_list, var_defs):
+            complex_datapoint = MessageWriteAdvancedReq(topic=var_def.topic, msgSource=self.cfg.api_msg_source,
+                datapoints=[
+                    SetDatapoint(
+                        dataPointName="", 
+                        quality = quality_enum.OK, 
+                        timeStamps=[ts],
+                        values=[var_def.encode(var.value)])])
+
+            complex_datapoint_list.append(complex_datapoint)
         return self.messageWriteAdvanced(complex_datapoint_list)
 
+    def varTopics(self, var_list):
+        #
+        # The topic of each var name, in order
+        #
+        topics = []
+        for var in var_list:
+            var_def = self.vars_dict.get_by_var(var)
+            if var_def is None:
+                raise Exception (f"var: {var} is invalid")
+            topics.append(var_def.topic)
+        return topics
+
     def deleteAllSubscriptions(self, app_name):
-        delete_subscriptions = APIDeleteAllSubscriptions()
+        delete_subscriptions = self.api(APIDeleteAllSubscriptions)
         response_array =delete_subscriptions.Request(app_name, self.cfg)
         return response_array
 
     def simpleSubscribe(self, app_name, topic, callback_url, includeOptional):
-        simple_subscribe = APISimpleMessageSubscribe()
+        simple_subscribe = self.api(APISimpleMessageSubscribe)
         response_array = simple_subscribe.Request(app_name, topic, callback_url, includeOptional, self.cfg)
         return response_array
     
     def setOfMessagesSubscribe(self, app_name, topic_list, callback_url, includeOptional):
-        set_of_messages_subscribe = APISetOfMessagesSubscribe()
+        set_of_messages_subscribe = self.api(APISetOfMessagesSubscribe)
         response_array = set_of_messages_subscribe.Request(app_name, topic_list, callback_url, includeOptional, self.cfg)
         return response_array
 
     def advancedMessagesSubscribe(self, app_name, topic_list, callback_url):
-        advanced_messages_subscribe = APIAdvancedMessagesSubscribe()
+        advanced_messages_subscribe = self.api(APIAdvancedMessagesSubscribe)
         response_array = advanced_messages_subscribe.Request(app_name, topic_list, callback_url, self.cfg)
         return response_array
 
@@ -6,45 +6,55 @@
 # Python client interface sample for HCC2 Rest API Server
 # Sample app
 #
-from datetime import datetime
-import logging
+import sys
+#
+# --profile-startup: time every import and the first successful messageRead, report and exit
+#
+profiler = None
+if "--profile-startup" in sys.argv:
+    from classes.startup_profiler import StartupProfiler
+    profiler = StartupProfiler().install()
+
 import time
 import queue
 from apiclient import APIClient
 from classes.api_classes import TvqtDataPoint
 from classes.enums import quality_enum
 from classes.log_control import LogControl
-from classes.webhook import WebHook
+from classes.ring_buffer import RingStore
+from classes.stream_stats import StatsEngine
 from config.appconfig import AppConfig
 from classes.heartbeat import HeartBeat
-from config.varsdict import Var
-from lib.miscfuncs import text_to_log_level
+from classes.deadband import DeadbandFilter
+from classes.config_binding import ConfigBinding
+from config.topicconfig import CourseAppConfig
+from lib.logsetup import setup_logging
+from lib.timestamps import now_us, us_to_datetime
 from lib.webhookfuncs import dequeue
 #
 # Get configuration
 #
 appcfg = AppConfig()
 #
+# CPU-heavy business logic runs on a process pool (optional). Its workers
+# are forked, so it is started first, before the logging listener and the
+# heartbeat and webhook threads
+#
+compute = None
+compute_error = None
+if appcfg.compute.enabled == True and appcfg.history.enabled == True:
+    try:
+        from classes.compute_pool import ComputePool
+        from lib import kernels
+        compute = ComputePool(appcfg.compute.workers, appcfg.compute.slots, appcfg.compute.slot_size)
+    except Exception as e:
+        compute_error = e
+#
 # setup logger
 #
-logging.basicConfig( level=appcfg.log.level,
-    format=appcfg.log.format,
-    datefmt=appcfg.log.date_format)
-logger = logging.getLogger(appcfg.app.name)
-logger.setLevel (text_to_log_level(appcfg.log.level))
-if appcfg.log.log_to_file == True:
-    fh = logging.FileHandler(appcfg.log.log_file, mode='w')
-    fh.setLevel(logging.getLevelName(appcfg.log.level))
-    fmt = logging.Formatter(appcfg.log.format)
-    fh.setFormatter(fmt)
-    logger.addHandler(fh)
-    logging.getLogger().propagate = False
-
-logging.addLevelName(logging.CRITICAL, "critical")
-logging.addLevelName(logging.ERROR, "error")
-logging.addLevelName(logging.WARNING, "warning")
-logging.addLevelName(logging.INFO, "info")
-logging.addLevelName(logging.DEBUG, "debug")
+logger = setup_logging(appcfg.app.name, appcfg.log)
+if compute_error is not None:
+    logger.error("Error trying to start compute pool. Error: %s. Running without it.", compute_error)
 
 ###############################################################################################
 # 
@@ -53,34 +63,88 @@ logging.addLevelName(logging.DEBUG, "debug")
 reload_required = False
 
 client = APIClient(app_name=appcfg.app.name)
+#
+# Only write values that moved out of their deadband (report by exception)
+#
+if appcfg.deadband.enabled == True:
+    client.write_filter = DeadbandFilter(appcfg.deadband)
 ###############################################################################################
 hbq = queue.Queue()
 #
 # Set Application Heartbeat (required by Unity)
 #
 hb = HeartBeat(logger, client, hbq, appcfg.misc.hearbeat_initial_state, appcfg.misc.heartbeat_period)
-log_control = LogControl(logger=logger, retry_period=appcfg.misc.retry_period, max_retries=appcfg.misc.error_retries, heartbeat_obj=hb, client_name=client.app_name)
+log_control = LogControl(logger=logger, retry_period=appcfg.misc.retry_period, retry_max_period=appcfg.misc.retry_max_period,
+    max_retries=appcfg.misc.error_retries, heartbeat_obj=hb, client_name=client.app_name, client=client)
+#
+# Configuration topics: pushed through the webhook when enabled, polled otherwise
+#
+config_binding = ConfigBinding(logger, client, CourseAppConfig, appcfg.misc.config_poll_period, appcfg.misc.config_resync_period)
+
+def on_period_change(old, new):
+    #
+    # A new running period applies to the sleep that ends the current cycle
+    #
+    global period
+    period = new
+
+config_binding.on_change("configrunningperiod", on_period_change)
 
 ################################################################################################
 # 
 # Get vars configuration data (optional)
 #
 if appcfg.app.vars_enabled == True:
+    from config.varsdict import Var
     try:
         with open(appcfg.app.var_config_path) as json_file:
             v = Var().from_json(json_file.read())
         client.vars_dict.load(v)
     except Exception as e:
-        logger.error(f"Error trying to read variable configuration file. Error: {e}. PROCESS ABORTED.")
+        logger.error("Error trying to read variable configuration file. Error: %s. PROCESS ABORTED.", e)
         exit(-1)
 
+###############################################################################################
+#
+# Record API requests and webhook callbacks for replay (optional)
+#
+capture = None
+if appcfg.app.capture_file != "":
+    from classes.capture import CaptureHook, TrafficCapture
+    capture = TrafficCapture(appcfg.app.capture_file)
+    client.add_hook(CaptureHook(capture))
+
 ###############################################################################################
 #
 # initialize webhook (optional)
 # 
 if appcfg.app.webhook_enabled == True:
+    # FastAPI and uvicorn are only loaded when the webhook is enabled
+    from classes.webhook import WebHook
     whq = queue.Queue()
-    wh = WebHook(logger=logger, queue=whq, config=appcfg)
+    wh = WebHook(logger=logger, queue=whq, config=appcfg, capture=capture)
+#
+# API metrics are served by the webhook server when enabled, otherwise by a small standalone server
+#
+elif appcfg.metrics.enabled == True:
+    try:
+        from classes.metrics_server import MetricsServer
+        MetricsServer(logger, appcfg).start()
+    except Exception as e:
+        logger.error("Error trying to start metrics server. Error: %s.", e)
+#
+# Memory snapshots, RSS, queue depths and model object counts (optional, for leak hunting)
+#
+if appcfg.diagnostics.enabled == True:
+    from classes.memory_diagnostics import MemoryDiagnostics
+    diagnostics = MemoryDiagnostics(logger, appcfg.diagnostics)
+    diagnostics.watch_queue("heartbeat", hbq)
+    for handler in logger.handlers:
+        if hasattr(handler, "queue"):
+            diagnostics.watch_queue("log", handler.queue)
+    if appcfg.app.webhook_enabled == True:
+        diagnostics.watch_queue("webhook", whq)
+    diagnostics.start()
 
 ############################################################################################################
 #
@@ -91,13 +155,17 @@ log_control.reset_retries()
 while True:
     log_control.check_retries()
     status = client.connect()
-    logger.info(f"Connecting with API at URL: {client.cfg.api_url}")
+    logger.info("Connecting with API at URL: %s", client.cfg.api_url)
     if status == False:
-        logger.error(f"Connect - Error trying to connect to API at URL: {client.cfg.api_url}.  Retrying.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("Connect - Error trying to connect to API at URL: %s.  Retrying.", client.cfg.api_url)
+        log_control.wait_retry()
         continue
             
-    logger.debug(f"Connect - Application {appcfg.app.name} is connected with API")
+    logger.debug("Connect - Application %s is connected with API", appcfg.app.name)
+    if profiler is not None:
+        profiler.mark("first_message_read")
+        profiler.dump()
+        exit(0)
     
     ###############################################################################################
     #
@@ -105,10 +173,10 @@ while True:
     #
     try:
         response = client.registerApp(tarfile_path=appcfg.app.tarfile_path, is_complex_provisioned=appcfg.app.complex_provisioned)
-        logger.info(f"Application {client.app_name} correcty registered to API using tar.gz file: {appcfg.app.tarfile_path}")
+        logger.info("Application %s correcty registered to API using tar.gz file: %s", client.app_name, appcfg.app.tarfile_path)
     except Exception as e:
-        logger.error(f"registerApp - Error trying to register application. Config file: \"{appcfg.app.tarfile_path}\". Error: {e}. Retrying.")      
-        time.sleep(appcfg.misc.retry_period)
+        logger.error('registerApp - Error trying to register application. Config file: "%s". Error: %s. Retrying.', appcfg.app.tarfile_path, e)      
+        log_control.wait_retry()
         continue
 
     ###############################################################################################
@@ -117,14 +185,14 @@ while True:
     #
     try:
         hb.start()
-        logger.info(f"Heartbeat thread has been fired successfully. ")
+        logger.info("Heartbeat thread has been fired successfully. ")
 
     except Exception as e:
-        logger.error(f"heartbeat - Error trying to start heartbeat thread. Error: {e}.  Retrying.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("heartbeat - Error trying to start heartbeat thread. Error: %s.  Retrying.", e)
+        log_control.wait_retry()
         continue
     #
-    logger.debug (f"Wait {appcfg.misc.provision_time} for configuration to settle down....")
+    logger.debug ("Wait %s for configuration to settle down....", appcfg.misc.provision_time)
     time.sleep(appcfg.misc.provision_time)
 
     ###############################################################################################
@@ -134,14 +202,14 @@ while True:
     while True:
         try:
             response = client.checkProvisioningStatus()
-            logger.debug (f"checkProvisioningStatus responded ok")
+            logger.debug ("checkProvisioningStatus responded ok")
         except Exception as e:
-            logger.error(f"checkProvisioningStatus - Error trying to check provision status. Error: {e}.  Retrying.")
-            time.sleep(appcfg.misc.retry_period)
+            logger.error("checkProvisioningStatus - Error trying to check provision status. Error: %s.  Retrying.", e)
+            log_control.wait_retry()
             continue
 
         if response.hasNewConfig == True:
-            logger.info(f"checkProvisioningStatus -> New configuration found! ")
+            logger.info("checkProvisioningStatus -> New configuration found! ")
             break
         time.sleep(appcfg.misc.retry_period)
 
@@ -151,10 +219,10 @@ while True:
     #
     try:
         response = client.validateProvision(valid=True)
-        logger.debug (f"validateProvision responded ok")
+        logger.debug ("validateProvision responded ok")
     except Exception as e:
-        logger.error(f"validateProvision -Error trying to validate provision. Error: {e}.  Retrying.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("validateProvision -Error trying to validate provision. Error: %s.  Retrying.", e)
+        log_control.wait_retry()
         continue
     ###############################################################################################
     #
@@ -174,12 +242,12 @@ while True:
         #
         try:
             status = client.deleteAllSubscriptions(client.app_name)
-            logger.debug (f"DeleteAllSubscriptions - completed succesfully.")
+            logger.debug ("DeleteAllSubscriptions - completed succesfully.")
             if status == False:
-                logger.warning(f"DeleteAllSubscriptions - no susbcriptions were found.")    
+                logger.warning("DeleteAllSubscriptions - no susbcriptions were found.")    
         except Exception as e:
-            logger.error(f"DeleteAllSubscriptions - Error trying to subscribe. Check parameters and configuration. Error: {e}. Try again.")
-            time.sleep(appcfg.misc.retry_period)
+            logger.error("DeleteAllSubscriptions - Error trying to subscribe. Check parameters and configuration. Error: %s. Try again.", e)
+            log_control.wait_retry()
             continue
         #
         # Subscribe to one topic using SimpleSubscribe
@@ -190,10 +258,10 @@ while True:
 
         try:
             status = client.simpleSubscribe(client.app_name, topic1, callback_url, True)
-            logger.debug (f"SimpleSubscribe for topic {topic1} on url {callback_url} completed succesfully.")
+            logger.debug ("SimpleSubscribe for topic %s on url %s completed succesfully.", topic1, callback_url)
         except Exception as e:
-            logger.error(f"SimpleSubscribe - Error trying to subscribe. Check parameters and configuration. Error: {e}. Try again.")
-            time.sleep(appcfg.misc.retry_period)
+            logger.error("SimpleSubscribe - Error trying to subscribe. Check parameters and configuration. Error: %s. Try again.", e)
+            log_control.wait_retry()
             continue
         #
         # Subscribe to other topics using setOfMessagesSubscribe
@@ -205,13 +273,17 @@ while True:
         subscribed[topic_list[0]] = {}
         subscribed[topic_list[1]] = {}
 
+        #
+        # The configuration topics share this subscription; their payloads are consumed by config_binding
+        #
         callback_url = client.cfg.api_callback_url + "/" + appcfg.wh.set_of_messages.command
         try:
-            status = client.setOfMessagesSubscribe(client.app_name, topic_list, callback_url, True)
-            logger.debug (f"SetOfMessagesSubscribe for topic List {topic_list} on url {callback_url} completed succesfully.")
+            status = client.setOfMessagesSubscribe(client.app_name, topic_list + config_binding.topics, callback_url, True)
+            config_binding.subscribed = True
+            logger.debug ("SetOfMessagesSubscribe for topic List %s on url %s completed succesfully.", topic_list + config_binding.topics, callback_url)
         except Exception as e:
-            logger.error(f"SetOfMessagesSubscribe - Error trying to subscribe. Check parameters and configuration. Error: {e}. Try again.")
-            time.sleep(appcfg.misc.retry_period)
+            logger.error("SetOfMessagesSubscribe - Error trying to subscribe. Check parameters and configuration. Error: %s. Try again.", e)
+            log_control.wait_retry()
             continue
         #
         # Subscribe to other topics using advanced Message
@@ -226,10 +298,10 @@ while True:
         callback_url = client.cfg.api_callback_url + "/" + appcfg.wh.advanced_messages.command
         try:
             status = client.advancedMessagesSubscribe(client.app_name, topic_list, callback_url)
-            logger.debug (f"AdvancedMessagesSubscribe for topic List {topic_list} on url {callback_url} completed succesfully.")
+            logger.debug ("AdvancedMessagesSubscribe for topic List %s on url %s completed succesfully.", topic_list, callback_url)
         except Exception as e:
-            logger.error(f"AdvancedMessagesSubscribe - Error trying to subscribe. Check parameters and configuration. Error: {e}. Try again.")
-            time.sleep(appcfg.misc.retry_period)
+            logger.error("AdvancedMessagesSubscribe - Error trying to subscribe. Check parameters and configuration. Error: %s. Try again.", e)
+            log_control.wait_retry()
             continue
         ###############################################################################################
         # 
@@ -238,29 +310,33 @@ while True:
         while True:
             log_control.check_retries()
             try:
+                wh.callback_url = client.cfg.api_callback_url
                 wh.start()
-                logger.debug(f"Web hook thread has been fired successfully. ")
+                logger.debug("Web hook thread has been fired successfully. ")
                 break
             except Exception as e:
-                logger.error(f"webhook manager - Error trying to start webhook thread for  \"{client.app_name}\". Error: {e}. Retrying.")
-                time.sleep(appcfg.misc.retry_period)
+                logger.error('webhook manager - Error trying to start webhook thread for  "%s". Error: %s. Retrying.', client.app_name, e)
+                log_control.wait_retry()
                 continue
 
     ###############################################################################################
     #
     # Store datetime of 1st run
     #
+    ts_us = now_us()
     tvqt_datapoint_list = [
             TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.firstruntime.", 
-            value = datetime.now().strftime("%Y-%m-%d %H:%M:%S"), quality = quality_enum.OK, timeStamp = datetime.now()),
+            value = us_to_datetime(ts_us).strftime("%Y-%m-%d %H:%M:%S"), quality = quality_enum.OK, timeStamp = ts_us),
         ]
 
     try:
         status = client.messageWrite(tvqt_datapoint_list)
-        logger.debug (f"messageWrite - Writing: {tvqt_datapoint_list}. status: {status}")
+        logger.debug ("messageWrite - Writing: %s. status: %s", tvqt_datapoint_list, status)
+        if status == False:
+            logger.error("messageWrite - Some tags were not written, their topics are quarantined: %s. Check topic spelling.", list(client.quarantined_topics()))
     except Exception as e:
-        logger.error(f"messageWrite - Error trying to write tags. Check topic spelling. Error: {e}. Try again.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("messageWrite - Error trying to write tags. Check topic spelling. Error: %s. Try again.", e)
+        log_control.wait_retry()
         continue
     #
     # End of road - all configuration good!
@@ -273,6 +349,66 @@ run_counter = 1
 cpu_usage = 0
 memory_usage = 0
 temperature = 0
+#
+# Min/max of CPU and memory usage over wall-clock aligned windows of maxminrestartperiod minutes
+#
+CPU_USAGE = "liveValue.diagnostics.this.core.0.cpuUsage|.total."
+MEMORY_USAGE = "liveValue.diagnostics.this.core.0.memoryUsage|.memoryUsed."
+stats = StatsEngine(sliding=appcfg.stats.sliding_window, panes=appcfg.stats.sliding_panes, quantiles=appcfg.stats.quantiles)
+stats_outputs = {
+    "liveValue.production.this.courseApp.0.cpuusagemax.": (CPU_USAGE, "max"),
+    "liveValue.production.this.courseApp.0.cpuusagemin.": (CPU_USAGE, "min"),
+    "liveValue.production.this.courseApp.0.memoryusagemax.": (MEMORY_USAGE, "max"),
+    "liveValue.production.this.courseApp.0.memoryusagemin.": (MEMORY_USAGE, "min"),
+}
+stats_window = None
+#
+# Summary of the recent CPU usage history, computed on the compute pool
+#
+compute_outputs = [
+    "liveValue.production.this.courseApp.0.cpuusagemean.",
+    "liveValue.production.this.courseApp.0.cpuusagerms.",
+    "liveValue.production.this.courseApp.0.cpuusagestdev.",
+    "liveValue.production.this.courseApp.0.cpuusagetrend.",
+]
+#
+# Recent history per topic, in fixed memory
+#
+history = None
+if appcfg.history.enabled == True:
+    history = RingStore(capacity=appcfg.history.capacity, max_topics=appcfg.history.max_topics, topics=appcfg.history.topics)
+#
+# Resume history, aggregates and run counter from the last checkpoint (optional)
+#
+history_file = None
+if history is not None and appcfg.history.persist_file != "":
+    try:
+        from classes.history_file import HistoryFile
+        history_file = HistoryFile(appcfg.history.persist_file, appcfg.history.capacity, appcfg.history.max_topics)
+        if history_file.open():
+            history_file.restore_stats(stats)
+            run_counter = max(1, history_file.run_counter)
+            stats_window = history_file.stats_window
+            logger.info("Resumed history of %s topics from %s. run_counter: %s", len(history_file.slots), appcfg.history.persist_file, run_counter)
+        history_file.attach(history)
+    except Exception as e:
+        logger.error("Error trying to open history file %s. Error: %s. Starting without persistence.", appcfg.history.persist_file, e)
+        history_file = None
+last_checkpoint = time.monotonic()
+#
+# The inner loop reads the same topics every cycle, so prepare the read plans once
+#
+temperature_plan = client.prepare_read(
+    [
+        "liveValue.diagnostics.this.io.0.temperature.cpu."
+    ]
+)
+usage_plan = client.prepare_read_advanced(
+    [
+        "liveValue.diagnostics.this.core.0.cpuUsage|.",
+        "liveValue.diagnostics.this.core.0.memoryUsage|."
+    ]
+)
 
 log_control.reset_retries()
 
@@ -280,66 +416,55 @@ while True:
     
     #################################################################################################
     #
-    # Read Configuration Parameters:
+    # The two reads below are independent, so run them concurrently
+    #
+    with client.batch() as batch:
+        temperature_read = batch.submit(client.messageReadPrepared, temperature_plan)
+        usage_read = batch.submit(client.messageReadPrepared, usage_plan)
+    #################################################################################################
+    #
+    # Configuration Parameters: read once, then updated by push (or polled)
     #
     try:
-        value_array = client.messageRead(
-            [
-                "liveValue.postvalidConfig.this.courseApp.0.configrunningperiod.",
-                "liveValue.postvalidConfig.this.courseApp.0.maxminrestartperiod."
-            ]
-        )
-        for val in value_array:
-            logger.debug(f"topic: {val.topic}, value: {val.value}, type: {type(val.value)}, quality: {val.quality}, timeStamp: {val.timeStamp}")
+        config = config_binding.refresh()
     except Exception as e:
-        logger.error(f"messageRead - Error trying to read topics. Check topics spelling. Error: {e}.  Try Again.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("messageRead - Error trying to read configuration topics. Check topics spelling. Error: %s.  Try Again.", e)
+        log_control.wait_retry()
         continue
 
-    period = int(value_array[0].value)
-    if period < 1: 
-        period = 1
-    if period > 60:
-        period = 60
-
-    restart_period = int(value_array[1].value)
-    if period < 1: 
-        period = 1
-    if period > 60:
-        period = 60
+    period = config.configrunningperiod
+    restart_period = config.maxminrestartperiod
     #
     # Read Configuration parameters using Vars
     #
     try:
-        value_array = client.messageRead(
-            [
-                "liveValue.diagnostics.this.io.0.temperature.cpu."
-            ]
-        )
+        value_array = temperature_read.result()
+        if None in value_array:
+            raise Exception ("One or more topics do not exist. Check topic string.")
         for val in value_array:
-            logger.debug(f"topic: {val.topic}, value: {val.value}, type: {type(val.value)}, quality: {val.quality}, timeStamp: {val.timeStamp}")
+            logger.debug("topic: %s, value: %s, type: %s, quality: %s, timeStamp: %s", val.topic, val.value, type(val.value), val.quality, val.timeStamp)
         temperature = value_array[0].value
+        stats.feed(value_array)
+        if history is not None:
+            history.feed(value_array)
 
     except Exception as e:
-        logger.error(f"messageRead - Error trying to read topics. Check topic spelling. Error: {e}.  Try Again.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("messageRead - Error trying to read topics. Check topic spelling. Error: %s.  Try Again.", e)
+        log_control.wait_retry()
         continue
     #########################################################################################################################3
     #
     # Read Configuration parameters (using Read Advanced with Vars)
     #
     try:
-        response_array = client.messageReadAdvanced(
-            [
-                "liveValue.diagnostics.this.core.0.cpuUsage|.",
-                "liveValue.diagnostics.this.core.0.memoryUsage|."
-            ]
-        )
-        if len(response_array) == 0:
+        response_array = usage_read.result()
+        if None in response_array:
             raise Exception ("One or more topics do not exist. Check topic string.")
+        if history is not None:
+            history.feed(response_array)
         for resp in response_array:
             for dp in resp.datapoints:
-                logger.debug(f"topic: {resp.topic}, quality: {dp.quality}")
+                logger.debug("topic: %s, quality: %s", resp.topic, dp.quality)
                 for i in range(len(dp.values)):
                     if dp.dataPointName == "total.":
                         cpu_usage = dp.values[i]
@@ -348,61 +473,59 @@ while True:
                         memory_usage = dp.values[i]
                         break
 
-                logger.debug(f"item: {i+1}, datapoint_name: {dp.dataPointName},  value: {dp.values[i]}, type: {type(dp.values[i])} timeStamp: {dp.timeStamps[i]}")
+                logger.debug("item: %s, datapoint_name: %s,  value: %s, type: %s timeStamp: %s", i+1, dp.dataPointName, dp.values[i], type(dp.values[i]), dp.timeStamps[i])
     
     except Exception as e:
-        logger.error(f"messageReadAdvanced - Error trying to read tags. Check topic spelling. Error: {e}. Try Again.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("messageReadAdvanced - Error trying to read tags. Check topic spelling. Error: %s. Try Again.", e)
+        log_control.wait_retry()
         continue
     #
     #
-    ts = datetime.now() 
-    if ts.minute % restart_period == 0 and ts.second == 0:
+    #
+    # One timestamp for everything written in this cycle
+    #
+    ts_us = now_us()
+    now = ts_us / 1000000
+    stats.set_tumbling(restart_period * 60)
+    stats.update(CPU_USAGE, cpu_usage, now)
+    stats.update(MEMORY_USAGE, memory_usage, now)
+    if stats.window_index(now) != stats_window:
+        stats_window = stats.window_index(now)
         run_counter = 1
 
-    if run_counter == 1:
-        cpu_usage_max = cpu_usage
-        cpu_usage_min = cpu_usage
-        memory_usage_max = memory_usage
-        memory_usage_min = memory_usage
-    else:
-        if cpu_usage > cpu_usage_max:
-            cpu_usage_max = cpu_usage
-        elif cpu_usage < cpu_usage_min:
-            cpu_usage_min = cpu_usage
-        if memory_usage > memory_usage_max:
-            memory_usage_max = memory_usage
-        elif memory_usage < memory_usage_min:
-            memory_usage_min = memory_usage
-        
-
     tvqt_datapoint_list = [
         TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.runcounter.", 
-        value = run_counter, quality = quality_enum.OK, timeStamp = datetime.now()),
+        value = run_counter, quality = quality_enum.OK, timeStamp = ts_us),
         TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.lastruntime.", 
-        value = datetime.now().strftime("%Y-%m-%d %H:%M:%S"), quality = quality_enum.OK, timeStamp = datetime.now()),
+        value = us_to_datetime(ts_us).strftime("%Y-%m-%d %H:%M:%S"), quality = quality_enum.OK, timeStamp = ts_us),
         TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.cpuusagecurrent.", 
-        value = cpu_usage, quality = quality_enum.OK, timeStamp = datetime.now()),
-        TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.cpuusagemax.", 
-        value = cpu_usage_max, quality = quality_enum.OK, timeStamp = datetime.now()),
-        TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.cpuusagemin.", 
-        value = cpu_usage_min, quality = quality_enum.OK, timeStamp = datetime.now()),
+        value = cpu_usage, quality = quality_enum.OK, timeStamp = ts_us),
         TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.memoryusagecurrent.", 
-        value = memory_usage, quality = quality_enum.OK, timeStamp = datetime.now()),
-        TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.memoryusagemax.", 
-        value = memory_usage_max, quality = quality_enum.OK, timeStamp = datetime.now()),
-        TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.memoryusagemin.", 
-        value = memory_usage_min, quality = quality_enum.OK, timeStamp = datetime.now()),
+        value = memory_usage, quality = quality_enum.OK, timeStamp = ts_us),
         TvqtDataPoint(topic ="liveValue.production.this.courseApp.0.temperature.", 
-        value = temperature, quality = quality_enum.OK, timeStamp = datetime.now())
-    ]
+        value = temperature, quality = quality_enum.OK, timeStamp = ts_us)
+    ] + stats.outputs(stats_outputs, now=now, timestamp=ts_us)
+    #
+    # Hand the latest CPU usage samples to the compute pool; results of the
+    # jobs finished since the last cycle join this cycle's write
+    #
+    if compute is not None:
+        ring = history.get(CPU_USAGE)
+        if ring is not None and len(ring) > 0:
+            try:
+                compute.submit_datapoints(kernels.summary, {"x": [values for _, values, _ in ring.last(appcfg.compute.samples)]}, compute_outputs)
+            except Exception as e:
+                logger.error("Compute - Error trying to submit job. Error: %s.", e)
+        tvqt_datapoint_list += compute.collect()
 
     try:
         status = client.messageWrite(tvqt_datapoint_list)
-        logger.debug (f"messageWrite - Writing: {tvqt_datapoint_list}. status: {status}")
+        logger.debug ("messageWrite - Writing: %s. status: %s", tvqt_datapoint_list, status)
+        if status == False:
+            logger.error("messageWrite - Some tags were not written, their topics are quarantined: %s. Check topic spelling.", list(client.quarantined_topics()))
     except Exception as e:
-        logger.error(f"messageWrite - Error trying to write tags. Check topic spelling. Error: {e}. Try again.")
-        time.sleep(appcfg.misc.retry_period)
+        logger.error("messageWrite - Error trying to write tags. Check topic spelling. Error: %s. Try again.", e)
+        log_control.wait_retry()
         continue
     #
     # if wbhook enabled:
@@ -414,15 +537,23 @@ while True:
         try:
             payloads = dequeue(whq)
         except Exception as e:
-            logger.error(f"Webhook message dequeue - Error trying to dequeue messages from webhook. Error: {e}.")
+            logger.error("Webhook message dequeue - Error trying to dequeue messages from webhook. Error: %s.", e)
+        payloads = config_binding.apply(payloads)
         if len(payloads) > 0:
+            stats.feed(payloads)
+            if history is not None:
+                history.feed(payloads)
             for pl in payloads:
                 if pl.topic in subscribed:
                         subscribed[pl.topic]=pl
                 else:
-                    logger.warning (f"Topic {pl.topic} is not subscribed by this application. Check configuration.")
+                    logger.warning ("Topic %s is not subscribed by this application. Check configuration.", pl.topic)
 
     run_counter += 1
+    if history_file is not None and time.monotonic() - last_checkpoint >= appcfg.history.checkpoint_period:
+        history_file.checkpoint(stats, run_counter=run_counter, stats_window=stats_window)
+        last_checkpoint = time.monotonic()
+    log_control.reset_retries()
     time.sleep(period)
 thread.join()
 
@@ -0,0 +1,136 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# End-to-end throughput benchmark of APIClient against the local stand-in server.
+# Reports ops/sec, p50/p99 latency and client CPU per call for every operation
+# at each topic count.
+#
+#   python -m bench.client_bench --topics 1 10 100 1000 10000 --duration 2 --json bench_client.json
+#
+import argparse
+from datetime import datetime
+import json
+import time
+
+from apiclient import APIClient
+from bench.mock_server import MockConfig, MockServer
+from classes.api_classes import MessageWriteAdvancedReq, SetDatapoint, TvqtDataPoint
+from classes.enums import quality_enum
+from config.apiconfig import ApiConfig
+
+APP_NAME = "benchApp"
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def build_operations(client, topics):
+    tvqt_list = [TvqtDataPoint(topic=topic, value=float(i), quality=quality_enum.OK, timeStamp=datetime.now()) for i, topic in enumerate(topics)]
+    cdp_list = [MessageWriteAdvancedReq(topic=topic, msgSource=client.cfg.api_msg_source,
+        datapoints=[SetDatapoint(dataPointName="", quality=quality_enum.OK, timeStamps=[datetime.now()], values=[float(i)])])
+        for i, topic in enumerate(topics)]
+    plan = client.prepare_read(topics)
+    callback_url = "http://127.0.0.1:8100/webhook/v1/set_of_messages"
+    #
+    # operations whose cost does not depend on the topic count only run once per topic count of 1
+    #
+    per_topic = {
+        "messageRead": lambda: client.messageRead(topics),
+        "messageReadPrepared": lambda: client.messageReadPrepared(plan),
+        "messageReadAdvanced": lambda: client.messageReadAdvanced(topics),
+        "messageReadAdvancedStream": lambda: sum(1 for _ in client.messageReadAdvancedStream(topics)),
+        "messageWrite": lambda: client.messageWrite(tvqt_list),
+        "messageWriteAdvanced": lambda: client.messageWriteAdvanced(cdp_list),
+        "setOfMessagesSubscribe": lambda: client.setOfMessagesSubscribe(APP_NAME, topics, callback_url, True),
+        "advancedMessagesSubscribe": lambda: client.advancedMessagesSubscribe(APP_NAME, topics, callback_url),
+    }
+    fixed = {
+        "heartbeatApp": lambda: client.heartbeatApp(True),
+        "checkProvisioningStatus": lambda: client.checkProvisioningStatus(),
+        "validateProvision": lambda: client.validateProvision(True),
+        "simpleSubscribe": lambda: client.simpleSubscribe(APP_NAME, topics[0], callback_url, True),
+        "deleteAllSubscriptions": lambda: client.deleteAllSubscriptions(APP_NAME),
+    }
+    return per_topic, fixed
+
+def run_operation(func, duration, min_calls, warmup):
+    for _ in range(warmup):
+        func()
+    latencies = []
+    errors = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while len(latencies) < min_calls or time.perf_counter() - wall_start < duration:
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "ops_per_sec": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_ms_per_call": cpu / len(latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="APIClient end-to-end benchmark")
+    parser.add_argument("--url", default="", help="benchmark an already running server instead of starting the stand-in")
+    parser.add_argument("--port", type=int, default=17071)
+    parser.add_argument("--topics", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per operation and topic count")
+    parser.add_argument("--min-calls", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in server latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--only", nargs="*", default=[], help="restrict to these operations")
+    parser.add_argument("--json", default="", help="write results to this file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url == "":
+        mock_config = MockConfig(port=args.port, topics=max(args.topics), latency=args.latency, error_rate=args.error_rate)
+        server = MockServer(mock_config).start_process()
+        url = server.url
+
+    client = APIClient(app_name=APP_NAME)
+    client.cfg = ApiConfig(api_url=url)
+    topic_format = MockConfig().topic_format
+
+    results = []
+    try:
+        for count in args.topics:
+            topics = [topic_format.format(i) for i in range(count)]
+            per_topic, fixed = build_operations(client, topics)
+            operations = dict(per_topic)
+            if count == min(args.topics):
+                operations.update(fixed)
+            for name, func in operations.items():
+                if args.only and name not in args.only:
+                    continue
+                result = run_operation(func, args.duration, args.min_calls, args.warmup)
+                result.update({"operation": name, "topics": count})
+                results.append(result)
+                print(f"{name:28} topics={count:<6} {result['ops_per_sec']:10.1f} ops/s  p50={result['p50_ms']:9.3f} ms  "
+                      f"p99={result['p99_ms']:9.3f} ms  cpu={result['cpu_ms_per_call']:9.3f} ms/call  errors={result['errors']}", flush=True)
+    finally:
+        if server is not None:
+            server.exit()
+
+    if args.json != "":
+        with open(args.json, "w") as fh:
+            json.dump({"timestamp": datetime.now().isoformat(), "url": url, "results": results}, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Local stand-in for the HCC2 REST server, used for benchmarks.
+# Implements every endpoint in config.apiconfig.Ops with configurable
+# latency, error injection and topic counts.
+#
+#   python -m bench.mock_server --port 7071 --topics 1000 --latency 0.002 --error-rate 0.01
+#
+import argparse
+import asyncio
+from multiprocessing import Process
+import random
+from threading import Thread
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel
+import uvicorn
+
+from config.apiconfig import Ops
+
+class MockConfig(BaseModel):
+    host:str = "127.0.0.1"
+    port:int = 7071
+    uds:str = ""                        # listen on this unix domain socket instead of host:port
+    api_suffix:str = "/api/v1"
+    topics:int = 1000
+    topic_format:str = "liveValue.bench.this.mock.0.t{0}."
+    datapoints:int = 1
+    samples:int = 1
+    latency:float = 0.0
+    latency_jitter:float = 0.0
+    error_rate:float = 0.0
+    error_status:int = 503
+    autocreate_topics:bool = False
+    log_level:str = "error"
+
+def mock_timestamp():
+    return str(time.time_ns() // 1000)
+
+class MockStore(object):
+    def __init__(self, config):
+        self.config = config
+        self.values = {}
+        ts = mock_timestamp()
+        for i in range(config.topics):
+            self.values[config.topic_format.format(i)] = (float(i), 192, ts)
+
+    def lookup(self, topic):
+        value = self.values.get(topic)
+        if value is None and self.config.autocreate_topics:
+            value = self.values[topic] = (0.0, 192, mock_timestamp())
+        return value
+
+    def read(self, topic):
+        value = self.lookup(topic)
+        if value is None:
+            return None
+        return {"topic": topic, "value": value[0], "msgSource": "REST", "quality": value[1], "timeStamp": value[2]}
+
+    def read_advanced(self, topic):
+        value = self.lookup(topic)
+        if value is None:
+            return None
+        return {"topic": topic, "msgSource": "REST", "datapoints": [
+            {"dataPointName": f"dp{d}.", "quality": value[1],
+             "timeStamps": [value[2]] * self.config.samples,
+             "values": [value[0]] * self.config.samples} for d in range(self.config.datapoints)]}
+
+    def write(self, item):
+        self.values[item["topic"]] = (item.get("value"), item.get("quality", 192), item.get("timeStamp") or mock_timestamp())
+
+    def write_advanced(self, item):
+        for dp in item.get("datapoints", []):
+            values = dp.get("values") or [None]
+            timestamps = dp.get("timeStamps") or [mock_timestamp()]
+            self.values[item["topic"]] = (values[-1], dp.get("quality", 192), timestamps[-1])
+
+def create_app(config: MockConfig):
+    app = FastAPI(title="HCC2 REST stand-in")
+    store = MockStore(config)
+    provisioned = {}
+    subscriptions = {}
+
+    def route(op):
+        #
+        # Ops suffixes use positional placeholders ({0}, {1}...); turn them into path
+        # parameters and drop the query string, which handlers read from the request
+        #
+        suffix = op.suffix.split("?")[0]
+        for i in range(suffix.count("{")):
+            suffix = suffix.replace("{" + str(i) + "}", "{p" + str(i) + "}")
+        return config.api_suffix + op.command + suffix
+
+    async def delay_or_fail():
+        if config.latency > 0 or config.latency_jitter > 0:
+            await asyncio.sleep(config.latency + random.random() * config.latency_jitter)
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            raise HTTPException(status_code=config.error_status, detail="Injected error")
+
+    @app.api_route(route(Ops.messageInitializeApplication), methods=[Ops.messageInitializeApplication.method])
+    async def initialize_application(p0: str):
+        await delay_or_fail()
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.messageRegisterApplication), methods=[Ops.messageRegisterApplication.method])
+    async def register_application(p0: str, request: Request):
+        await delay_or_fail()
+        await request.body()
+        provisioned[p0] = True
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.messageHeartbeatApplication), methods=[Ops.messageHeartbeatApplication.method])
+    async def heartbeat_application(p0: str, request: Request):
+        await delay_or_fail()
+        await request.json()
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.messageExtractConfiguration), methods=[Ops.messageExtractConfiguration.method])
+    async def extract_configuration(p0: str):
+        await delay_or_fail()
+        return Response(content=b"", media_type="application/gzip")
+
+    @app.api_route(route(Ops.messageCheckProvision), methods=[Ops.messageCheckProvision.method])
+    async def check_provision(p0: str):
+        await delay_or_fail()
+        return {"hasNewConfig": provisioned.get(p0, True)}
+
+    @app.api_route(route(Ops.messageValidateProvision), methods=[Ops.messageValidateProvision.method])
+    async def validate_provision(p0: str, request: Request):
+        await delay_or_fail()
+        await request.json()
+        provisioned[p0] = False
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.messageCreateGeneralDatapoints), methods=[Ops.messageCreateGeneralDatapoints.method])
+    async def create_general_datapoints(p0: str, request: Request):
+        await delay_or_fail()
+        body = await request.json()
+        return [store.read(topic) for topic in body.get("topics", []) if store.read(topic) is not None]
+
+    @app.api_route(route(Ops.messageRead), methods=[Ops.messageRead.method])
+    async def message_read(request: Request):
+        await delay_or_fail()
+        body = await request.json()
+        rtn = []
+        for topic in body.get("topics", []):
+            item = store.read(topic)
+            if item is None:
+                raise HTTPException(status_code=404, detail=f"Topic {topic} not found")
+            rtn.append(item)
+        return rtn
+
+    @app.api_route(route(Ops.messageReadAdvanced), methods=[Ops.messageReadAdvanced.method])
+    async def message_read_advanced(request: Request):
+        await delay_or_fail()
+        body = await request.json()
+        rtn = []
+        for topic in body.get("topics", []):
+            item = store.read_advanced(topic)
+            if item is None:
+                # the real server answers an empty list when any topic is unknown
+                return []
+            rtn.append(item)
+        return rtn
+
+    @app.api_route(route(Ops.messageWrite), methods=[Ops.messageWrite.method])
+    async def message_write(request: Request):
+        await delay_or_fail()
+        for item in await request.json():
+            store.write(item)
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.messageWriteAdvanced), methods=[Ops.messageWriteAdvanced.method])
+    async def message_write_advanced(request: Request):
+        await delay_or_fail()
+        for item in await request.json():
+            store.write_advanced(item)
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.deleteAllSubscriptions), methods=[Ops.deleteAllSubscriptions.method])
+    async def delete_all_subscriptions(p0: str):
+        await delay_or_fail()
+        if subscriptions.pop(p0, None) is None:
+            return Response(status_code=404)
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.simpleMessageSubscribe), methods=[Ops.simpleMessageSubscribe.method])
+    async def simple_message_subscribe(p0: str, p1: str, request: Request):
+        await delay_or_fail()
+        subscriptions.setdefault(p0, []).append((p1, request.query_params.get("callbackapi")))
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.setOfMessagesSubscribe), methods=[Ops.setOfMessagesSubscribe.method])
+    async def set_of_messages_subscribe(p0: str, request: Request):
+        await delay_or_fail()
+        body = await request.json()
+        subscriptions.setdefault(p0, []).extend((topic, body.get("callbackAPi")) for topic in body.get("topics", []))
+        return Response(status_code=200)
+
+    @app.api_route(route(Ops.advancedMessagesSubscribe), methods=[Ops.advancedMessagesSubscribe.method])
+    async def advanced_messages_subscribe(p0: str, request: Request):
+        await delay_or_fail()
+        body = await request.json()
+        subscriptions.setdefault(p0, []).extend((topic, body.get("callbackAPi")) for topic in body.get("topics", []))
+        return Response(status_code=200)
+
+    return app
+
+class MockServer(object):
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.server = None
+        self.process = None
+
+    @property
+    def url(self):
+        if self.config.uds != "":
+            return f"unix://{self.config.uds}:{self.config.api_suffix}"
+        return f"http://{self.config.host}:{self.config.port}{self.config.api_suffix}"
+
+    def run(self):
+        if self.config.uds != "":
+            config = uvicorn.Config(create_app(self.config), uds=self.config.uds, log_level=self.config.log_level)
+        else:
+            config = uvicorn.Config(create_app(self.config), host=self.config.host, port=self.config.port, log_level=self.config.log_level)
+        self.server = uvicorn.Server(config)
+        self.server.run()
+
+    def start(self):
+        #
+        # Run in a thread of this process (shares the GIL with the caller)
+        #
+        thread = Thread(target=self.run, daemon=True)
+        thread.start()
+        while self.server is None or not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def start_process(self):
+        #
+        # Run in a child process so client-side CPU measurements exclude the server
+        #
+        self.process = Process(target=self.run, daemon=True)
+        self.process.start()
+        if self.config.uds != "":
+            wait_for_socket(self.config.uds)
+        else:
+            wait_for_port(self.config.host, self.config.port)
+        return self
+
+    def exit(self):
+        if self.server is not None:
+            self.server.should_exit = True
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+def wait_for_port(host, port, timeout=10.0):
+    import socket
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    raise Exception (f"mock server did not start on {host}:{port}")
+
+def wait_for_socket(path, timeout=10.0):
+    import socket
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.2)
+                sock.connect(path)
+                return True
+        except OSError:
+            time.sleep(0.05)
+    raise Exception (f"mock server did not start on {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="HCC2 REST stand-in server")
+    parser.add_argument("--host", default=MockConfig().host)
+    parser.add_argument("--port", type=int, default=MockConfig().port)
+    parser.add_argument("--uds", default="", help="listen on this unix domain socket instead of host:port")
+    parser.add_argument("--topics", type=int, default=MockConfig().topics)
+    parser.add_argument("--datapoints", type=int, default=MockConfig().datapoints)
+    parser.add_argument("--samples", type=int, default=MockConfig().samples)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per call, seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="uniform random extra latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=MockConfig().error_status)
+    parser.add_argument("--autocreate-topics", action="store_true", help="answer reads of unknown topics instead of failing")
+    args = parser.parse_args()
+    config = MockConfig(host=args.host, port=args.port, uds=args.uds, topics=args.topics, datapoints=args.datapoints, samples=args.samples,
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate, error_status=args.error_status,
+        autocreate_topics=args.autocreate_topics, log_level="info")
+    MockServer(config).run()
+
+if __name__ == "__main__":
+    main()
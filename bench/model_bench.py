@@ -0,0 +1,169 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Encode/decode microbenchmarks for the models in classes/api_classes.py.
+# Measures time (timeit) and memory (tracemalloc) per object, for single
+# objects and batches, and compares against a stored baseline.
+#
+#   python -m bench.model_bench                     # compare against the baseline
+#   python -m bench.model_bench --update-baseline   # store a new baseline
+#
+import argparse
+from datetime import datetime
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+import warnings
+from typing import List
+from pydantic import TypeAdapter
+
+from classes.api_classes import GetDatapoint, MessageOutboundInterchange, MessageReadAdvancedResp, MessageWriteReq, SetDatapoint, TvqtDataPoint
+from classes.enums import quality_enum
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "model_bench.json")
+TIMESTAMP = "1700000000123456"
+
+#
+# Inputs: each factory returns n raw objects in the form the model receives them
+#
+def tvqt_inputs(n):
+    now = datetime.now()
+    return [{"topic": f"liveValue.bench.this.model.0.t{i}.", "value": float(i), "quality": quality_enum.OK, "timeStamp": now} for i in range(n)]
+
+def set_datapoint_inputs(n):
+    now = datetime.now()
+    return [{"dataPointName": "", "quality": quality_enum.OK, "timeStamps": [now], "values": [float(i)]} for i in range(n)]
+
+def get_datapoint_inputs(n):
+    return [{"dataPointName": "total.", "quality": 192, "timeStamps": [TIMESTAMP], "values": [float(i)]} for i in range(n)]
+
+def interchange_inputs(n):
+    return [{"topic": f"liveValue.bench.this.model.0.t{i}.", "value": float(i), "msgSource": "REST", "quality": 192, "timeStamp": TIMESTAMP} for i in range(n)]
+
+def read_advanced_inputs(n):
+    return [{"topic": f"liveValue.bench.this.model.0.t{i}.", "msgSource": "REST", "datapoints": get_datapoint_inputs(2)} for i in range(n)]
+
+def write_req_inputs(n):
+    return [TvqtDataPoint(**item) for item in tvqt_inputs(n)]
+
+def validate(adapter):
+    return lambda items: adapter.validate_python(items)
+
+def dump_json(adapter):
+    # the quality validators store plain ints in quality_enum fields, so skip the serializer warnings
+    return lambda models: adapter.dump_json(models, warnings=False)
+
+def build_write_req(tvqt_list):
+    return [MessageWriteReq(tvqt.topic, tvqt.value, "REST", tvqt.quality, tvqt.timeStamp) for tvqt in tvqt_list]
+
+def encode_write_req(pl_array):
+    # same encoding as APIMessageWrite.Build_payload
+    return json.dumps([pl.dict() for pl in pl_array])
+
+#
+# name -> (input factory, decode, encode). decode turns the raw inputs into models,
+# encode turns the decoded models into the JSON the client sends or the server returns.
+#
+def build_cases():
+    cases = {}
+    for name, model, factory in (
+        ("TvqtDataPoint", TvqtDataPoint, tvqt_inputs),
+        ("SetDatapoint", SetDatapoint, set_datapoint_inputs),
+        ("GetDatapoint", GetDatapoint, get_datapoint_inputs),
+        ("MessageOutboundInterchange", MessageOutboundInterchange, interchange_inputs),
+        ("MessageReadAdvancedResp", MessageReadAdvancedResp, read_advanced_inputs),
+    ):
+        adapter = TypeAdapter(List[model])
+        cases[name] = (factory, validate(adapter), dump_json(adapter))
+    cases["MessageWriteReq"] = (write_req_inputs, build_write_req, encode_write_req)
+    return cases
+
+def measure_time(func, arg, min_time):
+    timer = timeit.Timer(lambda: func(arg))
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=3, number=number))
+    return best / number
+
+def measure_memory(func, arg):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        snapshot_before = tracemalloc.take_snapshot()
+        result = func(arg)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot_after = tracemalloc.take_snapshot()
+        blocks = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, "filename") if stat.count_diff > 0)
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - before, current - before, blocks
+
+def run(sizes, min_time, only):
+    results = {}
+    for name, (factory, decode, encode) in build_cases().items():
+        if only and name not in only:
+            continue
+        for size in sizes:
+            raw = factory(size)
+            models = decode(raw)
+            for direction, func, arg in (("decode", decode, raw), ("encode", encode, models)):
+                seconds = measure_time(func, arg, min_time)
+                peak, retained, blocks = measure_memory(func, arg)
+                key = f"{name}.{direction}.{size}"
+                results[key] = {
+                    "us_per_object": seconds / size * 1e6,
+                    "peak_bytes_per_object": peak / size,
+                    "retained_bytes_per_object": retained / size,
+                    "blocks_per_object": blocks / size,
+                }
+                print(f"{key:48} {results[key]['us_per_object']:10.3f} us/obj  {results[key]['peak_bytes_per_object']:10.1f} B peak/obj  "
+                      f"{results[key]['blocks_per_object']:8.2f} blocks/obj", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in ("us_per_object", "peak_bytes_per_object"):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {base[metric]:.3f} -> {result[metric]:.3f} (+{(result[metric] / base[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="api_classes model microbenchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing repeat")
+    parser.add_argument("--only", nargs="*", default=[], help="restrict to these models")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    results = run(args.sizes, args.min_time, args.only)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump({"python": sys.version.split()[0], "results": results}, fh, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline")
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Replays a traffic capture (see classes/capture.py) with its original timing.
+#
+#   --target client   sends the captured API requests to the stand-in server (or --url)
+#   --target webhook  posts the captured callbacks to a local WebHook (or --webhook-url)
+#
+# --scale N replays N concurrent copies of the capture and --speed compresses time.
+#
+#   python -m bench.replay capture.jsonl --target client --scale 10 --speed 2 --json bench_replay.json
+#
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import logging
+import queue
+from threading import Lock, Thread
+import time
+from urllib.parse import urlsplit
+import requests
+
+from apiclient import new_session
+from bench.client_bench import percentile
+from bench.mock_server import MockConfig, MockServer, wait_for_port
+from classes.api_classes import APIBase
+from classes.unix_transport import is_unix_url, split_unix_url
+from config.apiconfig import ApiConfig, Operation
+
+class APIReplay(APIBase):
+
+    def Request(self, origin: str, record: dict, cfg: ApiConfig):
+        self.url = origin + record["path"]
+        self.operation = record["method"]
+        self.Build_headers("Content-Type", "application/json")
+        op = Operation(name=record["op"], method=record["method"], command=record["path"], suffix="")
+        if record.get("body") is not None:
+            data_response = self.Send(op, cfg, data=record["body"], headers=self.headers)
+        else:
+            data_response = self.Send(op, cfg, headers=self.headers)
+        return data_response.ok
+
+def load_capture(path, kind):
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip() == "":
+                continue
+            record = json.loads(line)
+            if record.get("kind") == kind:
+                records.append(record)
+    records.sort(key=lambda record: record["t"])
+    return records
+
+def origin_of(url):
+    # captured paths start at the HTTP path, so a unix origin ends with the colon after the socket path
+    if is_unix_url(url):
+        return f"unix://{split_unix_url(url)[0]}:"
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def start_local_webhook(port):
+    from classes.webhook import WebHook
+    from config.appconfig import AppConfig
+    from lib.webhookfuncs import dequeue
+    config = AppConfig()
+    config.wh.host = "127.0.0.1"
+    config.wh.port = port
+    whq = queue.Queue()
+    wh = WebHook(logger=logging.getLogger("replay"), queue=whq, config=config)
+    Thread(target=wh.run, daemon=True).start()
+    wait_for_port("127.0.0.1", port)
+
+    def drain():
+        while True:
+            time.sleep(0.5)
+            dequeue(whq)
+    Thread(target=drain, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+def replay(records, send, scale, speed, workers):
+    latencies = []
+    lags = []
+    errors = [0]
+    lock = Lock()
+
+    def call(record):
+        start = time.perf_counter()
+        try:
+            ok = send(record)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if not ok:
+                errors[0] += 1
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            due = start + record["t"] / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lags.append(max(0.0, -delay))
+            for _ in range(scale):
+                pool.submit(call, record)
+    wall = time.perf_counter() - start
+    latencies.sort()
+    lags.sort()
+    return {
+        "sent": len(latencies),
+        "errors": errors[0],
+        "wall_s": wall,
+        "rate_per_sec": len(latencies) / wall if wall > 0 else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "schedule_lag_p99_ms": percentile(lags, 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic capture")
+    parser.add_argument("capture")
+    parser.add_argument("--target", choices=["client", "webhook"], default="client")
+    parser.add_argument("--url", default="", help="API url to replay against (default: start the stand-in server)")
+    parser.add_argument("--webhook-url", default="", help="webhook origin, e.g. http://127.0.0.1:8100 (default: start a local WebHook)")
+    parser.add_argument("--port", type=int, default=17071)
+    parser.add_argument("--scale", type=int, default=1, help="concurrent copies of the capture")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--json", default="", help="write results to this file")
+    args = parser.parse_args()
+
+    server = None
+    if args.target == "client":
+        records = load_capture(args.capture, "api")
+        url = args.url
+        if url == "":
+            server = MockServer(MockConfig(port=args.port, topics=0, autocreate_topics=True)).start_process()
+            url = server.url
+        origin = origin_of(url)
+        cfg = ApiConfig(api_url=url)
+        # the client session, so that unix:// URLs are routed to the socket
+        session = new_session()
+        send = lambda record: APIReplay(session=session).Request(origin, record, cfg)
+    else:
+        records = load_capture(args.capture, "callback")
+        origin = args.webhook_url if args.webhook_url != "" else start_local_webhook(args.port)
+        session = requests.Session()
+        send = lambda record: session.post(origin + record["path"], data=record["body"], headers={"Content-Type": "application/json"}, timeout=10).ok
+
+    try:
+        report = replay(records, send, args.scale, args.speed, args.workers)
+    finally:
+        if server is not None:
+            server.exit()
+    report.update({"timestamp": datetime.now().isoformat(), "capture": args.capture, "target": args.target, "records": len(records), "scale": args.scale, "speed": args.speed})
+    for key, value in report.items():
+        print(f"{key:20} {value}")
+    if args.json != "":
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Cold start budget check. Starts the local stand-in server, then runs
+# `app.py --profile-startup` against it a few times and fails (exit 1) when the
+# median time to the first successful messageRead, or the median import time,
+# exceeds its budget.
+#
+#   python -m bench.startup_check --budget 3.0 --import-budget 1.5
+#
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench.mock_server import MockConfig, MockServer
+from config.apiconfig import EnvVariables
+
+def run_once(url, timeout):
+    env = dict(os.environ)
+    env[EnvVariables().api_url] = url
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "app.py", "--profile-startup"], env=env, capture_output=True, text=True, timeout=timeout)
+    wall = time.perf_counter() - start
+    reports = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if completed.returncode != 0 or not reports:
+        raise Exception (f"app.py --profile-startup failed ({completed.returncode}): {completed.stderr[-2000:]}")
+    report = json.loads(reports[-1])
+    report["wall_s"] = wall
+    return report
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="cold start budget check")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds from process start to the first successful messageRead")
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds spent importing modules")
+    parser.add_argument("--port", type=int, default=17072)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", default="", help="write the reports to this file")
+    args = parser.parse_args()
+
+    server = MockServer(MockConfig(port=args.port, autocreate_topics=True)).start_process()
+    try:
+        reports = [run_once(server.url, args.timeout) for _ in range(args.runs)]
+    finally:
+        server.exit()
+
+    # measured in app.py once connect() succeeds, so interpreter teardown is left out
+    first_read = median([report["marks"]["first_message_read"] for report in reports])
+    wall = median([report["wall_s"] for report in reports])
+    imports = median([report["import_total_s"] for report in reports])
+    print(f"cold start to first messageRead: {first_read:.3f} s (budget {args.budget:.3f} s)")
+    print(f"process wall time:               {wall:.3f} s")
+    print(f"module imports:                  {imports:.3f} s (budget {args.import_budget:.3f} s)")
+    print("slowest modules (self time, last run):")
+    for module in reports[-1]["slowest"][:10]:
+        print(f"  {module['self_ms']:8.1f} ms  {module['module']}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(reports, fh, indent=2)
+
+    failed = False
+    if first_read > args.budget:
+        print(f"OVER BUDGET: cold start {first_read:.3f} s > {args.budget:.3f} s")
+        failed = True
+    if imports > args.import_budget:
+        print(f"OVER BUDGET: imports {imports:.3f} s > {args.import_budget:.3f} s")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
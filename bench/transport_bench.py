@@ -0,0 +1,114 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Latency of the TCP loopback and unix domain socket transports, for both
+# directions: APIClient calls to the stand-in server, and callbacks posted
+# to the webhook server. Each server runs in a child process.
+#
+#   python -m bench.transport_bench --topics 1 100 --duration 2 --json bench_transport.json
+#
+import argparse
+from datetime import datetime
+import json
+import logging
+from multiprocessing import Process
+import os
+import queue
+import tempfile
+
+from apiclient import APIClient, new_session
+from bench.client_bench import run_operation
+from bench.mock_server import MockConfig, MockServer, wait_for_port, wait_for_socket
+from config.apiconfig import ApiConfig
+from config.appconfig import AppConfig
+
+APP_NAME = "benchApp"
+
+def run_webhook(port, callback_url):
+    #
+    # In the child: the webhook listens where the callback URL points to
+    #
+    from classes.webhook import WebHook
+    config = AppConfig()
+    config.wh.host = "127.0.0.1"
+    config.wh.port = port
+    config.metrics.enabled = False
+    WebHook(logger=logging.getLogger("transport_bench"), queue=queue.Queue(), config=config, callback_url=callback_url).run()
+
+def api_results(transport, url, topic_counts, args):
+    client = APIClient(app_name=APP_NAME)
+    client.cfg = ApiConfig(api_url=url)
+    topic_format = MockConfig().topic_format
+    results = []
+    for count in topic_counts:
+        topics = [topic_format.format(i) for i in range(count)]
+        result = run_operation(lambda: client.messageRead(topics), args.duration, args.min_calls, args.warmup)
+        result.update({"transport": transport, "operation": "messageRead", "topics": count})
+        results.append(result)
+    result = run_operation(lambda: client.heartbeatApp(True), args.duration, args.min_calls, args.warmup)
+    result.update({"transport": transport, "operation": "heartbeatApp", "topics": 0})
+    results.append(result)
+    return results
+
+def webhook_results(transport, callback_url, args):
+    session = new_session()
+    url = callback_url + "/" + AppConfig().wh.set_of_messages.command
+    payload = {"topic": "liveValue.bench.this.transport.0.t0.", "value": 1.0, "msgSource": "REST", "quality": 192, "timeStamp": "1700000000000000"}
+    def post():
+        response = session.post(url, json=payload, timeout=5)
+        response.raise_for_status()
+    result = run_operation(post, args.duration, args.min_calls, args.warmup)
+    result.update({"transport": transport, "operation": "webhook set_of_messages", "topics": 1})
+    return [result]
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP vs unix domain socket transport benchmark")
+    parser.add_argument("--port", type=int, default=17073, help="stand-in server TCP port")
+    parser.add_argument("--webhook-port", type=int, default=18101)
+    parser.add_argument("--topics", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per operation and transport")
+    parser.add_argument("--min-calls", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--json", default="", help="write results to this file")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="transport_bench")
+    suffix = AppConfig().wh.suffix.rstrip("/")
+    transports = {
+        "tcp": (MockConfig(port=args.port, topics=max(args.topics)), f"http://127.0.0.1:{args.webhook_port}{suffix}"),
+        "unix": (MockConfig(uds=os.path.join(folder, "rest.sock"), topics=max(args.topics)), f"unix://{os.path.join(folder, 'webhook.sock')}:{suffix}"),
+    }
+    results = []
+    for transport, (mock_config, callback_url) in transports.items():
+        server = MockServer(mock_config).start_process()
+        try:
+            results += api_results(transport, server.url, args.topics, args)
+        finally:
+            server.exit()
+        webhook = Process(target=run_webhook, args=(args.webhook_port, callback_url), daemon=True)
+        webhook.start()
+        try:
+            if transport == "unix":
+                wait_for_socket(os.path.join(folder, "webhook.sock"))
+            else:
+                wait_for_port("127.0.0.1", args.webhook_port)
+            results += webhook_results(transport, callback_url, args)
+        finally:
+            webhook.terminate()
+            webhook.join()
+
+    for result in results:
+        print(f"{result['transport']:5} {result['operation']:24} topics={result['topics']:<5} {result['ops_per_sec']:9.1f} ops/s  "
+              f"p50={result['p50_ms']:8.3f} ms  p99={result['p99_ms']:8.3f} ms  cpu={result['cpu_ms_per_call']:7.3f} ms/call  errors={result['errors']}")
+    for operation, topics in sorted({(result["operation"], result["topics"]) for result in results}):
+        p50 = {result["transport"]: result["p50_ms"] for result in results if result["operation"] == operation and result["topics"] == topics}
+        if p50.get("tcp") and p50.get("unix"):
+            print(f"unix vs tcp  {operation:24} topics={topics:<5} p50 {100.0 * (p50['unix'] - p50['tcp']) / p50['tcp']:+6.1f} %")
+    if args.json != "":
+        with open(args.json, "w") as fh:
+            json.dump({"timestamp": datetime.now().isoformat(), "results": results}, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
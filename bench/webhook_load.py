@@ -0,0 +1,193 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Load generator and ingest benchmark for the WebHook server.
+# Replays simple_message, set_of_messages and advanced_messages callbacks at a
+# configurable rate and concurrency, while a consumer drains the ingest queue
+# the way app.py does. Reports accepted callbacks/sec, latency from POST to
+# dequeue and growth of the ingest queue and process memory.
+#
+#   python -m bench.webhook_load --rate 2000 --concurrency 16 --duration 10 --json bench_webhook.json
+#
+import argparse
+from datetime import datetime
+import json
+import logging
+from multiprocessing import Process, Queue as ProcessQueue
+import queue
+import random
+import resource
+from threading import Thread
+import time
+import requests
+
+from bench.client_bench import percentile
+from bench.mock_server import wait_for_port
+from classes.webhook import WebHook
+from config.appconfig import AppConfig
+from lib.timestamps import to_us
+from lib.webhookfuncs import dequeue
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def zipf_topics(count, exponent):
+    #
+    # Cumulative weights for a Zipf-like topic popularity (a few hot topics, a long tail)
+    #
+    topics = [f"liveValue.bench.this.load.0.t{i}." for i in range(count)]
+    weights = [1.0 / ((i + 1) ** exponent) for i in range(count)]
+    return topics, weights
+
+def now_us():
+    return str(time.time_ns() // 1000)
+
+def build_payload(kind, topic, args):
+    if kind == "advanced_messages":
+        ts = now_us()
+        return {"topic": topic, "msgSource": "REST", "datapoints": [
+            {"dataPointName": f"dp{d}.", "quality": 192,
+             "timeStamps": [ts] * args.samples,
+             "values": [random.random() for _ in range(args.samples)]} for d in range(args.datapoints)]}
+    value = "x" * args.value_size if args.value_size > 0 else random.random()
+    return {"topic": topic, "value": value, "msgSource": "REST", "quality": 192, "timeStamp": now_us()}
+
+def generator(args, worker_id, results):
+    #
+    # Open-loop sender: every thread sends at rate / (processes * concurrency)
+    #
+    base_url = f"http://127.0.0.1:{args.port}{AppConfig().wh.suffix}"
+    kinds = [kind for kind, weight in zip(("simple_message", "set_of_messages", "advanced_messages"), args.mix) for _ in range(weight)]
+    topics, weights = zipf_topics(args.topics, args.zipf)
+    interval = args.processes * args.concurrency / args.rate
+    counts = []
+
+    def sender(index):
+        session = requests.Session()
+        rng = random.Random(worker_id * 1000 + index)
+        accepted = rejected = 0
+        start = time.perf_counter()
+        next_send = start + rng.random() * interval
+        while next_send - start < args.duration:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choice(kinds)
+            topic = rng.choices(topics, weights)[0]
+            try:
+                response = session.post(base_url + kind, json=build_payload(kind, topic, args), timeout=5)
+                if response.ok:
+                    accepted += 1
+                else:
+                    rejected += 1
+            except requests.exceptions.RequestException:
+                rejected += 1
+            next_send += interval
+        counts.append((accepted, rejected))
+
+    threads = [Thread(target=sender, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((sum(c[0] for c in counts), sum(c[1] for c in counts)))
+
+def consumer(whq, args, stats, stop):
+    #
+    # Drain the queue once per period, like the app.py inner loop
+    #
+    while not stop["done"]:
+        time.sleep(args.consumer_period)
+        stats["queue_peak"] = max(stats["queue_peak"], whq.qsize())
+        stats["rss_peak"] = max(stats["rss_peak"], rss_bytes())
+        now = time.time()
+        for pl in dequeue(whq):
+            if hasattr(pl, "datapoints"):
+                ts = pl.datapoints[0].timeStamps[0] if pl.datapoints and pl.datapoints[0].timeStamps else None
+            else:
+                ts = pl.timeStamp
+            us = to_us(ts)
+            if us is not None:
+                stats["latencies"].append(now - us / 1000000)
+            stats["dequeued"] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="WebHook load generator")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--rate", type=float, default=1000.0, help="total callbacks per second")
+    parser.add_argument("--concurrency", type=int, default=8, help="sender threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="sender processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", type=int, nargs=3, default=[1, 1, 1], metavar=("SIMPLE", "SET", "ADVANCED"), help="relative weights of each callback kind")
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("--zipf", type=float, default=1.1, help="topic popularity exponent (0 = uniform)")
+    parser.add_argument("--value-size", type=int, default=0, help="string value length for simple callbacks (0 = float)")
+    parser.add_argument("--datapoints", type=int, default=2, help="datapoints per advanced callback")
+    parser.add_argument("--samples", type=int, default=1, help="values per advanced datapoint")
+    parser.add_argument("--consumer-period", type=float, default=1.0, help="seconds between queue drains")
+    parser.add_argument("--json", default="", help="write results to this file")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("webhook_load")
+    config = AppConfig()
+    config.wh.host = "127.0.0.1"
+    config.wh.port = args.port
+    whq = queue.Queue()
+    wh = WebHook(logger=logger, queue=whq, config=config)
+    Thread(target=wh.run, daemon=True).start()
+    wait_for_port("127.0.0.1", args.port)
+
+    stats = {"latencies": [], "dequeued": 0, "queue_peak": 0, "rss_peak": 0}
+    stop = {"done": False}
+    rss_start = rss_bytes()
+    drain = Thread(target=consumer, args=(whq, args, stats, stop), daemon=True)
+    drain.start()
+
+    results = ProcessQueue()
+    start = time.perf_counter()
+    senders = [Process(target=generator, args=(args, i, results)) for i in range(args.processes)]
+    for sender in senders:
+        sender.start()
+    counts = [results.get() for _ in senders]
+    for sender in senders:
+        sender.join()
+    elapsed = time.perf_counter() - start
+    #
+    # let the consumer catch up with what is still queued
+    #
+    time.sleep(args.consumer_period * 2)
+    stop["done"] = True
+    drain.join()
+
+    accepted = sum(c[0] for c in counts)
+    latencies = sorted(stats["latencies"])
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+        "accepted": accepted,
+        "rejected": sum(c[1] for c in counts),
+        "accepted_per_sec": accepted / elapsed,
+        "dequeued": stats["dequeued"],
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "queue_peak": stats["queue_peak"],
+        "rss_start_bytes": rss_start,
+        "rss_peak_bytes": stats["rss_peak"],
+        "rss_growth_bytes": stats["rss_peak"] - rss_start,
+    }
+    for key, value in report.items():
+        if key != "config":
+            print(f"{key:20} {value}")
+    if args.json != "":
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
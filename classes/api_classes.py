@@ -5,17 +5,23 @@
 #  
 # Python client interface for HCC2 SDK 2.0
 #
-from datetime import datetime, timedelta
 import json
 import os
-from typing import List
+import time
+from typing import ClassVar, List, Optional
 from pydantic import BaseModel, TypeAdapter, field_validator
 import requests
+from urllib3.exceptions import NewConnectionError
 from http import HTTPStatus
 
+from classes.circuit_breaker import CircuitBreakers, CircuitOpenError
 from classes.enums import quality_enum
-from config.apiconfig import ApiConfig, Ops
-from lib.miscfuncs import convert_datetime_to_UTC, convert_datetime_to_unix_time
+from classes.metrics import registry as metrics
+from classes.request_hooks import RequestHooks, RequestTrace
+from config.apiconfig import ApiConfig, Operation, Ops
+from lib.jsonstream import JsonStream
+from lib.miscfuncs import jittered_backoff
+from lib.timestamps import to_us, us_to_datetime
 
 class MessageHeatbeatReq(BaseModel):
     isUp: bool
@@ -30,7 +36,7 @@ class TvqtDataPoint(BaseModel):
     topic: str
     value: object
     quality: quality_enum
-    timeStamp: datetime
+    timeStamp: int                  # microseconds since the epoch; datetimes are accepted
 
     @field_validator('quality', mode='after')
     def convert_quality(cls, value):
@@ -38,11 +44,10 @@ class TvqtDataPoint(BaseModel):
             return value.value
         return value
 
-    @field_validator('timeStamp', mode='after')
+    @field_validator('timeStamp', mode='before')
     def convert_timeStamp(cls, value):
-        if isinstance(value, datetime):
-            return str(convert_datetime_to_unix_time(convert_datetime_to_UTC(value))) + "000" # to microseconds
-        return value
+        us = to_us(value)
+        return us if us is not None else value
 
     @classmethod
     def _from_response(cls, response):
@@ -62,14 +67,15 @@ class SetDatapoint(BaseModel):
 
     @field_validator('timeStamps', mode='before')
     def convert_timeStamps(cls, value):
-        if isinstance(value, list) and all(isinstance(i, datetime) for i in value):
-            return [str(convert_datetime_to_unix_time(i)) + "000" for i in value]
+        # ints or datetimes to the "<seconds><6 digit microseconds>" strings of the API
+        if isinstance(value, list):
+            return [str(us) if (us := to_us(i)) is not None else i for i in value]
         return value
 
 class GetDatapoint(BaseModel):
     dataPointName: str
     quality: int 
-    timeStamps: list[str]
+    timeStamps: list[int]           # microseconds since the epoch
     values: list[object]
 
     @field_validator('quality', mode='after')
@@ -78,24 +84,15 @@ class GetDatapoint(BaseModel):
             return quality_enum(value)
         return value
 
-    @field_validator('timeStamps', mode='after')
-    def convert_timeStamps(cls, value):
-        if all(isinstance(i, str) for i in value):
-            newvals=[]
-            for val in value:
-                seconds = int(val[:-6])
-                microseconds = int(val[-6:])
-                val = datetime.fromtimestamp(seconds) + timedelta(microseconds=microseconds)
-                newvals.append(val)
-            return newvals
-        return value
+    def datetimes(self):
+        return [us_to_datetime(us) for us in self.timeStamps]
 
 class MessageOutboundInterchange(BaseModel):
     topic: str = ""
     value:object = {}
     msgSource: str = ""
     quality: int = 0
-    timeStamp: str = ""
+    timeStamp: Optional[int] = None # microseconds since the epoch
 
     @field_validator('quality', mode='after')
     def convert_quality(cls, value):
@@ -103,14 +100,15 @@ class MessageOutboundInterchange(BaseModel):
             return quality_enum(value)
         return value
 
-    @field_validator('timeStamp', mode='after')
+    @field_validator('timeStamp', mode='before')
     def convert_timeStamp(cls, value):
-        if isinstance(value, str):
-            seconds = int(value[:-6])
-            microseconds = int(value[-6:])
-            return (datetime.fromtimestamp(seconds) + timedelta(microseconds=microseconds))
+        if value == "":
+            return None
         return value
 
+    def to_datetime(self):
+        return us_to_datetime(self.timeStamp) if self.timeStamp is not None else None
+
 class MessageReadReq (BaseModel):
     topics: list[str] = []
     includeOptional: bool = True
@@ -134,6 +132,8 @@ class MessageReadAdvancedResp (BaseModel):
     datapoints: list[GetDatapoint]
 
 class MessageWriteReq(MessageOutboundInterchange):
+    timeStamp: str = ""
+
     def __init__(self, topic, value, msgSource, quality, timestamp):
         super().__init__()
         self.topic = topic
@@ -155,12 +155,30 @@ class MessageWriteAdvancedReqVar(BaseModel):
     name: str
     value: object
 
+def not_sent(error):
+    #
+    # True when the request failed before reaching the server
+    #
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], "reason", error.args[0]), NewConnectionError)
+
 class APIBase (BaseModel):
     url: str = ""
     headers: str = ""
     payload: str = ""
     headers: str = ""
     operation: str = ""
+    hooks: Optional[RequestHooks] = None
+    trace: Optional[RequestTrace] = None
+    session: Optional[requests.Session] = None
+    breakers: Optional[CircuitBreakers] = None
+    retry_timeouts: bool = True
+
+    class Config:
+        arbitrary_types_allowed = True
 
     def Build_url(self, api_url, api_suffix):
         self.url = "{0}{1}".format(api_url, api_suffix)
@@ -177,6 +195,106 @@ class APIBase (BaseModel):
     def Request(self):
         pass
 
+    def Emit(self, stage, size=0):
+        #
+        # Report a lifecycle stage to the request hooks (see classes/request_hooks.py)
+        #
+        if self.hooks is None or not self.hooks.hooks:
+            return
+        if self.trace is None or stage in self.trace.timestamps:
+            self.trace = RequestTrace(type(self).__name__, self)
+        self.trace.mark(stage, size)
+        self.hooks.emit(stage, self.trace)
+
+    def Decode_response(self, data_response, decode):
+        #
+        # decode(parsed body) -> models. "decoded" is emitted even when decoding
+        # fails, so the hooks never keep a request in flight.
+        #
+        count = 0
+        try:
+            rtn = decode(data_response.json())
+            count = len(rtn) if isinstance(rtn, list) else 0
+            return rtn
+        finally:
+            self.Emit("decoded", count)
+
+    def Serialize(self, *args):
+        self.Emit("before_serialize")
+        self.Build_payload(*args)
+        self.Emit("after_serialize", len(self.payload))
+
+    def Send(self, op: Operation, cfg: ApiConfig, decode: bool = False, consume: bool = True, **kwargs):
+        #
+        # Single exit point to the REST server. Calls go through the endpoint's
+        # circuit breaker; connection errors and 5xx answers are retried with
+        # jittered exponential backoff while the shared retry budget allows it.
+        # Operations that are not idempotent (writes, subscriptions...) are only
+        # retried when the connection could not be opened, so the server cannot
+        # have applied them.
+        # Uploads (files=) are never retried since their file handle is consumed,
+        # and timeouts are not retried with retry_timeouts=False (chunked reads
+        # react to them by shrinking the chunk).
+        #
+        breaker = self.breakers.get(op.name) if self.breakers is not None else None
+        attempt = 0
+        while True:
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(f"circuit for {op.name} is open")
+            try:
+                data_response = self.SendOnce(op, cfg, decode, consume, **kwargs)
+                failed = data_response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                error = None
+            except requests.exceptions.RequestException as e:
+                failed = True
+                error = e
+            if breaker is not None:
+                breaker.record(not failed)
+            if not failed:
+                if self.breakers is not None:
+                    self.breakers.budget.deposit()
+                return data_response
+            retry = not (isinstance(error, requests.exceptions.Timeout) and not self.retry_timeouts) and (op.idempotent or not_sent(error))
+            if self.breakers is None or "files" in kwargs or not retry or attempt >= cfg.api_retries or not self.breakers.budget.withdraw():
+                if error is not None:
+                    raise error
+                return data_response
+            if error is None:
+                data_response.close()
+            time.sleep(jittered_backoff(attempt, cfg.api_retry_base, cfg.api_retry_cap))
+            attempt += 1
+
+    def SendOnce(self, op: Operation, cfg: ApiConfig, decode: bool = False, consume: bool = True, **kwargs):
+        #
+        # One request; records per-operation metrics.
+        # Requests that validate the response into models pass decode=True and
+        # emit the "decoded" stage themselves.
+        # consume=False leaves a successful body unread, for streaming decoders:
+        # the latency is then measured to the headers, and the body size is added by
+        # the reader with metrics.add_response_bytes (Content-Length is absent when chunked).
+        #
+        data = kwargs.get("data")
+        request_bytes = len(data.encode() if isinstance(data, str) else data) if data else 0
+        self.Emit("sent", request_bytes)
+        start = time.perf_counter()
+        try:
+            transport = self.session if self.session is not None else requests
+            data_response = transport.request(method=op.method, url=self.url, timeout=cfg.api_timeout, stream=True, **kwargs)
+            self.Emit("first_byte")
+            if not consume and data_response.ok:
+                metrics.observe(op.name, time.perf_counter() - start, request_bytes, 0, data_response.status_code)
+                return data_response
+            content = data_response.content
+        except requests.exceptions.RequestException:
+            metrics.observe(op.name, time.perf_counter() - start, request_bytes, 0, "error")
+            self.Emit("decoded")
+            raise
+        metrics.observe(op.name, time.perf_counter() - start, request_bytes, len(content), data_response.status_code)
+        self.Emit("received", len(content))
+        if not decode or not data_response.ok:
+            self.Emit("decoded")
+        return data_response
+
 class APIInitializeApplication(APIBase):
     
     def Build_suffix(self, app_name):
@@ -188,7 +306,7 @@ class APIInitializeApplication(APIBase):
         
         self.Build_headers("accept", "text/plain")
         self.operation = Ops.messageInitializeApplication.method
-        data_response  = requests.request(method=self.operation, url=self.url, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageInitializeApplication, cfg, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -211,7 +329,7 @@ class APIRegisterApplication(APIBase):
         self.payload = {}
         fh = self.Build_fileload(tarfile_path)
         self.operation = Ops.messageRegisterApplication.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, files=self.files, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageRegisterApplication, cfg, data=self.payload, files=self.files)
         fh.close()
         data_response.raise_for_status()
         return data_response.ok
@@ -230,9 +348,9 @@ class APIHeartbeatApplication(APIBase):
         self.url += self.Build_suffix(app_name)
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(up)
+        self.Serialize(up)
         self.operation = Ops.messageHeartbeatApplication.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageHeartbeatApplication, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -247,10 +365,10 @@ class APICheckProvision(APIBase):
         
         self.Build_headers("Content-Type", "application/json")
         self.operation = Ops.messageCheckProvision.method
-        data_response  = requests.request(method=self.operation, url=self.url, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageCheckProvision, cfg, decode=True, headers=self.headers)
         data_response.raise_for_status()
         message_response_adapter = TypeAdapter(MessageCheckStatusResp)
-        response = message_response_adapter.validate_python(data_response.json())
+        response = self.Decode_response(data_response, message_response_adapter.validate_python)
         return response
 
 class APIValidateProvision(APIBase):
@@ -266,9 +384,9 @@ class APIValidateProvision(APIBase):
         self.url += self.Build_suffix(app_name)
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(valid)
+        self.Serialize(valid)
         self.operation = Ops.messageValidateProvision.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageValidateProvision, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -283,7 +401,7 @@ class APIExtractConfiguration(APIBase):
         
         self.Build_headers("Content-Type", "application/gzip")
         self.operation = Ops.messageExtractConfiguration.method
-        data_response  = requests.request(method=self.operation, url=self.url, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageExtractConfiguration, cfg, headers=self.headers)
         data_response.raise_for_status()
         if data_response.status_code == HTTPStatus.OK:
             with open(tarball_file_path, 'wb') as file:
@@ -305,12 +423,12 @@ class APICreateGeneralDataPoints(APIBase):
         self.url += self.Build_suffix()
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(topics)
+        self.Serialize(topics)
         self.operation = Ops.messageCreateGeneralDatapoints.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageCreateGeneralDatapoints, cfg, decode=True, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         message_response_adapter = TypeAdapter(List[MessageReadResp])
-        self.response_array = message_response_adapter.validate_python(data_response.json())
+        self.response_array = self.Decode_response(data_response, message_response_adapter.validate_python)
         return self.response_array
 
 
@@ -331,16 +449,18 @@ class APIMessageRead (APIBase):
         self.url += self.Build_suffix()
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(topics)
+        self.Serialize(topics)
         self.operation = Ops.messageRead.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageRead, cfg, decode=True, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         message_response_adapter = TypeAdapter(List[MessageReadResp])
-        self.response_array = message_response_adapter.validate_python(data_response.json())
+        self.response_array = self.Decode_response(data_response, message_response_adapter.validate_python)
         return self.response_array
 
 class APIMessageReadAdvanced (APIBase):
     response_array: list[MessageReadAdvancedResp] = []
+    response_adapter: ClassVar[TypeAdapter] = TypeAdapter(MessageReadAdvancedResp)
+    datapoint_adapter: ClassVar[TypeAdapter] = TypeAdapter(GetDatapoint)
 
     def Build_suffix(self):
         return Ops.messageReadAdvanced.suffix
@@ -355,14 +475,130 @@ class APIMessageReadAdvanced (APIBase):
         self.url += self.Build_suffix()
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(topics)
+        self.Serialize(topics)
         self.operation = Ops.messageReadAdvanced.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageReadAdvanced, cfg, decode=True, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         message_response_adapter = TypeAdapter(List[MessageReadAdvancedResp])
-        self.response_array = message_response_adapter.validate_python(data_response.json())
+        self.response_array = self.Decode_response(data_response, message_response_adapter.validate_python)
         return self.response_array
 
+    def Stream(self, topics: list[str], cfg: ApiConfig, datapoints: bool = False):
+        #
+        # Generator: decodes the body as it arrives and yields one MessageReadAdvancedResp
+        # at a time, or with datapoints=True one (topic, msgSource, GetDatapoint) at a time,
+        # so only the element being decoded is held in memory
+        #
+        self.Build_url(cfg.api_url, Ops.messageReadAdvanced.command)
+        self.url += self.Build_suffix()
+
+        self.Build_headers("Content-Type", "application/json")
+        self.Serialize(topics)
+        self.operation = Ops.messageReadAdvanced.method
+        data_response = self.Send(Ops.messageReadAdvanced, cfg, decode=True, consume=False, data=self.payload, headers=self.headers)
+        data_response.raise_for_status()
+        count = 0
+        received = [0]
+        def counted(chunks):
+            for chunk in chunks:
+                received[0] += len(chunk)
+                yield chunk
+        try:
+            stream = JsonStream(counted(data_response.iter_content(chunk_size=cfg.stream_chunk_size)))
+            for _ in stream.items():
+                if not datapoints:
+                    yield self.response_adapter.validate_python(stream.value())
+                    count += 1
+                    continue
+                fields = {}
+                pending = []
+                for key in stream.members():
+                    if key != "datapoints":
+                        fields[key] = stream.value()
+                        continue
+                    for _ in stream.items():
+                        dp = self.datapoint_adapter.validate_python(stream.value())
+                        # datapoints before the topic key are held until the end of the element
+                        if "topic" in fields and "msgSource" in fields:
+                            yield (fields["topic"], fields["msgSource"], dp)
+                            count += 1
+                        else:
+                            pending.append(dp)
+                for dp in pending:
+                    yield (fields.get("topic", ""), fields.get("msgSource", ""), dp)
+                    count += 1
+        finally:
+            data_response.close()
+            metrics.add_response_bytes(Ops.messageReadAdvanced.name, received[0])
+            self.Emit("received", received[0])
+            self.Emit("decoded", count)
+
+class APIPreparedRead (APIBase):
+    #
+    # Reusable read plan for a fixed topic list: URL, headers and request body
+    # are built once, and responses are decoded into positional slots that
+    # follow the order of the prepared topics.
+    #
+    op: ClassVar[Operation] = Ops.messageRead
+    response_adapter: ClassVar[TypeAdapter] = TypeAdapter(List[MessageReadResp])
+    topics: list[str] = []
+    slots: dict = {}
+    api_url: str = ""
+
+    def Build_suffix(self):
+        return self.op.suffix
+
+    def Build_payload(self, topics:list[str]):
+        pl = MessageReadReq(topics=topics, includeOptional=True)
+        self.payload = pl.model_dump_json().encode()
+
+    def Prepare(self, topics: list[str], cfg: ApiConfig):
+        self.topics = list(topics)
+        self.slots = {topic: i for i, topic in enumerate(self.topics)}
+        self.Build_headers("Content-Type", "application/json")
+        # serialized once, outside any request trace
+        self.Build_payload(self.topics)
+        self.operation = self.op.method
+        self.Bind(cfg)
+        return self
+
+    def Bind(self, cfg: ApiConfig):
+        self.Build_url(cfg.api_url, self.op.command)
+        self.url += self.Build_suffix()
+        self.api_url = cfg.api_url
+
+    def Decode(self, items: list[dict]):
+        models = self.response_adapter.validate_python(items)
+        #
+        # the server answers in request order, so the slot lookup is only
+        # needed when that does not hold
+        #
+        if len(models) == len(self.topics) and all(model.topic == topic for model, topic in zip(models, self.topics)):
+            return models
+        results = [None] * len(self.topics)
+        for model in models:
+            slot = self.slots.get(model.topic)
+            if slot is not None:
+                results[slot] = model
+        return results
+
+    def Request(self, cfg: ApiConfig):
+        if cfg.api_url != self.api_url:
+            self.Bind(cfg)
+        # each request starts its own trace at "sent"
+        self.trace = None
+        data_response = self.Send(self.op, cfg, decode=True, data=self.payload, headers=self.headers)
+        data_response.raise_for_status()
+        return self.Decode_response(data_response, self.Decode)
+
+class APIPreparedReadAdvanced (APIPreparedRead):
+    op: ClassVar[Operation] = Ops.messageReadAdvanced
+    response_adapter: ClassVar[TypeAdapter] = TypeAdapter(List[MessageReadAdvancedResp])
+
+    def Build_payload(self, topics:list[str]):
+        pl = MessageReadAdvancedReq(topics=topics)
+        self.payload = pl.model_dump_json().encode()
+
 class APIMessageWrite (APIBase):
     pass
 
@@ -381,9 +617,9 @@ class APIMessageWrite (APIBase):
         self.url += self.Build_suffix()
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(tqvt_list, cfg)
+        self.Serialize(tqvt_list, cfg)
         self.operation = Ops.messageWrite.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageWrite, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -400,9 +636,9 @@ class APIMessageWriteAdvanced (APIBase):
         self.url += self.Build_suffix()
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(cdp_list)
+        self.Serialize(cdp_list)
         self.operation = Ops.messageWriteAdvanced.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.messageWriteAdvanced, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -418,7 +654,7 @@ class APISimpleMessageSubscribe(APIBase):
         
         self.Build_headers("accept", "*/*")
         self.operation = Ops.simpleMessageSubscribe.method
-        data_response  = requests.request(method=self.operation, url=self.url, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.simpleMessageSubscribe, cfg, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -440,10 +676,10 @@ class APISetOfMessagesSubscribe(APIBase):
         self.url += self.Build_suffix(app_name)
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(topic_list, callbackUrl, includeOptional)
+        self.Serialize(topic_list, callbackUrl, includeOptional)
 
         self.operation = Ops.setOfMessagesSubscribe.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.setOfMessagesSubscribe, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -464,10 +700,10 @@ class APIAdvancedMessagesSubscribe(APIBase):
         self.url += self.Build_suffix(app_name)
         
         self.Build_headers("Content-Type", "application/json")
-        self.Build_payload(topic_list, callbackUrl)
+        self.Serialize(topic_list, callbackUrl)
 
         self.operation = Ops.advancedMessagesSubscribe.method
-        data_response  = requests.request(method=self.operation, url=self.url, data=self.payload, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.advancedMessagesSubscribe, cfg, data=self.payload, headers=self.headers)
         data_response.raise_for_status()
         return data_response.ok
 
@@ -483,7 +719,7 @@ class APIDeleteAllSubscriptions(APIBase):
         
         self.Build_headers("accept", "*/*")
         self.operation = Ops.deleteAllSubscriptions.method
-        data_response  = requests.request(method=self.operation, url=self.url, headers=self.headers, timeout=cfg.api_timeout)
+        data_response = self.Send(Ops.deleteAllSubscriptions, cfg, headers=self.headers)
         if data_response.status_code != HTTPStatus.NOT_FOUND:
             data_response.raise_for_status()
         return data_response.ok
\ No newline at end of file
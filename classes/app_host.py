@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Runs many logical apps in one process.
+#
+# Every hosted app keeps its own app_name, registration, heartbeat,
+# subscriptions and webhook queue. They all share one connection pool,
+# one batch thread pool, one scheduler and one webhook server, which
+# routes <callback url>/<app name>/<command> to the app's queue.
+#
+# An app goes through the same steps as app.py (connect, register,
+# provision, validate, setup) as scheduled jobs, retrying a failed step
+# with backoff without blocking the other apps, then runs cycle() every
+# `period` seconds.
+#
+from concurrent.futures import ThreadPoolExecutor
+import queue
+
+from apiclient import APIClient, new_session
+from classes.circuit_breaker import CircuitBreakers
+from classes.heartbeat import HeartBeat
+from classes.request_hooks import RequestHooks
+from classes.scheduler import Scheduler
+from config.apiconfig import ApiConfig
+from lib.miscfuncs import jittered_backoff
+from lib.webhookfuncs import dequeue
+
+class HostedApp (object):
+    #
+    # Subclass and override setup() and cycle()
+    #
+    def __init__(self, name, tarfile_path, complex_provisioned=False, period=1.0):
+        self.name = name
+        self.tarfile_path = tarfile_path
+        self.complex_provisioned = complex_provisioned
+        self.period = period
+        self.logger = None
+        self.client = None
+        self.heartbeat = None
+        self.queue = queue.Queue()
+        self.state = "connect"
+        self.failures = 0
+
+    def callback_url(self, command):
+        return self.client.cfg.api_callback_url + "/" + self.name + "/" + command
+
+    def setup(self):
+        # once provisioned and up: subscriptions, prepared reads...
+        pass
+
+    def cycle(self, payloads):
+        # business logic; payloads are the webhook messages received for this app since the last cycle
+        pass
+
+class AppHost (object):
+    STEPS = ["connect", "register", "provision", "validate", "setup", "running"]
+
+    def __init__(self, logger, appcfg):
+        self.logger = logger
+        self.appcfg = appcfg
+        api_cfg = ApiConfig()
+        self.session = new_session()
+        self.hooks = RequestHooks()
+        self.breakers = CircuitBreakers()
+        self.batch_executor = ThreadPoolExecutor(max_workers=api_cfg.api_batch_workers, thread_name_prefix="api-batch")
+        self.job_executor = ThreadPoolExecutor(max_workers=appcfg.host.workers, thread_name_prefix="host")
+        self.scheduler = Scheduler(logger, self.job_executor)
+        self.apps = {}
+        self.webhook = None
+
+    def add(self, app):
+        if app.name in self.apps:
+            raise Exception (f"app {app.name} is already hosted")
+        app.logger = self.logger
+        app.client = APIClient(app_name=app.name, session=self.session, hooks=self.hooks, breakers=self.breakers, executor=self.batch_executor)
+        app.heartbeat = HeartBeat(self.logger, app.client, queue.Queue(), self.appcfg.misc.hearbeat_initial_state, self.appcfg.misc.heartbeat_period)
+        self.apps[app.name] = app
+        if self.webhook is not None:
+            self.webhook.routes[app.name] = app.queue
+        if self.scheduler.running:
+            self.scheduler.call_later(0.0, self.step, app)
+        return app
+
+    def start(self):
+        if self.appcfg.app.webhook_enabled == True:
+            from classes.webhook import WebHook
+            # the apps connect later, but they all read the same callback URL
+            self.webhook = WebHook(logger=self.logger, queue=queue.Queue(), config=self.appcfg, callback_url=APIClient.env_config().api_callback_url)
+            # assigned after construction so that apps added later are routed too
+            self.webhook.routes = {name: app.queue for name, app in self.apps.items()}
+            self.webhook.start()
+        elif self.appcfg.metrics.enabled == True:
+            try:
+                from classes.metrics_server import MetricsServer
+                MetricsServer(self.logger, self.appcfg).start()
+            except Exception as e:
+                self.logger.error("Error trying to start metrics server. Error: %s.", e)
+        self.scheduler.start()
+        for app in self.apps.values():
+            self.scheduler.call_later(0.0, self.step, app)
+        return self
+
+    def exit(self):
+        for app in self.apps.values():
+            app.heartbeat.exit()
+        self.scheduler.exit()
+        self.job_executor.shutdown(wait=False)
+        self.batch_executor.shutdown(wait=False)
+
+    def status(self):
+        return {name: app.state for name, app in self.apps.items()}
+
+    def step(self, app):
+        #
+        # Run the app's current step; schedule the next one, or a retry with backoff
+        #
+        if not app.heartbeat.running:
+            return
+        try:
+            delay = getattr(self, "step_" + app.state)(app)
+            app.failures = 0
+        except Exception as e:
+            self.logger.error('%s - step "%s" failed. Error: %s. Retrying.', app.name, app.state, e)
+            delay = jittered_backoff(app.failures, self.appcfg.misc.retry_period, self.appcfg.misc.retry_max_period)
+            app.failures += 1
+        self.scheduler.call_later(delay, self.step, app)
+
+    def advance(self, app):
+        app.state = self.STEPS[self.STEPS.index(app.state) + 1]
+
+    def step_connect(self, app):
+        if not app.client.connect():
+            raise Exception (f"cannot connect to API at URL: {app.client.cfg.api_url}")
+        self.logger.info("%s - Connected with API at URL: %s", app.name, app.client.cfg.api_url)
+        self.advance(app)
+        return 0.0
+
+    def step_register(self, app):
+        app.client.registerApp(tarfile_path=app.tarfile_path, is_complex_provisioned=app.complex_provisioned)
+        self.logger.info("%s - Application correcty registered to API using tar.gz file: %s", app.name, app.tarfile_path)
+        self.scheduler.every(app.heartbeat.period, self.beat, app)
+        self.advance(app)
+        return self.appcfg.misc.provision_time
+
+    def step_provision(self, app):
+        response = app.client.checkProvisioningStatus()
+        if response.hasNewConfig != True:
+            return self.appcfg.misc.retry_period
+        self.logger.info("%s - checkProvisioningStatus -> New configuration found! ", app.name)
+        self.advance(app)
+        return 0.0
+
+    def step_validate(self, app):
+        app.client.validateProvision(valid=True)
+        app.heartbeat.change_state(True)
+        self.advance(app)
+        return 0.0
+
+    def step_setup(self, app):
+        app.setup()
+        self.advance(app)
+        return 0.0
+
+    def step_running(self, app):
+        app.cycle(dequeue(app.queue))
+        return app.period
+
+    def beat(self, app):
+        if not app.heartbeat.running:
+            return False
+        app.heartbeat.tick()
@@ -0,0 +1,94 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Opt-in traffic capture. Outgoing API requests (through CaptureHook) and
+# incoming webhook callbacks are appended to a JSON-lines file, one compact
+# record per line:
+#
+#   {"t": <seconds since capture start>, "kind": "api", "op": ..., "method": ..., "path": ..., "body": ..., "dur": ...}
+#   {"t": <seconds since capture start>, "kind": "callback", "path": ..., "body": ...}
+#
+# Records are written by a writer thread, so that neither the webhook's event
+# loop nor the request threads wait on the disk.
+#
+# bench/replay.py replays a capture file against the local stand-in server.
+#
+import atexit
+import json
+import queue
+from threading import Thread
+import time
+from urllib.parse import urlsplit
+
+from classes.request_hooks import RequestHook
+from classes.unix_transport import is_unix_url, split_unix_url
+
+class TrafficCapture (object):
+    def __init__(self, path):
+        self.path = path
+        self.start = time.monotonic()
+        self.fh = open(path, "a", encoding="utf-8")
+        self.queue = queue.Queue()
+        self.writer = Thread(target=self.run, name="traffic-capture", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def offset(self, monotonic_time=None):
+        return round((monotonic_time if monotonic_time is not None else time.monotonic()) - self.start, 6)
+
+    def write(self, record):
+        # never blocks: the record is queued for the writer thread
+        self.queue.put(record)
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+            # flush once the backlog is written
+            if self.queue.empty():
+                self.fh.flush()
+        self.fh.close()
+
+    def record_callback(self, path, body):
+        self.write({"t": self.offset(), "kind": "callback", "path": path, "body": body.decode("utf-8", "replace") if isinstance(body, bytes) else body})
+
+    def close(self):
+        if not self.writer.is_alive():
+            return
+        self.queue.put(None)
+        self.writer.join()
+
+class CaptureHook (RequestHook):
+    #
+    # Records one line per API request once it completes
+    #
+    def __init__(self, capture: TrafficCapture):
+        self.capture = capture
+
+    def decoded(self, trace):
+        sent = trace.timestamps.get("sent")
+        if sent is None:
+            return
+        api = trace.api
+        if is_unix_url(api.url):
+            # the socket path is not part of the request, only the HTTP path after it
+            path = split_unix_url(api.url)[1]
+        else:
+            url = urlsplit(api.url)
+            path = url.path + ("?" + url.query if url.query else "")
+        body = api.payload if not getattr(api, "files", None) else None
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        self.capture.write({
+            "t": self.capture.offset(sent / 1e9 - time.perf_counter() + time.monotonic()),
+            "kind": "api",
+            "op": trace.operation,
+            "method": api.operation,
+            "path": path,
+            "body": body if body else None,
+            "dur": round((trace.timestamps["decoded"] - sent) / 1e9, 6),
+        })
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Transparent chunking of large topic reads. A long topic list is split into
+# chunks that are read concurrently and merged back in the original order.
+# The chunk size adapts to the latency observed per chunk so that a chunk
+# stays well below api_timeout; a chunk that times out is split in half and
+# read again. Chunk requests are not retried on timeouts by APIBase.Send, so
+# one slow chunk costs a single api_timeout.
+#
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+import time
+import requests
+
+from config.apiconfig import ApiConfig
+
+class ChunkSizer (object):
+    #
+    # Additive increase / multiplicative decrease of the chunk size against
+    # a target latency of read_chunk_target * api_timeout
+    #
+    def __init__(self, cfg: ApiConfig):
+        self.lock = Lock()
+        self.size = cfg.read_chunk_size
+
+    def target(self, cfg: ApiConfig):
+        return cfg.api_timeout * cfg.read_chunk_target
+
+    def observe(self, topics, elapsed, cfg: ApiConfig):
+        target = self.target(cfg)
+        with self.lock:
+            if elapsed > target:
+                self.size = max(cfg.read_chunk_min, int(self.size / 2))
+            elif elapsed < target / 2 and topics >= self.size:
+                self.size = min(cfg.read_chunk_max, self.size + max(1, int(self.size / 4)))
+
+    def shrink(self, cfg: ApiConfig):
+        with self.lock:
+            self.size = max(cfg.read_chunk_min, int(self.size / 2))
+
+class ChunkedReader (object):
+    def __init__(self):
+        self.lock = Lock()
+        self.sizers = {}
+        self.executor = None
+
+    def sizer(self, name, cfg: ApiConfig):
+        with self.lock:
+            sizer = self.sizers.get(name)
+            if sizer is None:
+                sizer = self.sizers[name] = ChunkSizer(cfg)
+            return sizer
+
+    def needs_chunking(self, name, topics, cfg: ApiConfig):
+        return cfg.read_chunk_size > 0 and len(topics) > self.sizer(name, cfg).size
+
+    def pool(self, cfg: ApiConfig):
+        #
+        # Dedicated pool: chunk reads may be issued from client.batch() workers
+        #
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=cfg.read_chunk_inflight, thread_name_prefix="api-chunk")
+            return self.executor
+
+    def read(self, name, request, topics, cfg: ApiConfig):
+        #
+        # request(chunk) performs one read and returns its list of results.
+        # Returns the per-chunk results in topic order, or raises the first error.
+        #
+        sizer = self.sizer(name, cfg)
+        pool = self.pool(cfg)
+        results = {}
+        pending = {}
+        errors = []
+        queue = []
+        offset = 0
+
+        def timed(chunk):
+            start = time.perf_counter()
+            rtn = request(chunk)
+            return rtn, time.perf_counter() - start
+
+        #
+        # stop issuing new chunks after the first error, but let those in flight finish
+        #
+        while pending or (not errors and (queue or offset < len(topics))):
+            while not errors and len(pending) < cfg.read_chunk_inflight and (queue or offset < len(topics)):
+                if queue:
+                    start, chunk = queue.pop(0)
+                else:
+                    start, chunk = offset, topics[offset:offset + sizer.size]
+                    offset += len(chunk)
+                pending[pool.submit(timed, chunk)] = (start, chunk)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, chunk = pending.pop(future)
+                try:
+                    rtn, elapsed = future.result()
+                    sizer.observe(len(chunk), elapsed, cfg)
+                    results[start] = rtn
+                except requests.exceptions.Timeout as e:
+                    sizer.shrink(cfg)
+                    if len(chunk) > 1:
+                        half = len(chunk) // 2
+                        queue.append((start, chunk[:half]))
+                        queue.append((start + half, chunk[half:]))
+                    else:
+                        errors.append(e)
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+        return [results[start] for start in sorted(results)]
@@ -0,0 +1,137 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Per-endpoint circuit breakers and a shared retry budget for the transport.
+#
+# closed     calls go through; breaker_failure_threshold consecutive failures open it
+# open       calls fail fast with CircuitOpenError until the open period (jittered,
+#            doubling on every consecutive opening) has elapsed
+# half_open  a single probe call is let through; success closes the breaker,
+#            failure opens it again
+#
+# Connection errors, timeouts and 5xx answers are failures; 4xx answers are not,
+# since they say nothing about the health of the server.
+#
+from threading import Lock
+import time
+import requests
+
+from config.apiconfig import ApiConfig
+from lib.miscfuncs import jittered_backoff
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+class CircuitBreaker (object):
+    def __init__(self, name, cfg: ApiConfig):
+        self.name = name
+        self.cfg = cfg
+        self.lock = Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.openings = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def allow(self):
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.state = CLOSED
+                self.failures = 0
+                self.openings = 0
+                self.probing = False
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.cfg.breaker_failure_threshold:
+                self.state = OPEN
+                self.open_until = time.monotonic() + jittered_backoff(self.openings, self.cfg.breaker_open_base, self.cfg.breaker_open_cap)
+                self.openings += 1
+                self.probing = False
+
+    def status(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "retry_in": max(0.0, self.open_until - time.monotonic()) if self.state == OPEN else 0.0,
+            }
+
+class RetryBudget (object):
+    #
+    # Token bucket: every successful call deposits retry_budget_ratio tokens and
+    # every retry withdraws one, with a floor of retry_budget_min_per_sec retries.
+    # Keeps a fleet from multiplying its load while the server is struggling.
+    #
+    def __init__(self, cfg: ApiConfig):
+        self.cfg = cfg
+        self.lock = Lock()
+        self.tokens = cfg.retry_budget_min_per_sec
+        self.last = time.monotonic()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.tokens + self.cfg.retry_budget_ratio, self.cap())
+
+    def cap(self):
+        # never bank more than 10 retries (or one second's floor, if higher)
+        return max(self.cfg.retry_budget_min_per_sec, 10.0)
+
+    def withdraw(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.last) * self.cfg.retry_budget_min_per_sec, self.cap())
+            self.last = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+class CircuitBreakers (object):
+    def __init__(self, cfg: ApiConfig = None):
+        self.cfg = cfg if cfg is not None else ApiConfig()
+        self.lock = Lock()
+        self.breakers = {}
+        self.budget = RetryBudget(self.cfg)
+
+    def configure(self, cfg: ApiConfig):
+        with self.lock:
+            self.cfg = cfg
+            self.budget.cfg = cfg
+            for breaker in self.breakers.values():
+                breaker.cfg = cfg
+
+    def get(self, name):
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = self.breakers[name] = CircuitBreaker(name, self.cfg)
+            return breaker
+
+    def status(self):
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return {breaker.name: breaker.status() for breaker in breakers}
+
+    def available(self):
+        #
+        # False while any endpoint is open or probing
+        #
+        return all(status["state"] == CLOSED for status in self.status().values())
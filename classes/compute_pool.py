@@ -0,0 +1,205 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Runs CPU-heavy kernels (lib/kernels.py) on a process pool, off the I/O loop.
+#
+# Inputs and outputs travel through one shared memory block split into
+# fixed-size slots: the parent copies the input arrays (float64) into a
+# free slot, the worker computes in place and writes its outputs to the
+# same slot, and only slot offsets and lengths are pickled. Results are
+# turned into datapoints as they complete; collect() hands them to the
+# next batched messageWrite.
+#
+# Workers are forked, so the pool should be created before the app starts
+# any thread (app.py creates it before setup_logging). A pool whose worker
+# died is recreated on the next submit; that fork may happen while other
+# threads run, so the kernels must never log or take locks of the parent.
+#
+from array import array
+import atexit
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import queue
+from threading import Thread
+import time
+
+from classes.api_classes import TvqtDataPoint
+from classes.enums import quality_enum
+from lib.timestamps import now_us
+
+DOUBLE = 8
+
+_block = None
+
+def _attach(name, parent):
+    # worker initializer: map the parent's block once per process
+    global _block
+    _block = shared_memory.SharedMemory(name=name)
+    Thread(target=_orphan_watch, args=(parent,), daemon=True).start()
+
+def _orphan_watch(parent):
+    # a killed app cannot shut its pool down: workers leave on their own
+    while os.getppid() == parent:
+        time.sleep(1.0)
+    os._exit(0)
+
+def _run(kernel, base, inputs, out_offset, out_size, params):
+    #
+    # In the worker: inputs are {name: (offset, length)} within the slot at `base`
+    #
+    views = {name: _block.buf[base + offset:base + offset + length * DOUBLE].cast("d") for name, (offset, length) in inputs.items()}
+    out = _block.buf[base + out_offset:base + out_offset + out_size * DOUBLE].cast("d")
+    try:
+        return kernel(views, out, **params)
+    finally:
+        for view in views.values():
+            view.release()
+        out.release()
+
+class ComputePool (object):
+    def __init__(self, workers=0, slots=8, slot_size=65536):
+        #
+        # slot_size: bytes per job, inputs and outputs together
+        #
+        self.workers = workers if workers > 0 else max(1, (os.cpu_count() or 2) - 1)
+        self.slot_size = slot_size - slot_size % DOUBLE
+        self.block = shared_memory.SharedMemory(create=True, size=self.slot_size * slots)
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        #
+        # fork where available: "spawn" re-runs the unguarded app.py in every worker
+        #
+        self.method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = self.start_executor()
+        self.broken = False
+        self.ready = deque()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        atexit.register(self.exit)
+
+    def start_executor(self):
+        # workers are started right away
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(self.method),
+            initializer=_attach, initargs=(self.block.name, os.getpid()))
+        executor.submit(int).result()
+        return executor
+
+    def restart(self):
+        #
+        # A worker died: the jobs in flight failed with BrokenProcessPool, start new workers
+        #
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.start_executor()
+        self.broken = False
+        self.restarts += 1
+
+    def submit(self, kernel, inputs, out_size, block=False, **params):
+        #
+        # kernel(inputs: {name: memoryview of doubles}, out: memoryview of doubles, **params) -> outputs written
+        # inputs: {name: sequence of floats, or list of memoryview segments of doubles (ring buffer views)}
+        # Returns a Future of the output list, or None when every slot is busy and block is False
+        #
+        try:
+            slot = self.free.get(block=block)
+        except queue.Empty:
+            self.rejected += 1
+            return None
+        try:
+            base = slot * self.slot_size
+            layout, offset = self.copy_in(base, inputs)
+            if offset + out_size * DOUBLE > self.slot_size:
+                raise ValueError (f"job needs {offset + out_size * DOUBLE} bytes, slot_size is {self.slot_size}")
+            if self.broken:
+                self.restart()
+            try:
+                inner = self.executor.submit(_run, kernel, base, layout, offset, out_size, params)
+            except BrokenProcessPool:
+                self.restart()
+                inner = self.executor.submit(_run, kernel, base, layout, offset, out_size, params)
+        except Exception:
+            self.free.put(slot)
+            raise
+        self.submitted += 1
+        future = Future()
+        inner.add_done_callback(lambda done: self.copy_out(done, future, slot, base + offset))
+        return future
+
+    def copy_in(self, base, inputs):
+        layout = {}
+        offset = 0
+        for name, data in inputs.items():
+            segments = data if isinstance(data, list) and data and isinstance(data[0], memoryview) else [array("d", data)]
+            length = sum(len(segment) for segment in segments)
+            if offset + length * DOUBLE > self.slot_size:
+                raise ValueError (f"input {name} does not fit a {self.slot_size} byte slot")
+            dst = self.block.buf[base + offset:base + offset + length * DOUBLE].cast("d")
+            position = 0
+            for segment in segments:
+                dst[position:position + len(segment)] = segment
+                position += len(segment)
+            dst.release()
+            layout[name] = (offset, length)
+            offset += length * DOUBLE
+        return layout, offset
+
+    def copy_out(self, done, future, slot, start):
+        try:
+            count = done.result()
+            out = self.block.buf[start:start + count * DOUBLE].cast("d")
+            values = out.tolist()
+            out.release()
+            self.completed += 1
+            future.set_result(values)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self.broken = True
+            self.failed += 1
+            future.set_exception(e)
+        finally:
+            self.free.put(slot)
+
+    def submit_datapoints(self, kernel, inputs, topics, **params):
+        #
+        # Output i becomes a datapoint of topics[i], queued for collect()
+        #
+        future = self.submit(kernel, inputs, len(topics), **params)
+        if future is not None:
+            future.add_done_callback(lambda done: self.queue_datapoints(done, topics))
+        return future
+
+    def queue_datapoints(self, done, topics):
+        if done.exception() is not None:
+            return
+        ts = now_us()
+        self.ready.extend(TvqtDataPoint(topic=topic, value=value, quality=quality_enum.OK, timeStamp=ts) for topic, value in zip(topics, done.result()))
+
+    def collect(self):
+        #
+        # Datapoints of the jobs completed since the last call; never blocks
+        #
+        rtn = []
+        while self.ready:
+            rtn.append(self.ready.popleft())
+        return rtn
+
+    def status(self):
+        return {"workers": self.workers, "busy": self.submitted - self.completed - self.failed, "submitted": self.submitted,
+            "completed": self.completed, "failed": self.failed, "rejected": self.rejected, "restarts": self.restarts}
+
+    def exit(self):
+        if self.block is None:
+            return
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.block.close()
+        self.block.unlink()
+        self.block = None
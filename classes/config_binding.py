@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Binds a typed configuration model to its postvalidConfig topics.
+#
+# The topics are read once, then kept up to date by a set-of-messages
+# subscription (apply() the webhook payloads), or, when the webhook is not
+# available, by polling them every poll_period seconds. While subscribed they
+# are still re-read every resync_period seconds, in case a push was lost.
+# The app adds `topics` to its own set-of-messages subscription and sets
+# `subscribed` once it succeeds. Every update is validated through the model;
+# callbacks registered with on_change() only fire for fields whose value
+# actually changed.
+#
+import time
+
+class ConfigBinding (object):
+    def __init__(self, logger, client, model, poll_period=30.0, resync_period=300.0):
+        #
+        # model: a pydantic model class with a `topics` ClassVar {field: topic}
+        #
+        self.logger = logger
+        self.client = client
+        self.model = model
+        self.fields = {topic: field for field, topic in model.topics.items()}
+        self.poll_period = poll_period
+        self.resync_period = resync_period
+        self.config = None
+        self.subscribed = False
+        self.last_read = 0.0
+        self.callbacks = {}
+
+    @property
+    def topics(self):
+        return list(self.fields)
+
+    def on_change(self, field, callback):
+        #
+        # callback(old, new); called after the new config is in place
+        #
+        self.callbacks.setdefault(field, []).append(callback)
+        return callback
+
+    def read(self):
+        values = {}
+        for response in self.client.messageRead(self.topics):
+            if response is None:
+                continue
+            field = self.fields.get(response.topic)
+            if field is not None:
+                values[field] = response.value
+        missing = [topic for topic, field in self.fields.items() if field not in values]
+        if missing:
+            raise Exception (f"config topics not found: {missing}")
+        self.last_read = time.monotonic()
+        self.update(values)
+
+    def refresh(self):
+        #
+        # Called every cycle: reads on first use, then polls; slowly when subscribed
+        #
+        period = self.resync_period if self.subscribed else self.poll_period
+        if self.config is None or time.monotonic() - self.last_read >= period:
+            self.read()
+        return self.config
+
+    def apply(self, payloads):
+        #
+        # Consume the webhook payloads of bound topics; returns the others
+        #
+        rest = []
+        values = {}
+        for payload in payloads:
+            field = self.fields.get(payload.topic)
+            if field is None:
+                rest.append(payload)
+            else:
+                values[field] = payload.value
+        if values and self.config is not None:
+            self.update(values)
+        return rest
+
+    def update(self, values):
+        old = self.config
+        try:
+            new = self.model.model_validate({**(old.model_dump() if old is not None else {}), **values})
+        except Exception as e:
+            if old is None:
+                raise
+            self.logger.error("Invalid configuration %s. Error: %s. Keeping the previous values.", values, e)
+            return
+        self.config = new
+        if old is None:
+            return
+        for field in values:
+            before, after = getattr(old, field), getattr(new, field)
+            if before == after:
+                continue
+            self.logger.info("Configuration %s changed: %s -> %s", field, before, after)
+            for callback in self.callbacks.get(field, []):
+                callback(before, after)
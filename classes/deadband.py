@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Report-by-exception filter for messageWrite. A value is only written when
+#
+#  - the topic has not been written yet,
+#  - its quality changed,
+#  - integrity_period seconds passed since it was last written, or
+#  - it moved out of the deadband: more than `absolute` or more than `percent`
+#    of the last written value, whichever is configured (0 disables a band);
+#    with no band configured, and for non-numeric values, any change
+#
+# State is only updated with commit(), once the write succeeded. APIClient
+# resets it on connect() and validateProvision(), so every topic is written
+# again to a server that restarted or was provisioned anew.
+#
+from threading import Lock
+import time
+
+from config.appconfig import Deadband
+
+class DeadbandFilter (object):
+    def __init__(self, config: Deadband):
+        self.config = config
+        self.lock = Lock()
+        self.last = {}
+        self.suppressed = 0
+
+    def band(self, topic):
+        band = self.config.topics.get(topic)
+        if band is not None:
+            return band.absolute, band.percent
+        return self.config.absolute, self.config.percent
+
+    def changed(self, tvqt_datapoint, now):
+        last = self.last.get(tvqt_datapoint.topic)
+        if last is None:
+            return True
+        value, quality, written = last
+        if tvqt_datapoint.quality != quality or now - written >= self.config.integrity_period:
+            return True
+        new = tvqt_datapoint.value
+        if isinstance(new, bool) or not isinstance(new, (int, float)) or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return new != value
+        absolute, percent = self.band(tvqt_datapoint.topic)
+        delta = abs(new - value)
+        if absolute == 0 and percent == 0:
+            return delta != 0
+        if absolute > 0 and delta > absolute:
+            return True
+        return percent > 0 and delta > abs(value) * percent / 100
+
+    def filter(self, tvqt_datapoint_list):
+        now = time.monotonic()
+        with self.lock:
+            rtn = [tvqt_datapoint for tvqt_datapoint in tvqt_datapoint_list if self.changed(tvqt_datapoint, now)]
+            self.suppressed += len(tvqt_datapoint_list) - len(rtn)
+        return rtn
+
+    def commit(self, tvqt_datapoint_list):
+        now = time.monotonic()
+        with self.lock:
+            for tvqt_datapoint in tvqt_datapoint_list:
+                self.last[tvqt_datapoint.topic] = (tvqt_datapoint.value, tvqt_datapoint.quality, now)
+
+    def reset(self):
+        #
+        # Force the next write of every topic, e.g. after a reconnect
+        #
+        with self.lock:
+            self.last = {}
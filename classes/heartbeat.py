@@ -10,6 +10,7 @@ class HeartBeat (object):
         self.initial_state = initial_state
         self.period = period
         self.running = True
+        self.up = initial_state
 
     def start(self):
         thread = Thread(target=self.run)
@@ -18,23 +19,26 @@ class HeartBeat (object):
         return True
 
     def run(self):
-        #
-        # Send the heart beat (false for  the first time)
-        #
-        up = self.initial_state
-
         while self.running:
-            try:
-                up = self.dq.get(block=False)
-            except queue.Empty:
-                pass    
-            try:   
-                response = self.client.heartbeatApp(up=up)
-            except Exception as e:
-                self.logger.error(f"Error trying to send Heartbeat. Error: {e}")             
+            self.tick()
             time.sleep(self.period)
         return
-    
+
+    def tick(self):
+        #
+        # Send one heart beat (initial_state until change_state() is called).
+        # Hosted apps are ticked by the host scheduler instead of their own thread
+        #
+        try:
+            self.up = self.dq.get(block=False)
+        except queue.Empty:
+            pass
+        try:
+            response = self.client.heartbeatApp(up=self.up)
+        except Exception as e:
+            self.logger.error("Error trying to send Heartbeat. Error: %s", e)
+        return
+
     def change_state (self, new_state):
         self.dq.put(new_state)
         return
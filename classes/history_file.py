@@ -0,0 +1,178 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Memory-mapped persistence of topic history and aggregate state, so that a
+# restarted app resumes where it stopped instead of starting from nothing.
+#
+# Fixed little-endian layout, sized by capacity and max_topics:
+#
+#   header      64 bytes   magic, version, capacity, max_topics, tumbling length,
+#                          run_counter, stats window, last checkpoint (us)
+#   directory   max_topics x 128 bytes   topic names, utf-8, zero padded
+#   rings       max_topics x ring slot   TopicRing buffers (classes/ring_buffer.py)
+#   aggregates  max_topics x 592 bytes   tumbling window RunningStats and up to
+#                                        4 P2Quantile sketches
+#
+# Rings live directly in the mapping (attached zero-copy); aggregates and the
+# header are written at checkpoint(), which also flushes the mapping. A file
+# whose header does not match the configured sizes is recreated.
+#
+import mmap
+import os
+import struct
+import time
+
+from classes.ring_buffer import RingStore, TopicRing
+from classes.stream_stats import StatsEngine, TopicStats
+
+MAGIC = b"EDGEHIST"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIdqqq")
+HEADER_SIZE = 64
+NAME_SIZE = 128
+MAX_QUANTILES = 4
+STATS = struct.Struct("<qqdddd")
+SKETCH = struct.Struct("<dq5d5q5d")
+AGGREGATE_SIZE = STATS.size + MAX_QUANTILES * SKETCH.size
+NO_WINDOW = -1
+
+def align8(size):
+    return (size + 7) & ~7
+
+class HistoryFile (object):
+    def __init__(self, path, capacity, max_topics):
+        self.path = path
+        self.capacity = capacity
+        self.max_topics = max_topics
+        self.ring_size = align8(TopicRing.nbytes(capacity))
+        self.names_offset = HEADER_SIZE
+        self.rings_offset = self.names_offset + max_topics * NAME_SIZE
+        self.aggregates_offset = self.rings_offset + max_topics * self.ring_size
+        self.size = self.aggregates_offset + max_topics * AGGREGATE_SIZE
+        self.mm = None
+        self.slots = {}
+        self.tumbling = 0.0
+        self.run_counter = 0
+        self.stats_window = None
+        self.checkpoint_us = 0
+
+    def open(self):
+        #
+        # Returns True when existing state was found
+        #
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        resumed = os.path.exists(self.path) and os.path.getsize(self.path) == self.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not resumed:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+            self.mm = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        if resumed:
+            magic, version, capacity, max_topics, _, self.tumbling, self.run_counter, window, self.checkpoint_us = HEADER.unpack_from(self.mm, 0)
+            resumed = magic == MAGIC and version == VERSION and capacity == self.capacity and max_topics == self.max_topics
+        if not resumed:
+            self.mm[:self.size] = bytes(self.size)
+            self.tumbling, self.run_counter, window, self.checkpoint_us = 0.0, 0, NO_WINDOW, 0
+            self.write_header()
+        self.stats_window = None if window == NO_WINDOW else window
+        for slot in range(self.max_topics):
+            offset = self.names_offset + slot * NAME_SIZE
+            name = bytes(self.mm[offset:offset + NAME_SIZE]).rstrip(b"\0")
+            if name:
+                self.slots[name.decode("utf-8")] = slot
+        return resumed
+
+    def write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.capacity, self.max_topics, MAX_QUANTILES, self.tumbling,
+            self.run_counter, NO_WINDOW if self.stats_window is None else self.stats_window, self.checkpoint_us)
+
+    def slot(self, topic):
+        slot = self.slots.get(topic)
+        if slot is None:
+            encoded = topic.encode("utf-8")
+            if len(encoded) > NAME_SIZE or len(self.slots) >= self.max_topics:
+                return None
+            slot = self.slots[topic] = len(self.slots)
+            offset = self.names_offset + slot * NAME_SIZE
+            self.mm[offset:offset + len(encoded)] = encoded
+        return slot
+
+    def ring(self, slot):
+        offset = self.rings_offset + slot * self.ring_size
+        return TopicRing(self.capacity, memoryview(self.mm)[offset:offset + self.ring_size])
+
+    def allocate(self, topic, capacity):
+        #
+        # RingStore.allocate replacement: the ring is backed by the mapping
+        #
+        slot = self.slot(topic)
+        if slot is None or capacity != self.capacity:
+            return TopicRing(capacity)
+        return self.ring(slot)
+
+    def attach(self, store: RingStore):
+        store.allocate = self.allocate
+        for topic, slot in self.slots.items():
+            if len(store.rings) >= store.max_topics:
+                break
+            ring = self.ring(slot)
+            if len(ring):
+                store.rings[topic] = ring
+
+    def restore_stats(self, engine: StatsEngine):
+        if self.tumbling <= 0:
+            return
+        engine.tumbling = self.tumbling
+        for topic, slot in self.slots.items():
+            offset = self.aggregates_offset + slot * AGGREGATE_SIZE
+            index, count, mean, m2, low, high = STATS.unpack_from(self.mm, offset)
+            if index == NO_WINDOW:
+                continue
+            stats = engine.topics[topic] = TopicStats(engine.tumbling, engine.sliding, engine.panes, engine.quantiles)
+            window = stats.tumbling
+            window.index = index
+            window.stats.count, window.stats.mean, window.stats.m2, window.stats.min, window.stats.max = count, mean, m2, low, high
+            for i, sketch in enumerate(window.sketches[:MAX_QUANTILES]):
+                values = SKETCH.unpack_from(self.mm, offset + STATS.size + i * SKETCH.size)
+                p, size = values[0], values[1]
+                if p != sketch.p:
+                    continue
+                sketch.q = list(values[2:2 + size])
+                sketch.n = list(values[7:12])
+                sketch.np = list(values[12:17])
+
+    def save_stats(self, engine: StatsEngine):
+        self.tumbling = engine.tumbling
+        for topic, stats in engine.topics.items():
+            slot = self.slot(topic)
+            if slot is None:
+                continue
+            offset = self.aggregates_offset + slot * AGGREGATE_SIZE
+            window = stats.tumbling
+            s = window.stats
+            STATS.pack_into(self.mm, offset, NO_WINDOW if window.index is None else window.index, s.count, s.mean, s.m2, s.min, s.max)
+            for i, sketch in enumerate(window.sketches[:MAX_QUANTILES]):
+                q = sketch.q + [0.0] * (5 - len(sketch.q))
+                SKETCH.pack_into(self.mm, offset + STATS.size + i * SKETCH.size, sketch.p, len(sketch.q), *q, *sketch.n, *sketch.np)
+
+    def checkpoint(self, engine: StatsEngine = None, run_counter=None, stats_window=None):
+        if engine is not None:
+            self.save_stats(engine)
+        if run_counter is not None:
+            self.run_counter = run_counter
+        if stats_window is not None:
+            self.stats_window = stats_window
+        self.checkpoint_us = int(time.time() * 1000000)
+        self.write_header()
+        self.mm.flush()
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.flush()
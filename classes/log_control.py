@@ -1,8 +1,10 @@
 from logging import Logger
 import time
+from typing import Optional
 from pydantic import BaseModel
 
 from classes.heartbeat import HeartBeat
+from lib.miscfuncs import jittered_backoff
 
 
 class LogControl(BaseModel):
@@ -10,24 +12,43 @@ class LogControl(BaseModel):
         arbitrary_types_allowed = True
 
     retries:int  = 0
+    failures:int = 0
     logger: Logger
     retry_period: float
+    retry_max_period: float = 30.0
     max_retries: int
     heartbeat_obj: HeartBeat
     client_name: str
+    client: Optional[object] = None
 
     def reset_retries(self):
         self.retries = 0
+        self.failures = 0
 
+    def wait_retry(self):
+        #
+        # Jittered exponential backoff between retries, so a fleet of apps
+        # does not retry in lockstep after a server restart
+        #
+        delay = jittered_backoff(self.failures, self.retry_period, self.retry_max_period)
+        self.failures += 1
+        time.sleep(delay)
 
     def check_retries(self):
         self.retries += 1
         if self.retries < self.max_retries:
             return
-        self.logger.error(f"messageRead - Too many retries for  \"{self.client_name}\".")
+        #
+        # While the REST server itself is unavailable a restart would not help:
+        # keep backing off and let the circuit breakers probe for recovery
+        #
+        if self.client is not None and not self.client.server_available():
+            self.logger.warning('REST server unavailable for  "%s". Waiting for it to recover. Status: %s', self.client_name, self.client.transport_status())
+            return
+        self.logger.error('messageRead - Too many retries for  "%s".', self.client_name)
         #
         # kill heartbeat thread
         #
         self.heartbeat_obj.exit()
         time.sleep(1)
-        exit(-1)
\ No newline at end of file
+        exit(-1)
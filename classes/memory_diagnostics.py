@@ -0,0 +1,195 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Long-run memory diagnostics (diagnostics.enabled in config/appconfig.py)
+#
+# Every `interval` seconds a thread takes a tracemalloc snapshot and records
+# the top allocation sites, their growth since the previous snapshot, the
+# process RSS, the depth of the watched queues and the number of live objects
+# per pydantic model class. A site (or the RSS) that grows in `leak_samples`
+# consecutive snapshots is reported as a leak suspect.
+#
+# The figures are exported on the /metrics endpoint. SIGUSR1 takes a fresh
+# sample and writes it as JSON to dump_file:
+#
+#   kill -USR1 <pid>
+#
+import gc
+import json
+import os
+import resource
+import signal
+from threading import Event, Lock, Thread, current_thread, main_thread
+import tracemalloc
+
+from pydantic import BaseModel
+
+from classes.metrics import registry as metrics
+from lib.timestamps import now_us
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # peak, not current, where /proc is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def model_counts():
+    counts = {}
+    for obj in gc.get_objects():
+        if isinstance(obj, BaseModel):
+            name = type(obj).__name__
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+class MemoryDiagnostics (object):
+    def __init__(self, logger, config, prefix="app_memory"):
+        self.logger = logger
+        self.config = config
+        self.prefix = prefix
+        self.queues = {}
+        self.previous = None
+        self.rss_start = None
+        self.rss_last = 0
+        self.rss_streak = 0
+        self.streaks = {}
+        self.report = {}
+        self.lock = Lock()
+        self.wake = Event()
+        self.dump_requested = False
+        self.running = False
+
+    def watch_queue(self, name, q):
+        self.queues[name] = q
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.config.frames)
+        self.running = True
+        metrics.add_collector(self.collect)
+        if hasattr(signal, "SIGUSR1") and current_thread() is main_thread():
+            signal.signal(signal.SIGUSR1, self.request_dump)
+        Thread(target=self.run, name="memory-diagnostics", daemon=True).start()
+        return self
+
+    def exit(self):
+        self.running = False
+        self.wake.set()
+        metrics.remove_collector(self.collect)
+
+    def request_dump(self, signum=None, frame=None):
+        # signal handler: the work is done on the diagnostics thread
+        self.dump_requested = True
+        self.wake.set()
+
+    def run(self):
+        while self.running:
+            try:
+                self.sample()
+                if self.dump_requested:
+                    self.dump_requested = False
+                    self.dump()
+            except Exception as e:
+                self.logger.error("Memory diagnostics - Error trying to take a sample. Error: %s.", e)
+            self.wake.wait(self.config.interval)
+            self.wake.clear()
+
+    def site(self, stat):
+        frame = stat.traceback[0]
+        filename = frame.filename
+        if filename.startswith(os.getcwd() + os.sep):
+            filename = filename[len(os.getcwd()) + 1:]
+        return f"{filename}:{frame.lineno}"
+
+    def sample(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        top = snapshot.statistics("lineno")[:self.config.top]
+        growth = []
+        if self.previous is not None:
+            growth = [stat for stat in snapshot.compare_to(self.previous, "lineno") if stat.size_diff > 0]
+        self.previous = snapshot
+        #
+        # leak suspects: sites that grew in every one of the last leak_samples snapshots
+        #
+        self.streaks = {self.site(stat): self.streaks.get(self.site(stat), 0) + 1 for stat in growth}
+        suspects = sorted(site for site, streak in self.streaks.items() if streak >= self.config.leak_samples)
+        rss = rss_bytes()
+        if self.rss_start is None:
+            self.rss_start = rss
+        self.rss_streak = self.rss_streak + 1 if rss > self.rss_last and self.rss_last > 0 else 0
+        self.rss_last = rss
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        report = {
+            "timestamp": now_us(),
+            "rss_bytes": rss,
+            "rss_growth_bytes": rss - self.rss_start,
+            "rss_growing_samples": self.rss_streak,
+            "traced_bytes": traced,
+            "traced_peak_bytes": traced_peak,
+            "queues": {name: q.qsize() for name, q in self.queues.items()},
+            "models": dict(sorted(model_counts().items(), key=lambda item: item[1], reverse=True)),
+            "top": [{"site": self.site(stat), "bytes": stat.size, "count": stat.count} for stat in top],
+            "growth": [{"site": self.site(stat), "bytes": stat.size_diff, "count": stat.count_diff} for stat in growth[:self.config.top]],
+            "suspects": suspects,
+        }
+        with self.lock:
+            self.report = report
+        self.logger.debug("Memory diagnostics - rss: %s bytes, traced: %s bytes, queues: %s", rss, traced, report["queues"])
+        if suspects:
+            self.logger.warning("Memory diagnostics - allocations growing for %s samples in a row at: %s", self.config.leak_samples, ", ".join(suspects))
+        if self.rss_streak >= self.config.leak_samples:
+            self.logger.warning("Memory diagnostics - RSS growing for %s samples in a row: %s bytes (+%s since start)", self.rss_streak, rss, rss - self.rss_start)
+        return report
+
+    def dump(self, path=None):
+        path = path or self.config.dump_file
+        with self.lock:
+            report = self.report
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w") as fh:
+            json.dump(report, fh, indent=2)
+        self.logger.info("Memory diagnostics - report written to %s", path)
+        return path
+
+    def collect(self):
+        #
+        # Prometheus lines for the metrics registry; RSS and queue depths are read live
+        #
+        p = self.prefix
+        with self.lock:
+            report = self.report
+        lines = [
+            f"# HELP {p}_rss_bytes Resident set size of the process.",
+            f"# TYPE {p}_rss_bytes gauge",
+            f"{p}_rss_bytes {rss_bytes()}",
+            f"# HELP {p}_queue_depth Items waiting in the watched queues.",
+            f"# TYPE {p}_queue_depth gauge",
+        ]
+        lines += [f'{p}_queue_depth{{queue="{name}"}} {q.qsize()}' for name, q in sorted(self.queues.items())]
+        if not report:
+            return lines
+        lines += [
+            f"# HELP {p}_traced_bytes Memory allocated by Python, as traced at the last sample.",
+            f"# TYPE {p}_traced_bytes gauge",
+            f"{p}_traced_bytes {report['traced_bytes']}",
+            f"# HELP {p}_model_objects Live objects per pydantic model class at the last sample.",
+            f"# TYPE {p}_model_objects gauge",
+        ]
+        lines += [f'{p}_model_objects{{model="{name}"}} {count}' for name, count in report["models"].items()]
+        lines += [f"# HELP {p}_site_bytes Memory held per allocation site (top sites) at the last sample.", f"# TYPE {p}_site_bytes gauge"]
+        lines += [f'{p}_site_bytes{{site="{item["site"]}"}} {item["bytes"]}' for item in report["top"]]
+        lines += [f"# HELP {p}_site_growth_bytes Growth per allocation site between the last two samples.", f"# TYPE {p}_site_growth_bytes gauge"]
+        lines += [f'{p}_site_growth_bytes{{site="{item["site"]}"}} {item["bytes"]}' for item in report["growth"]]
+        lines += [f"# HELP {p}_leak_suspects Allocation sites growing in leak_samples consecutive samples.", f"# TYPE {p}_leak_suspects gauge",
+            f"{p}_leak_suspects {len(report['suspects'])}"]
+        return lines
@@ -0,0 +1,131 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Per-operation API metrics exported in Prometheus text format.
+# Other parts of the app add their own series with add_collector().
+#
+from threading import Lock
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram (object):
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+class OperationMetrics (object):
+    def __init__(self):
+        self.latency = Histogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_codes = {}
+        self.retries = 0
+        self.last_failed = False
+
+class MetricsRegistry (object):
+    def __init__(self, prefix="hcc2_api"):
+        self.prefix = prefix
+        self.lock = Lock()
+        self.operations = {}
+        self.collectors = []
+
+    def add_collector(self, collector):
+        #
+        # collector() returns Prometheus text lines; called on every render, outside the lock
+        #
+        self.collectors.append(collector)
+        return collector
+
+    def remove_collector(self, collector):
+        self.collectors.remove(collector)
+
+    def observe(self, operation, elapsed, request_bytes, response_bytes, status_code):
+        #
+        # status_code is the HTTP status, or "error" when no response was received.
+        # A call issued right after a failed call of the same operation counts as a retry.
+        #
+        failed = status_code == "error" or status_code >= 400
+        with self.lock:
+            op = self.operations.get(operation)
+            if op is None:
+                op = self.operations[operation] = OperationMetrics()
+            op.latency.observe(elapsed)
+            op.request_bytes += request_bytes
+            op.response_bytes += response_bytes
+            op.status_codes[status_code] = op.status_codes.get(status_code, 0) + 1
+            if op.last_failed:
+                op.retries += 1
+            op.last_failed = failed
+
+    def add_response_bytes(self, operation, response_bytes):
+        #
+        # Body bytes of a streamed response, counted once the stream is read
+        #
+        with self.lock:
+            op = self.operations.get(operation)
+            if op is None:
+                op = self.operations[operation] = OperationMetrics()
+            op.response_bytes += response_bytes
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        with self.lock:
+            ops = sorted(self.operations.items())
+            lines.append(f"# HELP {p}_request_duration_seconds Latency of HCC2 REST API calls.")
+            lines.append(f"# TYPE {p}_request_duration_seconds histogram")
+            for name, op in ops:
+                for bound, total in op.latency.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{p}_request_duration_seconds_bucket{{operation="{name}",le="{le}"}} {total}')
+                lines.append(f'{p}_request_duration_seconds_sum{{operation="{name}"}} {op.latency.sum}')
+                lines.append(f'{p}_request_duration_seconds_count{{operation="{name}"}} {op.latency.count}')
+            lines.append(f"# HELP {p}_request_bytes_total Request body bytes sent.")
+            lines.append(f"# TYPE {p}_request_bytes_total counter")
+            for name, op in ops:
+                lines.append(f'{p}_request_bytes_total{{operation="{name}"}} {op.request_bytes}')
+            lines.append(f"# HELP {p}_response_bytes_total Response body bytes received.")
+            lines.append(f"# TYPE {p}_response_bytes_total counter")
+            for name, op in ops:
+                lines.append(f'{p}_response_bytes_total{{operation="{name}"}} {op.response_bytes}')
+            lines.append(f"# HELP {p}_responses_total Calls by HTTP status code (\"error\" when no response was received).")
+            lines.append(f"# TYPE {p}_responses_total counter")
+            for name, op in ops:
+                for code, count in sorted(op.status_codes.items(), key=lambda item: str(item[0])):
+                    lines.append(f'{p}_responses_total{{operation="{name}",code="{code}"}} {count}')
+            lines.append(f"# HELP {p}_retries_total Calls issued after a failed call of the same operation.")
+            lines.append(f"# TYPE {p}_retries_total counter")
+            for name, op in ops:
+                lines.append(f'{p}_retries_total{{operation="{name}"}} {op.retries}')
+        for collector in list(self.collectors):
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+#
+# process-wide registry shared by every API call
+#
+registry = MetricsRegistry()
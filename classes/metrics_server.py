@@ -0,0 +1,47 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Standalone /metrics endpoint, used when the webhook server is disabled
+#
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from classes.metrics import registry as metrics
+
+class MetricsHandler (BaseHTTPRequestHandler):
+    route = "/metrics"
+
+    def do_GET(self):
+        if self.path.split("?")[0] != self.route:
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer (object):
+    def __init__(self, logger, config):
+        self.logger = logger
+        self.config = config
+        self.server = None
+
+    def start(self):
+        handler = type("RouteMetricsHandler", (MetricsHandler,), {"route": self.config.metrics.route})
+        self.server = ThreadingHTTPServer((self.config.metrics.host, self.config.metrics.port), handler)
+        thread = Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.logger.debug("Metrics server listening on port %s.", self.config.metrics.port)
+        return True
+
+    def exit(self):
+        if self.server is not None:
+            self.server.shutdown()
+        return
@@ -0,0 +1,186 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Request lifecycle hooks for profiling the API client.
+#
+# Every request goes through the stages below, in order. Each hook callback
+# receives the RequestTrace of the request, which holds the API object sending
+# it and the perf_counter_ns timestamp and payload size recorded for every
+# stage reached so far.
+#
+#   before_serialize -> after_serialize -> sent -> first_byte -> received -> decoded
+#
+# Requests without a body, and prepared read plans (serialized once when the
+# plan is built), skip the serialize stages. "decoded" is emitted even when
+# the request or its decoding fails. Sizes are in bytes, except for "decoded"
+# where it is the number of decoded items.
+#
+import sys
+from threading import Lock, Thread, get_ident
+import time
+
+STAGES = ("before_serialize", "after_serialize", "sent", "first_byte", "received", "decoded")
+
+class RequestTrace (object):
+    def __init__(self, operation, api):
+        self.operation = operation
+        self.api = api
+        self.thread_id = get_ident()
+        self.timestamps = {}
+        self.sizes = {}
+        self.last_stage = None
+
+    def mark(self, stage, size):
+        self.timestamps[stage] = time.perf_counter_ns()
+        self.sizes[stage] = size
+        self.last_stage = stage
+
+class RequestHook (object):
+    #
+    # Base class; override the stages you are interested in
+    #
+    def before_serialize(self, trace): pass
+    def after_serialize(self, trace): pass
+    def sent(self, trace): pass
+    def first_byte(self, trace): pass
+    def received(self, trace): pass
+    def decoded(self, trace): pass
+
+class RequestHooks (object):
+    #
+    # Hook set shared by reference between an APIClient and the API objects it creates
+    #
+    def __init__(self):
+        self.hooks = []
+
+    def add(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove(self, hook):
+        self.hooks.remove(hook)
+
+    def emit(self, stage, trace):
+        for hook in self.hooks:
+            getattr(hook, stage)(trace)
+
+#
+# Time spent in a phase is attributed to the stage that ends it
+#
+PHASES = {
+    "after_serialize": "serialize",
+    "sent": "prepare",
+    "first_byte": "wait",
+    "received": "transfer",
+    "decoded": "decode",
+}
+
+class PhaseStats (object):
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.bytes = 0
+
+    def add(self, elapsed_ns, size):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.bytes += size
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+class HookAggregator (RequestHook):
+    #
+    # In-memory aggregation of time and bytes per operation and phase
+    #
+    def __init__(self):
+        self.lock = Lock()
+        self.operations = {}
+
+    def _record(self, trace, stage):
+        previous = STAGES[STAGES.index(stage) - 1]
+        if previous not in trace.timestamps:
+            return
+        elapsed = trace.timestamps[stage] - trace.timestamps[previous]
+        with self.lock:
+            phases = self.operations.setdefault(trace.operation, {})
+            phases.setdefault(PHASES[stage], PhaseStats()).add(elapsed, trace.sizes[stage])
+
+    def after_serialize(self, trace): self._record(trace, "after_serialize")
+    def sent(self, trace): self._record(trace, "sent")
+    def first_byte(self, trace): self._record(trace, "first_byte")
+    def received(self, trace): self._record(trace, "received")
+    def decoded(self, trace): self._record(trace, "decoded")
+
+    def summary(self):
+        rtn = {}
+        with self.lock:
+            for operation, phases in self.operations.items():
+                rtn[operation] = {
+                    phase: {
+                        "count": stats.count,
+                        "mean_ms": stats.total_ns / stats.count / 1e6,
+                        "max_ms": stats.max_ns / 1e6,
+                        "bytes": stats.bytes,
+                    } for phase, stats in phases.items()
+                }
+        return rtn
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+
+class SamplingProfilerHook (RequestHook):
+    #
+    # Samples the stack of threads with a request in flight every `interval` seconds
+    # and attributes each sample to the current phase and innermost function.
+    #
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.lock = Lock()
+        self.active = {}
+        self.samples = {}
+        self.running = False
+
+    def start(self):
+        self.running = True
+        thread = Thread(target=self.run, daemon=True)
+        thread.start()
+        return True
+
+    def exit(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, (operation, phase) in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    code = frame.f_code
+                    key = (operation, phase, f"{code.co_filename}:{frame.f_lineno} {code.co_name}")
+                    self.samples[key] = self.samples.get(key, 0) + 1
+            time.sleep(self.interval)
+
+    def _enter(self, trace, phase):
+        with self.lock:
+            self.active[trace.thread_id] = (trace.operation, phase)
+
+    def before_serialize(self, trace): self._enter(trace, "serialize")
+    def after_serialize(self, trace): self._enter(trace, "prepare")
+    def sent(self, trace): self._enter(trace, "wait")
+    def first_byte(self, trace): self._enter(trace, "transfer")
+    def received(self, trace): self._enter(trace, "decode")
+
+    def decoded(self, trace):
+        with self.lock:
+            self.active.pop(trace.thread_id, None)
+
+    def report(self, top=20):
+        with self.lock:
+            ranked = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)
+        return [{"operation": op, "phase": phase, "location": location, "samples": count} for (op, phase, location), count in ranked[:top]]
@@ -0,0 +1,180 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Fixed-memory time-series history per topic.
+#
+# Each TopicRing keeps the last `capacity` samples in one preallocated buffer,
+# viewed as typed arrays:
+#
+#   header   2 x int64    next write position, number of samples
+#   ts       n x int64    timestamps, microseconds since the epoch
+#   values   n x float64
+#   quality  n x uint8
+#
+# The buffer may be supplied by the caller (e.g. a slice of a memory-mapped
+# file), otherwise a bytearray is allocated. Samples must arrive in time order;
+# older samples are dropped. Range and last-N queries return memoryview
+# segments of the buffers (two when the ring wraps), without copying.
+#
+from bisect import bisect_left
+import math
+
+from classes.api_classes import MessageReadAdvancedResp
+from classes.enums import quality_enum
+from lib.timestamps import now_us, to_us
+
+HEADER = 16
+
+class TopicRing (object):
+    def __init__(self, capacity, storage=None):
+        self.capacity = capacity
+        if storage is None:
+            storage = bytearray(TopicRing.nbytes(capacity))
+        view = memoryview(storage)
+        if len(view) < TopicRing.nbytes(capacity):
+            raise Exception (f"ring storage too small: {len(view)} < {TopicRing.nbytes(capacity)} bytes")
+        ts_end = HEADER + 8 * capacity
+        values_end = ts_end + 8 * capacity
+        self.header = view[:HEADER].cast("q")
+        self.ts = view[HEADER:ts_end].cast("q")
+        self.values = view[ts_end:values_end].cast("d")
+        self.quality = view[values_end:values_end + capacity].cast("B")
+        self.dropped = 0
+
+    @staticmethod
+    def nbytes(capacity):
+        return HEADER + 17 * capacity
+
+    def __len__(self):
+        return self.header[1]
+
+    def last_ts(self):
+        if self.header[1] == 0:
+            return None
+        return self.ts[(self.header[0] - 1) % self.capacity]
+
+    def append(self, ts, value, quality):
+        head, count = self.header[0], self.header[1]
+        if count and ts < self.ts[(head - 1) % self.capacity]:
+            self.dropped += 1
+            return False
+        self.ts[head] = ts
+        self.values[head] = value
+        self.quality[head] = quality
+        self.header[0] = (head + 1) % self.capacity
+        if count < self.capacity:
+            self.header[1] = count + 1
+        return True
+
+    def segments(self):
+        #
+        # Oldest to newest, as (start, end) index pairs into the buffers
+        #
+        head, count = self.header[0], self.header[1]
+        if count < self.capacity:
+            return [(0, count)] if count else []
+        return [(head, self.capacity), (0, head)] if head else [(0, self.capacity)]
+
+    def view(self, start, end):
+        return (self.ts[start:end], self.values[start:end], self.quality[start:end])
+
+    def last(self, n):
+        rtn = []
+        for start, end in reversed(self.segments()):
+            if n <= 0:
+                break
+            take = min(n, end - start)
+            rtn.insert(0, self.view(end - take, end))
+            n -= take
+        return rtn
+
+    def range(self, start_us, end_us):
+        #
+        # Samples with start_us <= ts < end_us
+        #
+        rtn = []
+        for start, end in self.segments():
+            ts = self.ts[start:end]
+            lo = bisect_left(ts, start_us)
+            hi = bisect_left(ts, end_us)
+            if lo < hi:
+                rtn.append(self.view(start + lo, start + hi))
+        return rtn
+
+    def resample(self, start_us, end_us, step_us, how="last"):
+        #
+        # One value per step: "last", "mean", "min" or "max" of the samples in it,
+        # NaN for steps without samples
+        #
+        buckets = int(math.ceil((end_us - start_us) / step_us))
+        rtn = [math.nan] * buckets
+        counts = [0] * buckets
+        for ts, values, _ in self.range(start_us, end_us):
+            for t, v in zip(ts, values):
+                i = (t - start_us) // step_us
+                c = counts[i]
+                if c == 0 or how == "last":
+                    rtn[i] = v
+                elif how == "mean":
+                    rtn[i] += (v - rtn[i]) / (c + 1)
+                elif how == "min":
+                    rtn[i] = min(rtn[i], v)
+                elif how == "max":
+                    rtn[i] = max(rtn[i], v)
+                counts[i] = c + 1
+        return rtn
+
+class RingStore (object):
+    #
+    # One TopicRing per topic, created on first sample up to max_topics.
+    # allocate(topic, capacity) may be replaced to supply external storage.
+    #
+    def __init__(self, capacity=3600, max_topics=256, topics=None):
+        self.capacity = capacity
+        self.max_topics = max_topics
+        self.topics = set(topics) if topics else None
+        self.rings = {}
+
+    def allocate(self, topic, capacity):
+        return TopicRing(capacity)
+
+    def ring(self, topic):
+        ring = self.rings.get(topic)
+        if ring is None and len(self.rings) < self.max_topics and (self.topics is None or topic in self.topics):
+            ring = self.rings[topic] = self.allocate(topic, self.capacity)
+        return ring
+
+    def append(self, topic, value, quality, ts=None):
+        if isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, (int, float)):
+            return False
+        ring = self.ring(topic)
+        if ring is None:
+            return False
+        if isinstance(quality, quality_enum):
+            quality = quality.value
+        return ring.append(ts if ts is not None else now_us(), value, quality)
+
+    def feed(self, responses):
+        #
+        # messageRead results, messageReadAdvanced results or webhook payloads.
+        # Advanced datapoints are kept as "<topic><dataPointName>".
+        #
+        for response in responses:
+            if response is None:
+                continue
+            if isinstance(response, MessageReadAdvancedResp):
+                for dp in response.datapoints:
+                    for value, stamp in zip(dp.values, dp.timeStamps):
+                        self.append(response.topic + dp.dataPointName, value, dp.quality, to_us(stamp))
+            else:
+                self.append(response.topic, response.value, response.quality, to_us(response.timeStamp))
+
+    def get(self, topic):
+        return self.rings.get(topic)
+
+    def nbytes(self):
+        return sum(TopicRing.nbytes(ring.capacity) for ring in self.rings.values())
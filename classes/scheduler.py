@@ -0,0 +1,67 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# One timer thread for many periodic jobs (heartbeats, app cycles, retries).
+#
+# Due jobs are handed to a shared thread pool, so a slow job only delays
+# itself. every() reschedules a job `period` seconds after it finishes,
+# so a job never overlaps with itself; a job returning False is not rescheduled.
+#
+import heapq
+import itertools
+from threading import Condition, Thread
+import time
+
+class Scheduler (object):
+    def __init__(self, logger, executor):
+        self.logger = logger
+        self.executor = executor
+        self.jobs = []
+        self.counter = itertools.count()
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self.run, name="scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def exit(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def call_later(self, delay, func, *args):
+        with self.condition:
+            heapq.heappush(self.jobs, (time.monotonic() + delay, next(self.counter), func, args))
+            self.condition.notify()
+
+    def every(self, period, func, *args):
+        def job():
+            again = None
+            try:
+                again = func(*args)
+            finally:
+                if self.running and again is not False:
+                    self.call_later(period, job)
+        self.call_later(0.0, job)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and (not self.jobs or self.jobs[0][0] > time.monotonic()):
+                    self.condition.wait(self.jobs[0][0] - time.monotonic() if self.jobs else None)
+                if not self.running:
+                    return
+                _, _, func, args = heapq.heappop(self.jobs)
+            self.executor.submit(self.guard, func, args)
+
+    def guard(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            self.logger.error("Scheduled job %s failed. Error: %s", getattr(func, "__name__", func), e)
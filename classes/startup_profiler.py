@@ -0,0 +1,90 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Cold start profiling (app.py --profile-startup)
+#
+# Installed first on sys.meta_path, it wraps the loader of every module
+# imported afterwards and records the time spent executing it: inclusive
+# (with the modules it imports) and self (without them). mark() records
+# milestones such as the first successful messageRead.
+#
+import json
+import sys
+import time
+
+class TimedLoader (object):
+    def __init__(self, loader, profiler, name):
+        self.loader = loader
+        self.profiler = profiler
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        profiler = self.profiler
+        profiler.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = profiler.stack.pop()
+            if profiler.stack:
+                profiler.stack[-1] += elapsed
+            profiler.modules[self.name] = (elapsed, elapsed - children)
+
+class StartupProfiler (object):
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.modules = {}
+        self.stack = []
+        self.marks = {}
+        self.finding = set()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self.finding:
+            return None
+        self.finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = TimedLoader(spec.loader, self, fullname)
+                    return spec
+            return None
+        finally:
+            self.finding.discard(fullname)
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter() - self.start
+
+    def report(self, top=25):
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "import_total_s": sum(self_time for _, self_time in self.modules.values()),
+            "modules": len(self.modules),
+            "marks": self.marks,
+            "slowest": [{"module": name, "self_ms": self_time * 1e3, "inclusive_ms": total * 1e3} for name, (total, self_time) in ranked[:top]],
+        }
+
+    def dump(self, stream=None):
+        # one JSON line, so that bench/startup_check.py can parse it
+        (stream or sys.stdout).write(json.dumps(self.report()) + "\n")
+        (stream or sys.stdout).flush()
@@ -0,0 +1,282 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Streaming statistics per topic, O(1) per update.
+#
+# RunningStats  count/min/max/mean/variance (Welford), mergeable (Chan et al.)
+# P2Quantile    streaming quantile estimate in constant memory (Jain & Chlamtac P²)
+#
+# Windows are aligned to wall-clock boundaries (multiples of their length since
+# the epoch), so a window of 300 s always covers hh:00-hh:05, hh:05-hh:10, ...
+#
+# tumbling  consecutive, non-overlapping windows; the last closed window is kept
+# sliding   the last `length` seconds, kept as `panes` sub-windows that are
+#           merged when queried (quantiles are only tracked on tumbling windows)
+#
+import math
+import time
+
+from classes.api_classes import MessageReadAdvancedResp, TvqtDataPoint
+from classes.enums import quality_enum
+from lib.timestamps import now_us, to_us
+
+class RunningStats (object):
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def snapshot(self):
+        if self.count == 0:
+            return {"count": 0}
+        variance = self.variance()
+        return {"count": self.count, "min": self.min, "max": self.max, "mean": self.mean, "variance": variance, "stddev": math.sqrt(variance)}
+
+class P2Quantile (object):
+    __slots__ = ("p", "q", "n", "np", "dn")
+
+    def __init__(self, p):
+        self.p = p
+        self.reset()
+
+    def reset(self):
+        p = self.p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update(self, x):
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        q = self.q
+        if not q:
+            return None
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(self.p * len(q)))]
+        return q[2]
+
+def quantile_name(p):
+    return "p" + format(p * 100, "g").replace(".", "_")
+
+class TumblingWindow (object):
+    def __init__(self, length, quantiles):
+        self.length = length
+        self.index = None
+        self.stats = RunningStats()
+        self.sketches = [P2Quantile(p) for p in quantiles]
+        self.closed = None
+        self.dropped = 0
+
+    def roll(self, ts):
+        #
+        # False for a timestamp of a window already closed: the open window is kept
+        #
+        index = int(ts // self.length)
+        if self.index is not None and index < self.index:
+            return False
+        if index != self.index:
+            if self.index is not None:
+                self.closed = self.snapshot() if index == self.index + 1 else None
+            self.index = index
+            self.stats.reset()
+            for sketch in self.sketches:
+                sketch.reset()
+        return True
+
+    def update(self, x, ts):
+        if not self.roll(ts):
+            self.dropped += 1
+            return False
+        self.stats.update(x)
+        for sketch in self.sketches:
+            sketch.update(x)
+        return True
+
+    def snapshot(self):
+        rtn = self.stats.snapshot()
+        rtn["start"] = self.index * self.length
+        if self.stats.count:
+            for sketch in self.sketches:
+                rtn[quantile_name(sketch.p)] = sketch.value()
+        return rtn
+
+class SlidingWindow (object):
+    def __init__(self, length, panes):
+        self.length = length
+        self.pane_length = length / panes
+        self.panes = [RunningStats() for _ in range(panes)]
+        self.indexes = [None] * panes
+        self.dropped = 0
+
+    def update(self, x, ts):
+        index = int(ts // self.pane_length)
+        slot = index % len(self.panes)
+        if self.indexes[slot] is not None and index < self.indexes[slot]:
+            # older than the window: its pane has been reused already
+            self.dropped += 1
+            return False
+        if self.indexes[slot] != index:
+            self.indexes[slot] = index
+            self.panes[slot].reset()
+        self.panes[slot].update(x)
+        return True
+
+    def snapshot(self, now):
+        current = int(now // self.pane_length)
+        rtn = RunningStats()
+        for index, pane in zip(self.indexes, self.panes):
+            if index is not None and current - len(self.panes) < index <= current:
+                rtn.merge(pane)
+        return rtn.snapshot()
+
+class TopicStats (object):
+    def __init__(self, tumbling, sliding, panes, quantiles):
+        self.tumbling = TumblingWindow(tumbling, quantiles)
+        self.sliding = SlidingWindow(sliding, panes)
+
+    def update(self, x, ts):
+        self.tumbling.update(x, ts)
+        self.sliding.update(x, ts)
+
+class StatsEngine (object):
+    #
+    # Fed from the app loop thread. Non-numeric values are ignored.
+    #
+    def __init__(self, tumbling=60.0, sliding=300.0, panes=10, quantiles=(0.5, 0.95)):
+        self.tumbling = tumbling
+        self.sliding = sliding
+        self.panes = panes
+        self.quantiles = tuple(quantiles)
+        self.topics = {}
+
+    def set_tumbling(self, length):
+        #
+        # A new length restarts the tumbling windows at the next boundary
+        #
+        if length == self.tumbling:
+            return
+        self.tumbling = length
+        for stats in self.topics.values():
+            stats.tumbling = TumblingWindow(length, self.quantiles)
+
+    def window_index(self, ts=None):
+        return int((ts if ts is not None else time.time()) // self.tumbling)
+
+    def update(self, topic, value, ts=None):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        stats = self.topics.get(topic)
+        if stats is None:
+            stats = self.topics[topic] = TopicStats(self.tumbling, self.sliding, self.panes, self.quantiles)
+        stats.update(float(value), ts if ts is not None else time.time())
+
+    def feed(self, responses):
+        #
+        # messageRead results, messageReadAdvanced results or webhook payloads.
+        # Advanced datapoints are tracked as "<topic><dataPointName>".
+        #
+        for response in responses:
+            if response is None:
+                continue
+            if isinstance(response, MessageReadAdvancedResp):
+                for dp in response.datapoints:
+                    for value, stamp in zip(dp.values, dp.timeStamps):
+                        self.update(response.topic + dp.dataPointName, value, epoch_seconds(stamp))
+            else:
+                self.update(response.topic, response.value, epoch_seconds(response.timeStamp))
+
+    def snapshot(self, topic, window="tumbling", now=None):
+        stats = self.topics.get(topic)
+        if stats is None:
+            return {"count": 0}
+        now = now if now is not None else time.time()
+        if window == "sliding":
+            return stats.sliding.snapshot(now)
+        stats.tumbling.roll(now)
+        if window == "closed":
+            return stats.tumbling.closed if stats.tumbling.closed is not None else {"count": 0}
+        return stats.tumbling.snapshot()
+
+    def outputs(self, mapping, window="tumbling", now=None, timestamp=None):
+        #
+        # mapping: {output_topic: (topic, stat)}, e.g. {"...cpuusagemax.": ("...cpuUsage|.total.", "max")}.
+        # Returns TvqtDataPoints for the stats that have a value, ready for one messageWrite.
+        #
+        rtn = []
+        snapshots = {}
+        for output_topic, (topic, stat) in mapping.items():
+            if topic not in snapshots:
+                snapshots[topic] = self.snapshot(topic, window, now)
+            value = snapshots[topic].get(stat)
+            if value is not None:
+                rtn.append(TvqtDataPoint(topic=output_topic, value=value, quality=quality_enum.OK, timeStamp=timestamp if timestamp is not None else now_us()))
+        return rtn
+
+def epoch_seconds(stamp):
+    us = to_us(stamp)
+    return us / 1e6 if us is not None else None
@@ -0,0 +1,132 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# Per-topic fault isolation for batched reads and writes. When a batch fails
+# because of its content (a 400/422 answer, a 404 that names a topic of the
+# batch, or an empty read-advanced answer), the topics named by the answer
+# are set aside and the rest of the batch is bisected until the offending
+# topics are found. Those topics are quarantined with a jittered, doubling
+# retry timer while the healthy ones keep being served in one batched request.
+# When every topic of the batch fails, the fault is not in the topics (a
+# wrong URL, a server error): the error is raised and nothing is quarantined.
+#
+from threading import Lock
+import time
+import requests
+
+from config.apiconfig import ApiConfig
+from lib.miscfuncs import jittered_backoff
+
+TOPIC_ERROR_STATUS = (400, 422)
+NOT_FOUND = 404
+
+class TopicError(Exception):
+    pass
+
+def named_topics(e, topics):
+    #
+    # Topics of the batch that the server's error answer names
+    #
+    if not isinstance(e, requests.exceptions.HTTPError) or e.response is None:
+        return []
+    text = e.response.text
+    return [topic for topic in topics if topic in text]
+
+def is_topic_error(e, topics):
+    #
+    # A 404 also answers a wrong URL: it only counts when it names a topic, or for a lone topic
+    #
+    if isinstance(e, TopicError):
+        return True
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+        if e.response.status_code == NOT_FOUND:
+            return len(topics) == 1 or len(named_topics(e, topics)) > 0
+        return e.response.status_code in TOPIC_ERROR_STATUS
+    return False
+
+class TopicQuarantine (object):
+    def __init__(self, cfg: ApiConfig = None):
+        self.cfg = cfg if cfg is not None else ApiConfig()
+        self.lock = Lock()
+        self.entries = {}
+
+    def configure(self, cfg: ApiConfig):
+        self.cfg = cfg
+
+    def add(self, topic):
+        with self.lock:
+            _, failures = self.entries.get(topic, (0.0, 0))
+            delay = jittered_backoff(failures, self.cfg.topic_quarantine_base, self.cfg.topic_quarantine_cap)
+            # the count only drives the backoff, which is at its cap long before 64
+            self.entries[topic] = (time.monotonic() + delay, min(failures + 1, 64))
+
+    def release(self, topics):
+        if not self.entries:
+            return
+        with self.lock:
+            for topic in topics:
+                self.entries.pop(topic, None)
+
+    def blocked(self, topic, now):
+        entry = self.entries.get(topic)
+        return entry is not None and now < entry[0]
+
+    def any_blocked(self, topics):
+        if not self.entries:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            return any(self.blocked(topic, now) for topic in topics)
+
+    def healthy(self, items, key):
+        #
+        # Items whose topic is not quarantined, or whose retry timer has expired
+        #
+        if not self.entries:
+            return items
+        now = time.monotonic()
+        with self.lock:
+            return [item for item in items if not self.blocked(key(item), now)]
+
+    def status(self):
+        now = time.monotonic()
+        with self.lock:
+            return {topic: {"retry_in": max(0.0, until - now), "failures": failures} for topic, (until, failures) in self.entries.items()}
+
+    def isolate(self, request, items, key):
+        #
+        # request(items) returns a list of results or raises. Returns the results
+        # for the healthy items, in order, and the items rejected on their own,
+        # which are quarantined.
+        #
+        rejected = []
+        errors = []
+        results = self.bisect(request, items, key, rejected, errors)
+        if len(rejected) == len(items):
+            raise errors[0]
+        for item in rejected:
+            self.add(key(item))
+        return results, rejected
+
+    def bisect(self, request, items, key, rejected, errors):
+        topics = [key(item) for item in items]
+        try:
+            results = request(items)
+        except Exception as e:
+            if not is_topic_error(e, topics):
+                raise
+            errors.append(e)
+            if len(items) == 1:
+                rejected.append(items[0])
+                return []
+            named = set(named_topics(e, topics))
+            if named:
+                rejected.extend(item for item in items if key(item) in named)
+                rest = [item for item in items if key(item) not in named]
+                return self.bisect(request, rest, key, rejected, errors) if rest else []
+            half = len(items) // 2
+            return self.bisect(request, items[:half], key, rejected, errors) + self.bisect(request, items[half:], key, rejected, errors)
+        self.release(topics)
+        return results
@@ -0,0 +1,90 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+# HTTP over a unix domain socket, for a REST server on the same device.
+#
+# URLs follow the nginx convention, socket path then HTTP path after a colon:
+#
+#   unix:///run/hcc2/rest.sock:/api/v1
+#
+# UnixAdapter is mounted on "unix://" in every client session, so the API
+# classes build and send their URLs as usual.
+#
+import socket
+from threading import Lock
+
+from requests.adapters import HTTPAdapter
+from requests.utils import requote_uri
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+SCHEME = "unix://"
+
+def is_unix_url(url):
+    return url.lower().startswith(SCHEME)
+
+def split_unix_url(url):
+    #
+    # "unix:///run/rest.sock:/api/v1?x=1" -> ("/run/rest.sock", "/api/v1?x=1")
+    #
+    rest = url[len(SCHEME):]
+    socket_path, sep, path = rest.partition(":")
+    return socket_path, (path if sep and path else "/")
+
+class UnixConnection (HTTPConnection):
+    def __init__(self, *args, socket_path="", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        timeout = self.timeout if isinstance(self.timeout, (int, float)) else socket.getdefaulttimeout()
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            # as for TCP, so that a request that never left is known to be safe to retry
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        return sock
+
+class UnixConnectionPool (HTTPConnectionPool):
+    ConnectionCls = UnixConnection
+
+    def __init__(self, socket_path, **kwargs):
+        # extra keyword arguments are handed to every new connection
+        super().__init__("localhost", socket_path=socket_path, **kwargs)
+
+class UnixAdapter (HTTPAdapter):
+    def __init__(self, pool_maxsize=10, **kwargs):
+        self.unix_pools = {}
+        self.unix_pools_lock = Lock()
+        super().__init__(pool_maxsize=pool_maxsize, **kwargs)
+
+    def unix_pool(self, url):
+        socket_path, _ = split_unix_url(url)
+        with self.unix_pools_lock:
+            pool = self.unix_pools.get(socket_path)
+            if pool is None:
+                pool = self.unix_pools[socket_path] = UnixConnectionPool(socket_path, maxsize=self._pool_maxsize, block=self._pool_block)
+            return pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.unix_pool(request.url)
+
+    def get_connection(self, url, proxies=None):
+        return self.unix_pool(url)
+
+    def request_url(self, request, proxies):
+        # requests leaves URLs of unknown schemes untouched, so quote them here
+        return requote_uri(split_unix_url(request.url)[1])
+
+    def close(self):
+        super().close()
+        with self.unix_pools_lock:
+            for pool in self.unix_pools.values():
+                pool.close()
+            self.unix_pools.clear()
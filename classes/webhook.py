@@ -1,13 +1,19 @@
 from logging import Logger
+import os
 from threading import Thread
 import time
 import queue
-from typing import List
-from fastapi import FastAPI, HTTPException, Response, status
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 
 from classes.api_classes import MessageOutboundInterchange, MessageReadAdvancedResp
+from classes.capture import TrafficCapture
+from classes.metrics import registry as metrics
+from classes.unix_transport import is_unix_url, split_unix_url
+from config.apiconfig import ApiConfig, EnvVariables
 from config.appconfig import AppConfig
 from lib.webhookfuncs import enqueue
 
@@ -19,6 +25,10 @@ class WebHook (BaseModel):
     suffix:str = ""
     protocol:str = ""
     port:int = 0
+    uds:str = ""
+    callback_url:str = ""           # as read by the API client, set before start(); defaults to SDK2_CALLBACK_URL
+    capture: Optional[TrafficCapture] = None
+    routes: Optional[dict] = None   # app name -> queue, for apps hosted in one process (classes/app_host.py)
 
     class Config:
         arbitrary_types_allowed = True
@@ -30,6 +40,21 @@ class WebHook (BaseModel):
         self.protocol = self.config.wh.protocol
         self.port = self.config.wh.port
 
+    def listen_socket(self):
+        #
+        # Listen on a unix domain socket when the callback URL is unix://<socket path>[:<path>].
+        # The server posts to the HTTP path of that URL, so it has to match the webhook suffix.
+        #
+        callback_url = self.callback_url
+        if callback_url == "":
+            callback_url = os.environ.get(EnvVariables().api_callback_url, ApiConfig().api_callback_url)
+        if not is_unix_url(callback_url):
+            return ""
+        socket_path, path = split_unix_url(callback_url)
+        if path.split("?")[0].rstrip("/") != self.suffix.rstrip("/"):
+            self.logger.warning("Webhook - callback URL path %s does not match the webhook suffix %s, callbacks will not be routed.", path, self.suffix)
+        return socket_path
+
     def start(self):
           
         thread = Thread(target=self.run)
@@ -38,10 +63,11 @@ class WebHook (BaseModel):
     
     def run(self):
         self.webhook_mgr()
-        self.logger.warning(f"Webhook tread ENDED.")
+        self.logger.warning("Webhook tread ENDED.")
 
     def webhook_mgr(self):
 
+        self.uds = self.listen_socket()
         app = FastAPI(title="Webhook API")
         test_command = self.suffix + self.config.wh.test.command
         single_message_command = self.suffix + self.config.wh.simple_message.command
@@ -54,12 +80,14 @@ class WebHook (BaseModel):
             return
 
         @app.api_route(single_message_command,  methods=[self.config.wh.simple_message.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)          
-        async def simple_message(payload: MessageOutboundInterchange, response: Response):
+        async def simple_message(payload: MessageOutboundInterchange, request: Request, response: Response):
 
             try:
                 #
                 # Queue the record
                 # 
+                if self.capture is not None:
+                    self.capture.record_callback(request.url.path, await request.body())
                 data = enqueue(self.queue, payload)
                 return {"status": "OK"}
 
@@ -67,11 +95,13 @@ class WebHook (BaseModel):
                 raise HTTPException(status_code=500, detail="Internal Server Error. Message: " + str(e))
     
         @app.api_route(set_of_messages_command,  methods=[self.config.wh.set_of_messages.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)          
-        async def set_of_message(payload: MessageOutboundInterchange, response: Response):
+        async def set_of_message(payload: MessageOutboundInterchange, request: Request, response: Response):
             try:
                 #
                 # Queue the record
                 # 
+                if self.capture is not None:
+                    self.capture.record_callback(request.url.path, await request.body())
                 data = enqueue(self.queue, payload)
                 return {"status": "OK"}
 
@@ -79,19 +109,56 @@ class WebHook (BaseModel):
                 raise HTTPException(status_code=500, detail="Internal Server Error. Message: " + str(e))
 
         @app.api_route(advanced_messages_command,  methods=[self.config.wh.advanced_messages.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)          
-        async def advanced_message(payload: MessageReadAdvancedResp, response: Response):      
+        async def advanced_message(payload: MessageReadAdvancedResp, request: Request, response: Response):      
             try:
                 #
                 # Queue the record
                 # 
+                if self.capture is not None:
+                    self.capture.record_callback(request.url.path, await request.body())
                 data = enqueue(self.queue, payload)
                 return {"status": "OK"}
 
             except Exception as e:
                 raise HTTPException(status_code=500, detail="Internal Server Error. Message: " + str(e))
 
-
-        uvicorn.run(app, host=self.host, port=self.port, log_level=self.config.log.api_level.lower())
+        #
+        # Hosted apps: <suffix><app name>/<command> is queued for that app only
+        #
+        if self.routes is not None:
+            async def route(app_name, payload, request):
+                q = self.routes.get(app_name)
+                if q is None:
+                    raise HTTPException(status_code=404, detail="Unknown application: " + app_name)
+                try:
+                    if self.capture is not None:
+                        self.capture.record_callback(request.url.path, await request.body())
+                    enqueue(q, payload)
+                    return {"status": "OK"}
+                except Exception as e:
+                    raise HTTPException(status_code=500, detail="Internal Server Error. Message: " + str(e))
+
+            @app.api_route(self.suffix + "{app_name}/" + self.config.wh.simple_message.command, methods=[self.config.wh.simple_message.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)
+            async def app_simple_message(app_name: str, payload: MessageOutboundInterchange, request: Request):
+                return await route(app_name, payload, request)
+
+            @app.api_route(self.suffix + "{app_name}/" + self.config.wh.set_of_messages.command, methods=[self.config.wh.set_of_messages.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)
+            async def app_set_of_messages(app_name: str, payload: MessageOutboundInterchange, request: Request):
+                return await route(app_name, payload, request)
+
+            @app.api_route(self.suffix + "{app_name}/" + self.config.wh.advanced_messages.command, methods=[self.config.wh.advanced_messages.operation], tags=[self.config.wh.group_tag], status_code=status.HTTP_200_OK)
+            async def app_advanced_messages(app_name: str, payload: MessageReadAdvancedResp, request: Request):
+                return await route(app_name, payload, request)
+
+        if self.config.metrics.enabled == True:
+            @app.get(self.config.metrics.route, response_class=PlainTextResponse)
+            async def metrics_export():
+                return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+        if self.uds != "":
+            uvicorn.run(app, uds=self.uds, log_level=self.config.log.api_level.lower())
+        else:
+            uvicorn.run(app, host=self.host, port=self.port, log_level=self.config.log.api_level.lower())
 
 
 
@@ -18,28 +18,49 @@ class ApiConfig (BaseModel):
     api_version: str = "0.0.0"
     api_suffix: str = "api/v1"
     api_timeout: int = 10
+    api_pool_size: int = 10
+    api_batch_workers: int = 4
+    read_chunk_size: int = 500          # initial topics per read request, 0 disables chunking
+    read_chunk_min: int = 25
+    read_chunk_max: int = 5000
+    read_chunk_inflight: int = 4
+    read_chunk_target: float = 0.2      # target chunk latency, as a fraction of api_timeout
+    stream_chunk_size: int = 65536      # bytes read at a time by streaming decoders
+    api_retries: int = 2                # transport retries on connection errors and 5xx
+    api_retry_base: float = 0.1
+    api_retry_cap: float = 2.0
+    retry_budget_ratio: float = 0.2     # retries earned per successful call
+    retry_budget_min_per_sec: float = 1.0
+    breaker_failure_threshold: int = 5  # consecutive failures that open an endpoint's circuit
+    breaker_open_base: float = 1.0
+    breaker_open_cap: float = 60.0
+    topic_isolation: bool = True        # bisect failing batches and quarantine the offending topics
+    topic_quarantine_base: float = 5.0
+    topic_quarantine_cap: float = 300.0
     datetime_query_format: str = "%Y-%m-%dT%H:%M:%S.000Z"
     api_msg_source:str = "REST"
     api_test_topic: str = "liveValue.state.this.core.0.up."
 
 class Operation(BaseModel):
+      name: str = ""
       method: str
       command: str
       suffix: str
+      idempotent: bool = False       # safe to send again after a timeout or 5xx (see APIBase.Send)
 
 class Ops (BaseModel):
-    messageInitializeApplication: ClassVar[Operation] = Operation(method="PUT", command="/app-creator", suffix="/{0}/defaults")
-    messageRegisterApplication:  ClassVar[Operation] = Operation(method="POST", command="/app-registration", suffix="/{0}?isComplexProvisioned={1}")
-    messageHeartbeatApplication: ClassVar[Operation] = Operation(method="PUT", command="/app-provision", suffix="/{0}")
-    messageExtractConfiguration: ClassVar[Operation] = Operation(method="GET", command="/app-provision", suffix="/{0}/targz")
-    messageCheckProvision: ClassVar[Operation] = Operation(method="GET", command="/app-provision", suffix="/{0}")
-    messageValidateProvision: ClassVar[Operation] = Operation(method="POST", command="/app-provision", suffix="/{0}")
-    messageCreateGeneralDatapoints: ClassVar[Operation] = Operation(method="PUT", command="/app-creator", suffix="/{0}/datapoint/general")
-    messageRead: ClassVar[Operation] = Operation(method="POST", command="/message/read", suffix="")
-    messageReadAdvanced: ClassVar[Operation] = Operation(method="POST", command="/message/read-advanced", suffix="")
-    messageWrite: ClassVar[Operation] = Operation(method="POST", command="/message/write", suffix="")
-    messageWriteAdvanced: ClassVar[Operation] = Operation(method="POST", command="/message/write-advanced", suffix="")
-    deleteAllSubscriptions: ClassVar[Operation] = Operation(method="DELETE", command="/message/subscription", suffix="/{0}")
-    simpleMessageSubscribe: ClassVar[Operation] = Operation(method="PUT", command="/message/subscription", suffix="/{0}/{1}?callbackapi={2}&includeOptional={3}")
-    setOfMessagesSubscribe: ClassVar[Operation] = Operation(method="POST", command="/message/subscription", suffix="/{0}")
-    advancedMessagesSubscribe: ClassVar[Operation] = Operation(method="POST", command="/message/subscription-advanced", suffix="/{0}")
\ No newline at end of file
+    messageInitializeApplication: ClassVar[Operation] = Operation(name="messageInitializeApplication", method="PUT", command="/app-creator", suffix="/{0}/defaults")
+    messageRegisterApplication:  ClassVar[Operation] = Operation(name="messageRegisterApplication", method="POST", command="/app-registration", suffix="/{0}?isComplexProvisioned={1}")
+    messageHeartbeatApplication: ClassVar[Operation] = Operation(name="messageHeartbeatApplication", method="PUT", command="/app-provision", suffix="/{0}", idempotent=True)
+    messageExtractConfiguration: ClassVar[Operation] = Operation(name="messageExtractConfiguration", method="GET", command="/app-provision", suffix="/{0}/targz", idempotent=True)
+    messageCheckProvision: ClassVar[Operation] = Operation(name="messageCheckProvision", method="GET", command="/app-provision", suffix="/{0}", idempotent=True)
+    messageValidateProvision: ClassVar[Operation] = Operation(name="messageValidateProvision", method="POST", command="/app-provision", suffix="/{0}")
+    messageCreateGeneralDatapoints: ClassVar[Operation] = Operation(name="messageCreateGeneralDatapoints", method="PUT", command="/app-creator", suffix="/{0}/datapoint/general")
+    messageRead: ClassVar[Operation] = Operation(name="messageRead", method="POST", command="/message/read", suffix="", idempotent=True)
+    messageReadAdvanced: ClassVar[Operation] = Operation(name="messageReadAdvanced", method="POST", command="/message/read-advanced", suffix="", idempotent=True)
+    messageWrite: ClassVar[Operation] = Operation(name="messageWrite", method="POST", command="/message/write", suffix="")
+    messageWriteAdvanced: ClassVar[Operation] = Operation(name="messageWriteAdvanced", method="POST", command="/message/write-advanced", suffix="")
+    deleteAllSubscriptions: ClassVar[Operation] = Operation(name="deleteAllSubscriptions", method="DELETE", command="/message/subscription", suffix="/{0}", idempotent=True)
+    simpleMessageSubscribe: ClassVar[Operation] = Operation(name="simpleMessageSubscribe", method="PUT", command="/message/subscription", suffix="/{0}/{1}?callbackapi={2}&includeOptional={3}")
+    setOfMessagesSubscribe: ClassVar[Operation] = Operation(name="setOfMessagesSubscribe", method="POST", command="/message/subscription", suffix="/{0}")
+    advancedMessagesSubscribe: ClassVar[Operation] = Operation(name="advancedMessagesSubscribe", method="POST", command="/message/subscription-advanced", suffix="/{0}")
\ No newline at end of file
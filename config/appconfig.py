@@ -12,6 +12,7 @@ class App(BaseModel):
     complex_provisioned: bool = False
     webhook_enabled:bool = False
     vars_enabled:bool = False
+    capture_file:str = ""
 
 class Operation(BaseModel):
         command:str
@@ -28,13 +29,64 @@ class WhApp(BaseModel):
     set_of_messages:Operation = Operation(command="set_of_messages", operation="POST")
     advanced_messages:Operation = Operation(command="advanced_messages", operation="POST")
 
+class Metrics(BaseModel):
+    enabled:bool = True
+    host:str = "127.0.0.1"              # standalone server only; "0.0.0.0" exposes it to the network
+    port:int = 8101
+    route:str = "/metrics"
+
+class Stats(BaseModel):
+    sliding_window:float = 300.0        # seconds
+    sliding_panes:int = 10
+    quantiles:list[float] = [0.5, 0.95]
+
+class History(BaseModel):
+    enabled:bool = True
+    capacity:int = 3600                 # samples kept per topic
+    max_topics:int = 256
+    topics:list[str] = []               # empty: every topic read or received
+    persist_file:str = ""               # memory-mapped history and aggregates, kept across restarts; empty disables
+    checkpoint_period:float = 10.0      # seconds
+
+class Band(BaseModel):
+    absolute:float = 0.0
+    percent:float = 0.0
+
+class Deadband(BaseModel):
+    enabled:bool = True
+    absolute:float = 0.0                # default band; 0/0 only suppresses unchanged values
+    percent:float = 0.0
+    integrity_period:float = 300.0      # seconds; every topic is rewritten at least this often
+    topics:dict[str, Band] = {}         # per-topic bands
+
 class Misc(BaseModel):
     retry_period:int = 1
+    retry_max_period:int = 30
     hearbeat_initial_state: bool = False
     heartbeat_period: int = 10
     app_loop_period: int = 1
     provision_time: int = 10
     error_retries: int = 10
+    config_poll_period: float = 30.0    # seconds between config topic reads when not subscribed
+    config_resync_period: float = 300.0 # seconds between config topic reads when subscribed, in case a push is lost
+
+class Compute(BaseModel):
+    enabled:bool = False
+    workers:int = 0                     # worker processes; 0: one per core but one
+    slots:int = 8                       # jobs in flight; a job submitted while all are busy is skipped
+    slot_size:int = 65536               # bytes of shared memory per job (inputs and outputs)
+    samples:int = 256                   # history samples per job
+
+class Diagnostics(BaseModel):
+    enabled:bool = False                # tracemalloc costs memory and CPU: enable to hunt leaks
+    interval:float = 300.0              # seconds between snapshots
+    frames:int = 1                      # traceback depth kept per allocation
+    top:int = 10                        # allocation sites reported
+    leak_samples:int = 3                # consecutive growing samples that make a leak suspect
+    dump_file:str = "logs/memory.json"  # written on SIGUSR1
+
+class Host(BaseModel):
+    workers:int = 4                     # threads running hosted app jobs (cycles, heartbeats, startup steps)
 
 class Log (BaseModel):
     log_to_file: bool = False
@@ -43,9 +95,21 @@ class Log (BaseModel):
     api_level:str = "ERROR"
     format:str = "[0][%(asctime)s.%(msecs)03dZ][%(name)s][%(levelname)s]%(message)s"
     date_format:str = "%Y-%m-%dT%H:%M:%S"
+    queue_size:int = 10000              # records waiting for the writer thread; extra records are dropped
+    rate_limit_level:str = "WARN"       # records at this level and above are rate limited per call site
+    rate_limit_per_sec:float = 1.0      # 0 disables rate limiting
+    rate_limit_burst:int = 10
+    error_sample_every:int = 100        # once rate limited, let 1 in N through
 
 class AppConfig (BaseModel):
     app: App = App()
     wh: WhApp = WhApp()
     misc: Misc = Misc()
+    metrics: Metrics = Metrics()
+    stats: Stats = Stats()
+    deadband: Deadband = Deadband()
+    history: History = History()
+    compute: Compute = Compute()
+    host: Host = Host()
+    diagnostics: Diagnostics = Diagnostics()
     log: Log = Log()
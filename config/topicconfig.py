@@ -0,0 +1,24 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+#
+from typing import ClassVar
+from pydantic import BaseModel, field_validator
+
+#
+# Run-time configuration of the sample app, provisioned as postvalidConfig
+# topics and kept up to date by classes/config_binding.py
+#
+class CourseAppConfig(BaseModel):
+    configrunningperiod: int = 1        # seconds between cycles, 1..60
+    maxminrestartperiod: int = 1        # minutes per min/max window, 1..60
+
+    topics: ClassVar[dict] = {
+        "configrunningperiod": "liveValue.postvalidConfig.this.courseApp.0.configrunningperiod.",
+        "maxminrestartperiod": "liveValue.postvalidConfig.this.courseApp.0.maxminrestartperiod.",
+    }
+
+    @field_validator('configrunningperiod', 'maxminrestartperiod', mode='after')
+    def clamp(cls, value):
+        return min(max(value, 1), 60)
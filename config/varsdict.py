@@ -3,9 +3,36 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 #
+from array import array
 import json
 from pydantic import BaseModel
 
+def to_bool(value):
+    # bool("false") is True: strings are mapped explicitly
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("true", "1"):
+            return True
+        if text in ("false", "0"):
+            return False
+        raise ValueError (f"invalid boolean: {value!r}")
+    return bool(value)
+
+#
+# vars.json "type" -> (scalar cast, array typecode). A typecode of None means
+# the type has no compact array representation and multi-element values are
+# kept as plain lists.
+#
+VAR_TYPES = {
+    "integer": (int, "q"),
+    "int": (int, "q"),
+    "float": (float, "d"),
+    "double": (float, "d"),
+    "boolean": (to_bool, "B"),
+    "bool": (to_bool, "B"),
+    "string": (str, None),
+}
+
 class VarDecoder(BaseModel):
     def var_decoder(self, dct):
         return Var(var=dct['var'], topic=dct['topic'], type=dct['type'], size=dct['size'], writable=dct['writable'])
@@ -20,6 +47,49 @@ class Var(BaseModel):
     def from_json(self, json_string):
         return json.loads(json_string, object_hook=VarDecoder().var_decoder)
 
+    def decode(self, value):
+        #
+        # Coerce a value read from the API into the declared type.
+        # Vars with size > 1 come back as an array.array buffer.
+        # A value that does not fit the type is returned as read.
+        #
+        if value is None or self.type not in VAR_TYPES:
+            return value
+        try:
+            if self.size > 1:
+                return self.decode_values(value if isinstance(value, (list, tuple, array)) else [value])
+            cast, _ = VAR_TYPES[self.type]
+            return cast(value)
+        except (TypeError, ValueError, OverflowError):
+            return value
+
+    def decode_values(self, values):
+        #
+        # Coerce a list of values (a multi-element value or a datapoint series)
+        # into a typed buffer without boxing each element in a model.
+        #
+        if self.type not in VAR_TYPES:
+            return values
+        cast, typecode = VAR_TYPES[self.type]
+        if typecode is None:
+            return [cast(v) for v in values]
+        try:
+            return array(typecode, values)
+        except TypeError:
+            return array(typecode, map(cast, values))
+
+    def encode(self, value):
+        #
+        # Turn a typed value back into something json.dumps can serialize
+        #
+        if isinstance(value, array):
+            return value.tolist()
+        return value
+
+    def check_writable(self):
+        if not self.writable:
+            raise Exception (f"var: {self.var} is not writable")
+
 class VarsDict(BaseModel):
     by_topic:dict = {}
     by_var:dict = {}
@@ -34,8 +104,19 @@ class VarsDict(BaseModel):
     def get_by_var(self, var):
         return self.by_var.get(var)
 
+    def get_writable(self, var):
+        #
+        # Look up a var for writing, failing before any network call
+        # when it is unknown or declared read-only
+        #
+        var_def = self.by_var.get(var)
+        if var_def is None:
+            raise Exception (f"var: {var} is invalid")
+        var_def.check_writable()
+        return var_def
+
     def load(self, array):
         for var in array:
             self.set(var.topic, var.var, var)
         return self
-    
\ No newline at end of file
+    
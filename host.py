@@ -0,0 +1,65 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Python client interface sample for HCC2 Rest API Server
+# Several small apps hosted in one process (see classes/app_host.py)
+#
+#   python3 host.py courseApp otherApp=data/otherApp.tar.gz ...
+#
+# Each app registers with its own tarball (its name, topics and config): by
+# default data/<app name>.tar.gz, or the path given after "=".
+#
+import os
+import sys
+import time
+from classes.api_classes import TvqtDataPoint
+from classes.app_host import AppHost, HostedApp
+from classes.enums import quality_enum
+from config.appconfig import AppConfig
+from lib.logsetup import setup_logging
+from lib.timestamps import now_us
+
+class TemperatureApp (HostedApp):
+    #
+    # Copies the CPU temperature to the app's production topic every cycle
+    #
+    def __init__(self, name, tarfile_path, config):
+        super().__init__(name, tarfile_path, config.app.complex_provisioned, config.misc.app_loop_period)
+        self.config = config
+
+    def setup(self):
+        self.plan = self.client.prepare_read(["liveValue.diagnostics.this.io.0.temperature.cpu."])
+        if self.client.cfg.api_callback_url != "":
+            self.client.setOfMessagesSubscribe(self.name, ["liveValue.diagnostics.this.io.0.rail.voltage.v1p2."],
+                self.callback_url(self.config.wh.set_of_messages.command), True)
+
+    def cycle(self, payloads):
+        for pl in payloads:
+            self.logger.debug("%s - received %s: %s", self.name, pl.topic, pl.value)
+        value_array = self.client.messageReadPrepared(self.plan)
+        if None in value_array:
+            raise Exception ("One or more topics do not exist. Check topic string.")
+        self.client.messageWrite([
+            TvqtDataPoint(topic=f"liveValue.production.this.{self.name}.0.temperature.",
+                value=value_array[0].value, quality=quality_enum.OK, timeStamp=now_us())
+        ])
+
+appcfg = AppConfig()
+logger = setup_logging("host", appcfg.log)
+
+host = AppHost(logger, appcfg)
+for arg in sys.argv[1:] or [appcfg.app.name]:
+    name, _, tarfile_path = arg.partition("=")
+    if tarfile_path == "":
+        tarfile_path = appcfg.app.tarfile_path if name == appcfg.app.name else os.path.join("data", f"{name}.tar.gz")
+    host.add(TemperatureApp(name, tarfile_path, appcfg))
+host.start()
+logger.info("Hosting %s apps: %s", len(host.apps), ", ".join(host.apps))
+try:
+    while True:
+        time.sleep(60)
+        logger.debug("App states: %s", host.status())
+except KeyboardInterrupt:
+    host.exit()
@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Incremental JSON decoding of a response body, one element at a time
+#
+# JsonStream pulls byte chunks (response.iter_content()) as it needs them and
+# only keeps the part of the body that has not been decoded yet, so memory is
+# bounded by the largest single element instead of the whole body. Arrays and
+# objects can be walked lazily (items(), members()); leaves are decoded with
+# json's raw_decode.
+#
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",:]}"
+
+class JsonStream (object):
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, minimum=1):
+        #
+        # Read until at least `minimum` more characters are buffered; False at the end of the body
+        #
+        if self.pos > 0:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        target = len(self.buffer) + minimum
+        while len(self.buffer) < target and not self.eof:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.buffer += self.decoder.decode(b"", final=True)
+                self.eof = True
+                break
+            self.buffer += self.decoder.decode(chunk)
+        return len(self.buffer) >= target
+
+    def peek(self):
+        #
+        # Next significant character, "" at the end of the body
+        #
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError (f"expected one of {chars!r} in JSON stream, found {char or 'end of data'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        #
+        # Decode the next complete value. A value is only accepted once a delimiter
+        # after it is buffered, so that numbers cut by a chunk boundary are not taken short.
+        # On failure the buffer grows geometrically, keeping the re-parsing linear overall.
+        #
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buffer, self.pos)
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill(max(len(self.buffer) - self.pos, 4096))
+
+    def items(self):
+        #
+        # Walk an array; the caller consumes each element (value(), items() or members())
+        # before asking for the next one
+        #
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
+
+    def members(self):
+        #
+        # Walk an object, yielding each key; the caller consumes its value
+        #
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError ("expected an object key in JSON stream")
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+def iter_array(chunks):
+    #
+    # Elements of a top level JSON array, decoded one at a time
+    #
+    stream = JsonStream(chunks)
+    for _ in stream.items():
+        yield stream.value()
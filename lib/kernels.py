@@ -0,0 +1,64 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Compute kernels for classes/compute_pool.py
+#
+# A kernel runs in a worker process: it reads its input arrays and writes
+# its results to `out` (memoryviews of doubles in shared memory), and
+# returns the number of values written. Kernels must be module level
+# functions so that the pool can pickle a reference to them.
+#
+import math
+
+def summary(inputs, out):
+    #
+    # inputs["x"]: samples -> out: mean, rms, standard deviation, least squares slope per sample
+    #
+    x = inputs["x"]
+    n = len(x)
+    if n == 0:
+        out[0] = out[1] = out[2] = out[3] = 0.0
+        return 4
+    total = 0.0
+    squares = 0.0
+    weighted = 0.0
+    for i in range(n):
+        v = x[i]
+        total += v
+        squares += v * v
+        weighted += i * v
+    mean = total / n
+    out[0] = mean
+    out[1] = math.sqrt(squares / n)
+    out[2] = math.sqrt(max(0.0, squares / n - mean * mean))
+    # slope = cov(i, x) / var(i), with mean(i) = (n-1)/2 and var(i) = (n^2-1)/12
+    out[3] = (weighted / n - mean * (n - 1) / 2) / ((n * n - 1) / 12) if n > 1 else 0.0
+    return 4
+
+def spectrum_peak(inputs, out, bins=0):
+    #
+    # inputs["x"]: evenly spaced samples -> out: dominant frequency bin (cycles per window), its amplitude
+    # Plain DFT of the mean-removed signal over bins 1..bins (default n/2)
+    #
+    x = inputs["x"]
+    n = len(x)
+    out[0] = out[1] = 0.0
+    if n < 2:
+        return 2
+    mean = sum(x) / n
+    top = min(bins, n // 2) if bins > 0 else n // 2
+    for k in range(1, top + 1):
+        step = 2.0 * math.pi * k / n
+        re = 0.0
+        im = 0.0
+        for i in range(n):
+            v = x[i] - mean
+            re += v * math.cos(step * i)
+            im -= v * math.sin(step * i)
+        amplitude = 2.0 * math.sqrt(re * re + im * im) / n
+        if amplitude > out[1]:
+            out[0] = k
+            out[1] = amplitude
+    return 2
@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Non-blocking logging for the app loop
+#
+# Records are handed to a bounded queue by a QueueHandler and written to the
+# console and log file by a QueueListener thread, so the loop never waits on
+# I/O. Use %-style arguments (logger.debug("topic: %s", topic)) so messages
+# are only formatted when the level is enabled.
+#
+# Records at or above rate_limit_level are rate limited per call site (token
+# bucket); once a call site runs out of tokens, only one in error_sample_every
+# of its records gets through, tagged with the number suppressed since.
+#
+# The root logger goes through the same queue, so library logs do not block
+# the loop either. Records dropped on a full queue are counted and exported
+# on /metrics as app_log_dropped_records_total.
+#
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+from threading import Lock
+import time
+
+from classes.metrics import registry as metrics
+from lib.miscfuncs import text_to_log_level
+
+class RateLimitFilter (logging.Filter):
+    def __init__(self, rate, burst, sample_every, level):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_every = sample_every
+        self.level = level
+        self.lock = Lock()
+        self.sites = {}
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno < self.level:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            tokens, last, suppressed = self.sites.get(site, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                self.sites[site] = (tokens - 1.0, now, 0)
+                passed = True
+            else:
+                suppressed += 1
+                passed = self.sample_every > 0 and suppressed % self.sample_every == 0
+                self.sites[site] = (tokens, now, 0 if passed else suppressed)
+        if passed and suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return passed
+
+class NonBlockingQueueHandler (QueueHandler):
+    #
+    # Drops records instead of blocking when the queue is full
+    #
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        #
+        # Merge the arguments here, since they may change after the call returns;
+        # timestamps and layout are formatted by the listener's handlers
+        #
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def collect(self):
+        return [
+            "# HELP app_log_dropped_records_total Log records dropped because the log queue was full.",
+            "# TYPE app_log_dropped_records_total counter",
+            f"app_log_dropped_records_total {self.dropped}",
+        ]
+
+def setup_logging(name, log_cfg):
+    level = text_to_log_level(log_cfg.level)
+    fmt = logging.Formatter(log_cfg.format, datefmt=log_cfg.date_format)
+    handlers = []
+    console = logging.StreamHandler()
+    console.setFormatter(fmt)
+    handlers.append(console)
+    if log_cfg.log_to_file == True:
+        fh = logging.FileHandler(log_cfg.log_file, mode='w')
+        fh.setFormatter(fmt)
+        handlers.append(fh)
+
+    log_queue = queue.Queue(maxsize=log_cfg.queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(log_cfg.rate_limit_per_sec, log_cfg.rate_limit_burst,
+        log_cfg.error_sample_every, text_to_log_level(log_cfg.rate_limit_level)))
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    #
+    # other libraries log through the root logger: queue their records as well
+    #
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    metrics.add_collector(queue_handler.collect)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logging.addLevelName(logging.CRITICAL, "critical")
+    logging.addLevelName(logging.ERROR, "error")
+    logging.addLevelName(logging.WARNING, "warning")
+    logging.addLevelName(logging.INFO, "info")
+    logging.addLevelName(logging.DEBUG, "debug")
+    return logger
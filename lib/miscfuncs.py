@@ -6,11 +6,13 @@
 # Python client interface for HCC2 SDK 2.0
 #
 import logging
+import random
 import re
-from dateutil import tz
-import pytz
 
 def validateUrl(url):
+    # unix domain socket: unix://<absolute socket path>[:<http path>]
+    if url.lower().startswith("unix://"):
+        return re.match(r'^unix://(/[^:\s]+)(?::/\S*)?$', url, re.IGNORECASE) is not None
     regex = re.compile(
         r'^(?:http|ftp)s?://'  # http:// or https://
         r'(?:(?:A-Z0-9?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|'  # domain...
@@ -38,8 +40,16 @@ def text_to_log_level (str):
 
 
 def convert_datetime_to_UTC(dt):
+    import pytz
     return dt.astimezone(pytz.UTC)
 
 def convert_UTC_to_datetime(dt):
+    from dateutil import tz
     return dt.astimezone(tz.local())
 
+
+def jittered_backoff(attempt, base, cap):
+    # exponential backoff with "equal jitter": uniform in [d/2, d], d = min(cap, base * 2^attempt)
+    # the exponent is capped: counts keep growing through a long outage and 2.0 ** 1024 overflows
+    delay = min(cap, base * 2 ** min(attempt, 32))
+    return random.uniform(delay / 2, delay)
@@ -0,0 +1,56 @@
+#
+# Copyright (c) 2025 Sensia Global
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Integer timestamps, in microseconds since the epoch (UTC)
+#
+# The REST API carries timestamps as "<seconds><6 digit microseconds>" strings.
+# Models keep them as ints; datetimes are only built on request, with the
+# local UTC offset cached per hour instead of a tz lookup per value.
+#
+from datetime import datetime, timedelta, timezone
+import time
+
+EPOCH = datetime(1970, 1, 1)
+HOUR_US = 3600000000
+
+# (hour, offset) of the last lookup, replaced in one assignment so that
+# threads never see the hour of one update with the offset of another
+_offset = (None, 0)
+
+def now_us():
+    return time.time_ns() // 1000
+
+def utc_offset_us(us):
+    #
+    # Local UTC offset at `us`; offsets only change on hour boundaries
+    #
+    global _offset
+    hour = us // HOUR_US
+    cached_hour, offset_us = _offset
+    if hour != cached_hour:
+        seconds = hour * 3600
+        offset_us = (datetime.fromtimestamp(seconds) - datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)) // timedelta(microseconds=1)
+        _offset = (hour, offset_us)
+    return offset_us
+
+def us_to_datetime(us):
+    # naive local time, as the models used to return
+    return EPOCH + timedelta(microseconds=us + utc_offset_us(us))
+
+def datetime_to_us(dt):
+    # exact: whole seconds from the platform, microseconds from the datetime
+    return int(dt.replace(microsecond=0).timestamp()) * 1000000 + dt.microsecond
+
+def to_us(value):
+    #
+    # ints, datetimes or API timestamp strings; None for anything else
+    #
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, datetime):
+        return datetime_to_us(value)
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
@@ -7,16 +7,15 @@
 # Sample app
 #
 from datetime import datetime
-import logging
 import time
 import queue
 from apiclient import APIClient
 from classes.api_classes import MessageWriteReqVar
-from classes.webhook import WebHook
 from config.appconfig import AppConfig
 from classes.heartbeat import HeartBeat
+from classes.deadband import DeadbandFilter
 from config.varsdict import Var
-from lib.miscfuncs import text_to_log_level
+from lib.logsetup import setup_logging
 #
 # Get configuration
 #
@@ -24,24 +23,7 @@ appcfg = AppConfig()
 #
 # setup logger
 #
-logging.basicConfig( level=appcfg.log.level,
-    format=appcfg.log.format,
-    datefmt=appcfg.log.date_format)
-logger = logging.getLogger(appcfg.app.name)
-logger.setLevel (text_to_log_level(appcfg.log.level))
-if appcfg.log.log_to_file == True:
-    fh = logging.FileHandler(appcfg.log.log_file, mode='w')
-    fh.setLevel(logging.getLevelName(appcfg.log.level))
-    fmt = logging.Formatter(appcfg.log.format)
-    fh.setFormatter(fmt)
-    logger.addHandler(fh)
-    logging.getLogger().propagate = False
-
-logging.addLevelName(logging.CRITICAL, "critical")
-logging.addLevelName(logging.ERROR, "error")
-logging.addLevelName(logging.WARNING, "warning")
-logging.addLevelName(logging.INFO, "info")
-logging.addLevelName(logging.DEBUG, "debug")
+logger = setup_logging(appcfg.app.name, appcfg.log)
 
 ###############################################################################################
 # 
@@ -52,6 +34,11 @@ hbq = queue.Queue()
 reload_required = False
 
 client = APIClient(app_name=appcfg.app.name)
+#
+# Only write values that moved out of their deadband (report by exception)
+#
+if appcfg.deadband.enabled == True:
+    client.write_filter = DeadbandFilter(appcfg.deadband)
 
 ###############################################################################################
 # 
@@ -63,7 +50,7 @@ if appcfg.app.vars_enabled == True:
             v = Var().from_json(json_file.read())
         client.vars_dict.load(v)
     except Exception as e:
-        logger.error(f"Error trying to read variable configuration file. Error: {e}. PROCESS ABORTED.")
+        logger.error("Error trying to read variable configuration file. Error: %s. PROCESS ABORTED.", e)
         exit(-1)
 
 ###############################################################################################
@@ -71,6 +58,8 @@ if appcfg.app.vars_enabled == True:
 # initialize webhook (optional)
 # 
 if appcfg.app.webhook_enabled == True:
+    # FastAPI and uvicorn are only loaded when the webhook is enabled
+    from classes.webhook import WebHook
     whq = queue.Queue()
     wh = WebHook(logger=logger, queue=whq, config=appcfg)
     #
@@ -79,10 +68,10 @@ if appcfg.app.webhook_enabled == True:
     while True:
         try:
             wh.start()
-            logger.debug(f"Web hook thread has been fired successfully. ")
+            logger.debug("Web hook thread has been fired successfully. ")
             break
         except Exception as e:
-            logger.error(f"webhook manager - Error trying to start webhook thread for  \"{client.app_name}\". Error: {e}. Retrying.")
+            logger.error('webhook manager - Error trying to start webhook thread for  "%s". Error: %s. Retrying.', client.app_name, e)
             time.sleep(appcfg.misc.retry_period)
             continue
 
@@ -92,13 +81,13 @@ if appcfg.app.webhook_enabled == True:
 #
 while True:
     status = client.connect()
-    logger.debug(f"Connecting with API at URL: {client.cfg.api_url}")
+    logger.debug("Connecting with API at URL: %s", client.cfg.api_url)
     
     if status == False:
-        logger.error(f"Connect - Error trying to connect to API at URL: {client.cfg.api_url}.  Retrying.")
+        logger.error("Connect - Error trying to connect to API at URL: %s.  Retrying.", client.cfg.api_url)
         time.sleep(appcfg.misc.retry_period)
         continue 
-    logger.debug(f"Connect - Application {appcfg.app.name} is connected with API")
+    logger.debug("Connect - Application %s is connected with API", appcfg.app.name)
     #
     # Set Application Heartbeat (required by Unity)
     #
@@ -110,9 +99,9 @@ while True:
     #
     try:
         response = client.registerApp(tarfile_path=appcfg.app.tarfile_path, is_complex_provisioned=appcfg.app.complex_provisioned)
-        logger.debug(f"Application {client.app_name} correcty registered to API using tar.gz file: {appcfg.app.tarfile_path}")
+        logger.debug("Application %s correcty registered to API using tar.gz file: %s", client.app_name, appcfg.app.tarfile_path)
     except Exception as e:
-        logger.error(f"registerApp - Error trying to register application \"{client.app_name}\". Error: {e}. Retrying.")
+        logger.error('registerApp - Error trying to register application "%s". Error: %s. Retrying.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
 
@@ -122,13 +111,13 @@ while True:
     #
     try:
         hb.start()
-        logger.debug(f"Heartbeat thread has been fired successfully. ")
+        logger.debug("Heartbeat thread has been fired successfully. ")
     except Exception as e:
-        logger.error(f"heartbeat - Error trying to start heartbeat thread for  \"{client.app_name}\". Error: {e}.  Retrying.")
+        logger.error('heartbeat - Error trying to start heartbeat thread for  "%s". Error: %s.  Retrying.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
     #
-    logger.debug (f"Wait {appcfg.misc.provision_time} for configuration to settle down....")
+    logger.debug ("Wait %s for configuration to settle down....", appcfg.misc.provision_time)
     time.sleep(appcfg.misc.provision_time)
     ###############################################################################################
     #
@@ -138,14 +127,14 @@ while True:
     while not fail:
         try:
             response = client.checkProvisioningStatus()
-            logger.debug (f"checkProvisioningStatus responded ok")
+            logger.debug ("checkProvisioningStatus responded ok")
         except Exception as e:
-            logger.error(f"checkProvisioningStatus - Error trying to check provision application \"{client.app_name}\". Error: {e}.  Retrying.")
+            logger.error('checkProvisioningStatus - Error trying to check provision application "%s". Error: %s.  Retrying.', client.app_name, e)
             fail = True
             break
 
         if response.hasNewConfig == True:
-            logger.debug(f"checkProvisioningStatus -> New configuration found! ")
+            logger.debug("checkProvisioningStatus -> New configuration found! ")
             break
         time.sleep(appcfg.misc.retry_period)
     
@@ -159,9 +148,9 @@ while True:
     #
     try:
         response = client.validateProvision(valid=True)
-        logger.debug (f"validateProvision responded ok")
+        logger.debug ("validateProvision responded ok")
     except Exception as e:
-        logger.error(f"validateProvision -Error trying to validate provision \"{client.app_name}\". Error: {e}.  Retrying.")
+        logger.error('validateProvision -Error trying to validate provision "%s". Error: %s.  Retrying.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
     ###############################################################################################
@@ -192,12 +181,12 @@ while True:
             ]
         )
         for val in value_array:
-            logger.debug(f"topic: {val.topic}, value: {val.value}, type: {type(val.value)}, quality: {val.quality}, timeStamp: {val.timeStamp}")
+            logger.debug("topic: %s, value: %s, type: %s, quality: %s, timeStamp: %s", val.topic, val.value, type(val.value), val.quality, val.timeStamp)
     except Exception as e:
-        logger.error(f"messageRead Error trying to read vars:  \"{client.app_name}\". Error: {e}.  Try Again.")
+        logger.error('messageRead Error trying to read vars:  "%s". Error: %s.  Try Again.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
-    period = int(value_array[0].value)
+    period = value_array[0].value
     if period < 1: 
         period = 1
     if period > 100:
@@ -212,9 +201,9 @@ while True:
             ]
         )
         for val in value_array:
-            logger.debug(f"topic: {val.topic}, value: {val.value}, type: {type(val.value)}, quality: {val.quality}, timeStamp: {val.timeStamp}")
+            logger.debug("topic: %s, value: %s, type: %s, quality: %s, timeStamp: %s", val.topic, val.value, type(val.value), val.quality, val.timeStamp)
     except Exception as e:
-        logger.error(f"messageRead Error trying to read vars:  \"{client.app_name}\". Error: {e}.  Try Again.")
+        logger.error('messageRead Error trying to read vars:  "%s". Error: %s.  Try Again.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
     #########################################################################################################################3
@@ -229,16 +218,16 @@ while True:
         )
         for resp in response_array:
             for dp in resp.datapoints:
-                logger.debug(f"topic: {resp.topic}, quality: {dp.quality}")
+                logger.debug("topic: %s, quality: %s", resp.topic, dp.quality)
                 for i in range(len(dp.values)):
                     if dp.dataPointName == "total.":
                         cpu_usage = dp.values[i]
                         break
 
-                logger.debug(f"item: {i+1}, datapoint_name: {dp.dataPointName},  value: {dp.values[i]}, type: {type(dp.values[i])} timeStamp: {dp.timeStamps[i]}")
+                logger.debug("item: %s, datapoint_name: %s,  value: %s, type: %s timeStamp: %s", i+1, dp.dataPointName, dp.values[i], type(dp.values[i]), dp.timeStamps[i])
     
     except Exception as e:
-        logger.error(f"messageRead Error trying to read tags:  \"{client.app_name}\". Error: {e}. Try Again.")
+        logger.error('messageRead Error trying to read tags:  "%s". Error: %s. Try Again.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue
     #
@@ -262,9 +251,9 @@ while True:
 
     try:
         status = client.messageWriteVar(tvqt_datapoint_list)
-        logger.debug (f"messageWrite - Writing: {tvqt_datapoint_list}. status: {status}")
+        logger.debug ("messageWrite - Writing: %s. status: %s", tvqt_datapoint_list, status)
     except Exception as e:
-        logger.error(f"messageWrite Error trying to write tags:  \"{client.app_name}\". Error: {e}. Try again.")
+        logger.error('messageWrite Error trying to write tags:  "%s". Error: %s. Try again.', client.app_name, e)
         time.sleep(appcfg.misc.retry_period)
         continue 
 